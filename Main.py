@@ -58,6 +58,9 @@ def main():
     # Create the data model
     model = PasswordVaultModel()
     
+    # Write any buffered usage counts before exiting
+    app.aboutToQuit.connect(model.flush_usage)
+    
     # Create and show login window
     login_window = LoginWindow(model)
     login_window.setWindowIcon(app_icon)
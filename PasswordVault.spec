@@ -5,7 +5,7 @@ a = Analysis(
     ['Main.py'],
     pathex=[],
     binaries=[],
-    datas=[('icons', 'icons'), ('View/*.ui', 'View')],
+    datas=[('icons', 'icons'), ('View/*.ui', 'View'), ('model/data', 'model/data')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
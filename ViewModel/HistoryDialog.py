@@ -0,0 +1,90 @@
+from datetime import datetime
+from PySide6.QtWidgets import (QDialog, QDialogButtonBox, QApplication, QFormLayout, QHeaderView, QLabel,
+                               QTableWidget, QTableWidgetItem, QVBoxLayout)
+
+
+class HistoryDialog(QDialog):
+    """Lists the earlier versions of an entry and what each change replaced"""
+    
+    def __init__(self, model, entry_id: int, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.versions = model.get_entry_history(entry_id)
+        self.password_visible = False
+        self.setWindowTitle(f"History - {self.versions[0].name}" if self.versions else "History")
+        self.resize(520, 400)
+        layout = QVBoxLayout(self)
+        
+        self.table = QTableWidget(len(self.versions), 2, self)
+        self.table.setHorizontalHeaderLabels(["Version", "Changed afterwards"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        for row, version in enumerate(self.versions):
+            if version.current:
+                when = "Current"
+            else:
+                when = f"Until {datetime.fromtimestamp(version.replaced_at):%Y-%m-%d %H:%M}"
+            self.table.setItem(row, 0, QTableWidgetItem(when))
+            self.table.setItem(row, 1, QTableWidgetItem(", ".join(version.changed)))
+        self.table.itemSelectionChanged.connect(self.show_version)
+        layout.addWidget(self.table)
+        
+        form = QFormLayout()
+        self.name_label = QLabel(self)
+        self.username_label = QLabel(self)
+        self.password_label = QLabel(self)
+        self.url_label = QLabel(self)
+        form.addRow("Name:", self.name_label)
+        form.addRow("Login:", self.username_label)
+        form.addRow("Password:", self.password_label)
+        form.addRow("URL:", self.url_label)
+        layout.addLayout(form)
+        
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Close, self)
+        self.show_button = self.buttons.addButton("Show password", QDialogButtonBox.ActionRole)
+        self.show_button.clicked.connect(self.toggle_password_visibility)
+        self.copy_button = self.buttons.addButton("Copy password", QDialogButtonBox.ActionRole)
+        self.copy_button.clicked.connect(self.copy_password)
+        self.buttons.rejected.connect(self.reject)
+        layout.addWidget(self.buttons)
+        
+        if self.versions:
+            self.table.selectRow(0)
+        else:
+            self.show_button.setEnabled(False)
+            self.copy_button.setEnabled(False)
+    
+    def selected_version(self):
+        """Get the version picked in the list"""
+        row = self.table.currentRow()
+        return self.versions[row] if 0 <= row < len(self.versions) else None
+    
+    def show_version(self):
+        """Show the fields of the picked version, marking those its successor changed"""
+        version = self.selected_version()
+        if version is None:
+            return
+        labels = {"name": self.name_label, "username": self.username_label, "url": self.url_label}
+        for field, label in labels.items():
+            label.setText(getattr(version, field) or "-")
+        password = version.password
+        self.password_label.setText(password if self.password_visible else "*" * len(password))
+        for field, label in [*labels.items(), ("password", self.password_label)]:
+            font = label.font()
+            font.setBold(field in version.changed)
+            label.setFont(font)
+    
+    def toggle_password_visibility(self):
+        """Toggle whether passwords are shown"""
+        self.password_visible = not self.password_visible
+        self.show_button.setText("Hide password" if self.password_visible else "Show password")
+        self.show_version()
+    
+    def copy_password(self):
+        """Copy the picked version's password to the clipboard"""
+        version = self.selected_version()
+        if version is not None:
+            QApplication.clipboard().setText(version.password)
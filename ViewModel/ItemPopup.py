@@ -1,35 +1,33 @@
-from PySide6.QtWidgets import QDialog, QApplication
+from PySide6.QtWidgets import QDialog, QApplication, QPushButton
 from PySide6.QtCore import QByteArray, QTimer
 from PySide6.QtGui import QIcon, QPixmap, QPainter, QColor
 from PySide6.QtSvg import QSvgRenderer
 from View.ItemPopup_ui import Ui_Dialog
+from ViewModel.HistoryDialog import HistoryDialog
 import re
 
 
 class ItemPopupDialog(QDialog):
     """Popup dialog for displaying password entry details"""
     
-    def __init__(self, index: int, name: str, username: str, password: str = "", url: str = "", parent=None, model=None):
+    def __init__(self, index: int, entry, parent=None, model=None):
         super().__init__(parent)
         self.ui = Ui_Dialog()
         self.ui.setupUi(self)
         
         self.index = index
-        self.name = name
-        self.username = username
-        self.password = password
-        self.url = url
+        self.entry = entry  # VaultEntry record; the password is decrypted on use
         self.password_visible = False
         self.model = model
         
         # Set window title to item name
-        self.setWindowTitle(name)
+        self.setWindowTitle(entry.name)
         
         # Set the text content
-        self.ui.nameLabel.setText(name)
-        self.ui.label.setText(username)  # Username label
-        self.ui.label_2.setText("*" * len(password))  # Password label (hidden)
-        self.ui.label_3.setText(url if url else "No URL")  # URL label
+        self.ui.nameLabel.setText(entry.name)
+        self.ui.label.setText(entry.username)  # Username label
+        self.ui.label_2.setText("*" * len(entry.password))  # Password label (hidden)
+        self.ui.label_3.setText(entry.url if entry.url else "No URL")  # URL label
         
         # Set theme-aware icons
         self._set_theme_icons()
@@ -40,6 +38,12 @@ class ItemPopupDialog(QDialog):
         self.ui.toolButton_3.clicked.connect(self.copy_url)
         self.ui.toolButton_4.clicked.connect(self.toggle_password_visibility)
         
+        # Earlier versions of the entry
+        self.history_button = QPushButton("History", self)
+        self.history_button.setEnabled(self.model is not None)
+        self.history_button.clicked.connect(self.show_history)
+        self.ui.horizontalLayout_2.insertWidget(0, self.history_button)
+        
         # Connect close button
         self.ui.pushButton.clicked.connect(self.close)
         
@@ -108,41 +112,48 @@ class ItemPopupDialog(QDialog):
         # Reset tooltip after delay
         QTimer.singleShot(1500, restore_tooltip)
     
+    def _record_copy(self):
+        """Count a copy towards the entry's usage"""
+        if self.model:
+            # Buffered in memory and written in batches by the model
+            self.model.record_copy(self.entry.id)
+    
     def copy_username(self):
         """Copy username to clipboard"""
         clipboard = QApplication.clipboard()
-        clipboard.setText(self.username)
+        clipboard.setText(self.entry.username)
         self._show_copied_tooltip(self.ui.toolButton)
-        if self.model:
-            self.model.increment_copy_count(self.index)
+        self._record_copy()
     
     def copy_password(self):
         """Copy password to clipboard"""
         clipboard = QApplication.clipboard()
-        clipboard.setText(self.password)
+        clipboard.setText(self.entry.password)
         self._show_copied_tooltip(self.ui.toolButton_2)
-        if self.model:
-            self.model.increment_copy_count(self.index)
+        self._record_copy()
     
     def copy_url(self):
         """Copy URL to clipboard"""
-        if self.url:
+        if self.entry.url:
             clipboard = QApplication.clipboard()
-            clipboard.setText(self.url)
+            clipboard.setText(self.entry.url)
             self._show_copied_tooltip(self.ui.toolButton_3)
-            if self.model:
-                self.model.increment_copy_count(self.index)
+            self._record_copy()
     
     def toggle_password_visibility(self):
         """Toggle password visibility"""
         self.password_visible = not self.password_visible
         if self.password_visible:
-            self.ui.label_2.setText(self.password)
+            self.ui.label_2.setText(self.entry.password)
             if not self.hide_icon.isNull():
                 self.ui.toolButton_4.setIcon(self.hide_icon)
             self.ui.toolButton_4.setToolTip("Hide password")
         else:
-            self.ui.label_2.setText("*" * len(self.password))
+            self.ui.label_2.setText("*" * len(self.entry.password))
             if not self.show_icon.isNull():
                 self.ui.toolButton_4.setIcon(self.show_icon)
             self.ui.toolButton_4.setToolTip("Show password")
+    
+    def show_history(self):
+        """Show the entry's earlier versions"""
+        HistoryDialog(self.model, self.entry.id, self).exec()
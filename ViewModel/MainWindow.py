@@ -1,12 +1,16 @@
-from PySide6.QtWidgets import QMainWindow, QMessageBox, QListWidget, QListWidgetItem, QMenu, QStackedWidget, QWidget, QVBoxLayout, QHBoxLayout, QSpacerItem, QSizePolicy, QApplication
-from PySide6.QtCore import QSize, Signal, QSettings, QByteArray
-from PySide6.QtGui import QActionGroup, QIcon, QPixmap, QPalette, QColor
+from PySide6.QtWidgets import QMainWindow, QMessageBox, QAbstractItemView, QFileDialog, QInputDialog, QLineEdit, QListWidget, QListWidgetItem, QMenu, QStackedWidget, QWidget, QVBoxLayout, QHBoxLayout, QSpacerItem, QSizePolicy, QApplication
+from PySide6.QtCore import Qt, QSize, Signal, QSettings, QByteArray, QTimer
+from PySide6.QtGui import QActionGroup, QIcon, QKeySequence, QPixmap, QPalette, QColor
 from PySide6.QtSvg import QSvgRenderer
 from View.MainWindow_ui import Ui_MainWindow
 from ViewModel.PasswordItemWidget import PasswordItemWidget
 from ViewModel.PasswordGeneratorWidget import PasswordGeneratorWidget
 from ViewModel.AboutDialog import AboutDialog
 from ViewModel.ItemPopup import ItemPopupDialog
+from ViewModel.RotationDialog import RotationDialog
+from ViewModel.TrashDialog import TrashDialog
+from ViewModel.VaultStoreSignals import VaultStoreSignals
+from model.VaultStore import VaultStore
 import re
 
 
@@ -14,6 +18,9 @@ class MainWindow(QMainWindow):
     """Main window ViewModel"""
     
     logout_requested = Signal()  # Signal emitted when user logs out
+    backup_finished = Signal(object, bool)  # BackupProgress, whether the user asked for it
+    
+    LIST_PAGE_SIZE = 100  # Entries fetched and rendered per event-loop pass
     
     def __init__(self, model, parent=None):
         super().__init__(parent)
@@ -47,6 +54,9 @@ class MainWindow(QMainWindow):
         # Replace QListView with QListWidget
         self.list_widget = QListWidget()
         self.list_widget.setSpacing(2)
+        self.list_widget.setDefaultDropAction(Qt.DropAction.MoveAction)
+        self.list_widget.itemClicked.connect(lambda item: self.on_item_clicked(self.list_widget.row(item)))
+        self.list_widget.model().rowsMoved.connect(self.on_rows_moved)
         self.ui.listView.setParent(None)  # Remove old list view
         vault_layout.addWidget(self.list_widget)
         
@@ -67,8 +77,20 @@ class MainWindow(QMainWindow):
         # Load saved sort type
         self.current_sort = self.settings.value("sortType", "custom", type=str)
         self.search_query = ""
-        self.selected_index = -1
+        self.selected_id = None  # Id of the selected entry, kept across list changes
         self.current_popup = None  # Track the currently open popup
+        self.list_generation = 0  # Bumped on each rebuild to cancel stale page loads
+        self.list_total = 0
+        self.list_loading = False  # True while later pages are still being appended
+        
+        # The store reports changes so the list can be patched instead of rebuilt
+        self.store = VaultStore(self.model, self.current_sort, self.search_query)
+        self.store_signals = VaultStoreSignals(self.store, self)
+        self.store_signals.reset.connect(self.on_store_reset)
+        self.store_signals.inserted.connect(self.on_entry_inserted)
+        self.store_signals.removed.connect(self.on_entry_removed)
+        self.store_signals.updated.connect(self.on_entry_updated)
+        self.store_signals.moved.connect(self.on_entry_moved)
         
         # Update UI with user info
         if self.model.current_user:
@@ -94,9 +116,55 @@ class MainWindow(QMainWindow):
         self.ui.actionAbout.triggered.connect(self.show_about_dialog)
         self.ui.actionRemove_all_passwords.triggered.connect(self.remove_all_passwords)
         
+        # Undo and redo of this session's changes, with the standard shortcuts
+        self.undo_action = self.ui.menuRemove_all_saved_passwords.addAction("Undo")
+        self.undo_action.setShortcuts(QKeySequence.StandardKey.Undo)
+        self.undo_action.triggered.connect(self.undo)
+        self.redo_action = self.ui.menuRemove_all_saved_passwords.addAction("Redo")
+        self.redo_action.setShortcuts(QKeySequence.StandardKey.Redo)
+        self.redo_action.triggered.connect(self.redo)
+        self.ui.menuRemove_all_saved_passwords.aboutToShow.connect(self._update_undo_actions)
+        self.ui.menuRemove_all_saved_passwords.aboutToHide.connect(self._enable_undo_actions)
+        self.ui.menuRemove_all_saved_passwords.addSeparator()
+        
+        # Backups run on a worker thread; the result comes back through a queued signal
+        self.backup_action = self.ui.menuRemove_all_saved_passwords.addAction("Back up vault now")
+        self.backup_action.triggered.connect(lambda: self.start_backup(manual=True))
+        self.backup_finished.connect(self.on_backup_finished)
+        
+        # Encrypted archive export/import
+        self.ui.menuRemove_all_saved_passwords.addAction("Export vault...").triggered.connect(self.export_vault)
+        self.ui.menuRemove_all_saved_passwords.addAction("Import vault...").triggered.connect(self.import_vault)
+        self.ui.menuRemove_all_saved_passwords.addAction("Import from CSV...").triggered.connect(self.import_csv)
+        self.ui.menuRemove_all_saved_passwords.addAction("Import from JSON...").triggered.connect(self.import_json)
+        self.ui.menuRemove_all_saved_passwords.addAction("Check for breached passwords").triggered.connect(
+            self.check_breached_passwords
+        )
+        self.ui.menuRemove_all_saved_passwords.addAction("Vault health...").triggered.connect(self.show_vault_health)
+        self.ui.menuRemove_all_saved_passwords.addAction("Rotate passwords...").triggered.connect(self.rotate_passwords)
+        self.ui.menuRemove_all_saved_passwords.addAction("History retention...").triggered.connect(
+            self.edit_history_retention
+        )
+        self.ui.menuRemove_all_saved_passwords.addAction("Trash...").triggered.connect(self.show_trash)
+        
+        # Periodically write buffered copy counts in one batch
+        self.usage_flush_timer = QTimer(self)
+        self.usage_flush_timer.setInterval(30000)
+        self.usage_flush_timer.timeout.connect(self.model.flush_usage)
+        self.usage_flush_timer.start()
+        
+        # Pick up entries changed by other instances sharing the database
+        self.change_poll_timer = QTimer(self)
+        self.change_poll_timer.setInterval(1000)
+        self.change_poll_timer.timeout.connect(self.poll_external_changes)
+        self.change_poll_timer.start()
+        
         # Load password entries
         self.refresh_list()
         
+        # Take a background backup if the vault changed since the last one
+        self.start_backup(manual=False)
+        
         # Set initial view to vault
         self.switch_view(0)
         
@@ -191,6 +259,12 @@ class MainWindow(QMainWindow):
         freq_action.setActionGroup(action_group)
         freq_action.triggered.connect(lambda: self.set_sort_type("frequently_used"))
         
+        frecency_action = menu.addAction("Most Relevant")
+        frecency_action.setCheckable(True)
+        frecency_action.setChecked(self.current_sort == "frecency")
+        frecency_action.setActionGroup(action_group)
+        frecency_action.triggered.connect(lambda: self.set_sort_type("frecency"))
+        
         # Show menu at button position
         menu.exec(self.ui.toolButton.mapToGlobal(self.ui.toolButton.rect().bottomLeft()))
     
@@ -202,56 +276,165 @@ class MainWindow(QMainWindow):
         self.refresh_list()
     
     def refresh_list(self):
-        """Refresh the password list with current sort and search"""
-        # Clear the list
+        """Reload the password list with current sort and search"""
+        self.store.load(self.current_sort, self.search_query)
+    
+    def poll_external_changes(self):
+        """Apply entries changed by other instances to the list"""
+        entry_ids = self.model.poll_changes()
+        if entry_ids is None:
+            # The change log no longer covers the last poll
+            self.refresh_list()
+        elif entry_ids:
+            self.store.apply_changes(entry_ids)
+    
+    def on_store_reset(self):
+        """Rebuild the whole list after the store has been reloaded
+        
+        The first page is shown immediately and the rest are appended one
+        page per event-loop pass, so large vaults render progressively.
+        """
+        # Clear the list and abandon any pages still loading for the old one
         self.list_widget.clear()
+        self.list_generation += 1
         
-        # Get sorted and filtered entries
-        entries = self.model.get_sorted_entries(self.current_sort, self.search_query)
+        # The store already knows the row count, so the last row's down button is known early
+        self.list_total = len(self.store)
         
-        # Add custom widgets for each entry
-        for i, entry in enumerate(entries):
-            # Create list item
-            item = QListWidgetItem()
-            item.setSizeHint(QSize(0, 80))  # Reduced height since UI is now simpler
-            
-            # Create custom widget with all data
-            widget = PasswordItemWidget(
-                i, 
-                entry['name'], 
-                entry['username'],
-                entry.get('password', ''),
-                entry.get('url', ''),
-                model=self.model
-            )
-            
-            # Connect signals
-            widget.move_up_clicked.connect(self.move_item_up)
-            widget.move_down_clicked.connect(self.move_item_down)
-            widget.item_clicked.connect(self.on_item_clicked)
-            widget.edit_clicked.connect(self.edit_item)
-            
-            # Show/hide up/down buttons based on sort mode
-            if self.current_sort == "custom":
-                widget.set_buttons_visible(True)
-                # Enable/disable buttons based on position
-                widget.set_buttons_enabled(i > 0, i < len(entries) - 1)
-            else:
-                # Hide up/down buttons when not in custom sort mode
-                widget.set_buttons_visible(False)
-            
-            # Add to list
-            self.list_widget.addItem(item)
-            self.list_widget.setItemWidget(item, widget)
+        # Drag-and-drop reordering is only meaningful in custom order
+        if self.current_sort == "custom":
+            self.list_widget.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
+        else:
+            self.list_widget.setDragDropMode(QAbstractItemView.DragDropMode.NoDragDrop)
+        
+        self.list_loading = True
+        self._load_next_page(self.list_generation, None)
+        
+        # Keep the selection if the selected entry is still shown
+        if self.selected_id is not None and self.store.position_of(self.selected_id) is None:
+            self.selected_id = None
+        self._update_remove_button()
+    
+    def _load_next_page(self, generation: int, after_key):
+        """Append one page of entries to the list and schedule the next one"""
+        if generation != self.list_generation:
+            return  # The list has been rebuilt since this page was scheduled
         
-        # Update remove button state
-        self.ui.pushButton_3.setEnabled(len(entries) > 0 and self.selected_index >= 0)
+        entries, next_key = self.model.get_page(
+            self.current_sort, self.search_query, after_key, self.LIST_PAGE_SIZE
+        )
+        for entry in entries:
+            self._insert_entry_item(self.list_widget.count(), entry)
+            if entry.id == self.selected_id:
+                self.list_widget.setCurrentRow(self.list_widget.count() - 1)
+        
+        self.list_loading = next_key is not None
+        if self.list_loading:
+            QTimer.singleShot(0, lambda: self._load_next_page(generation, next_key))
+    
+    def _insert_entry_item(self, row: int, entry):
+        """Add a row widget for an entry at a row of the list"""
+        # Create list item
+        item = QListWidgetItem()
+        item.setSizeHint(QSize(0, 80))  # Reduced height since UI is now simpler
+        item.setData(Qt.ItemDataRole.UserRole, entry.id)
+        
+        # Add to list
+        self.list_widget.insertItem(row, item)
+        self._set_entry_widget(item, entry)
+    
+    def _set_entry_widget(self, item: QListWidgetItem, entry):
+        """Create the custom widget showing an entry record for a list item"""
+        row = self.list_widget.row(item)
+        widget = PasswordItemWidget(entry, model=self.model)
+        
+        # Connect signals
+        widget.move_up_clicked.connect(self.move_item_up)
+        widget.move_down_clicked.connect(self.move_item_down)
+        widget.edit_clicked.connect(self.edit_item)
+        
+        # Show/hide up/down buttons based on sort mode
+        if self.current_sort == "custom":
+            widget.set_buttons_visible(True)
+            # Enable/disable buttons based on position
+            widget.set_buttons_enabled(row > 0, row < self.list_total - 1)
+        else:
+            # Hide up/down buttons when not in custom sort mode
+            widget.set_buttons_visible(False)
+        
+        self.list_widget.setItemWidget(item, widget)
+    
+    def _is_row_shown(self, position: int) -> bool:
+        """Check whether a store position falls within the rows loaded so far
+        
+        Positions past the loaded rows are left to the pages still loading.
+        """
+        count = self.list_widget.count()
+        return position < count or (position == count and not self.list_loading)
+    
+    def _update_row_buttons(self, *rows: int):
+        """Refresh the up/down button states of some rows and of the first and last rows"""
+        if self.current_sort != "custom":
+            return
+        count = self.list_widget.count()
+        for row in set(rows) | {0, count - 1}:
+            item = self.list_widget.item(row) if 0 <= row < count else None
+            if item is not None:
+                self.list_widget.itemWidget(item).set_buttons_enabled(row > 0, row < self.list_total - 1)
+    
+    def _update_remove_button(self):
+        """Enable the remove button only while a shown entry is selected"""
+        self.ui.pushButton_3.setEnabled(self.list_total > 0 and self.selected_id is not None)
+    
+    def on_entry_inserted(self, entry_id: int, position: int):
+        """Show an entry that has appeared in the store"""
+        self.list_total = len(self.store)
+        if self._is_row_shown(position):
+            entry = self.model.get_entry(entry_id)
+            if entry is not None:
+                self._insert_entry_item(position, entry)
+        self._update_row_buttons(position - 1, position + 1)
+        self._update_remove_button()
+    
+    def on_entry_removed(self, entry_id: int, position: int):
+        """Drop the row of an entry that has left the store"""
+        self.list_total = len(self.store)
+        if position < self.list_widget.count():
+            self.list_widget.takeItem(position)
+        if entry_id == self.selected_id:
+            self.selected_id = None
+        self._update_row_buttons(position - 1, position)
+        self._update_remove_button()
+    
+    def on_entry_updated(self, entry_id: int, position: int):
+        """Redraw the row of an entry whose fields have changed"""
+        item = self.list_widget.item(position)
+        if item is None:
+            return
+        entry = self.model.get_entry(entry_id)
+        if entry is not None:
+            self._set_entry_widget(item, entry)
+    
+    def on_entry_moved(self, entry_id: int, position: int, new_position: int):
+        """Move the row of an entry to its new position"""
+        item = self.list_widget.item(new_position)
+        if item is None or item.data(Qt.ItemDataRole.UserRole) != entry_id:
+            # Not already moved by a drag-and-drop, so move the row here
+            if position < self.list_widget.count():
+                self.list_widget.takeItem(position)
+            if self._is_row_shown(new_position):
+                entry = self.model.get_entry(entry_id)
+                if entry is not None:
+                    self._insert_entry_item(new_position, entry)
+                    if entry_id == self.selected_id:
+                        self.list_widget.setCurrentRow(new_position)
+        self._update_row_buttons(position - 1, position, new_position - 1, new_position, new_position + 1)
     
     def on_item_clicked(self, index: int):
         """Handle item click - show popup with details"""
-        self.selected_index = index
+        self.selected_id = self._entry_id_at(index)
         self.list_widget.setCurrentRow(index)
-        self.ui.pushButton_3.setEnabled(True)
+        self._update_remove_button()
         
         # Close the previous popup if it exists
         if self.current_popup is not None:
@@ -259,96 +442,83 @@ class MainWindow(QMainWindow):
             self.current_popup = None
         
         # Get the entry data
-        entries = self.model.get_sorted_entries(self.current_sort, self.search_query)
-        if index < len(entries):
-            entry = entries[index]
-            
+        entry = self._entry_at(index)
+        if entry is not None:
             # Create and show the popup dialog (non-modal)
-            self.current_popup = ItemPopupDialog(
-                index,
-                entry['name'],
-                entry['username'],
-                entry.get('password', ''),
-                entry.get('url', ''),
-                parent=self,
-                model=self.model
-            )
+            self.current_popup = ItemPopupDialog(index, entry, parent=self, model=self.model)
             # Connect the close event to clear our reference
             self.current_popup.finished.connect(lambda: setattr(self, 'current_popup', None))
             self.current_popup.show()  # Use show() instead of exec() for non-modal dialog
     
-    def move_item_up(self, index: int):
+    def move_item_up(self, entry_id: int):
         """Move item up in custom order"""
         if self.current_sort != "custom":
             QMessageBox.warning(self, "Error", "Items can only be reordered in Custom Order mode")
             return
         
-        if index <= 0:
+        # Bounds-check against the full custom order (no search filter for reordering)
+        if not self.model.has_previous_entry(entry_id):
             return
         
-        # Get all entries in custom order (no search filter for reordering)
-        all_entries = self.model.get_password_entries()
-        if index >= len(all_entries):
-            return
-        
-        # Move in model
-        if self.model.move_entry_up(index):
-            # Update selection
-            if self.selected_index == index:
-                self.selected_index = index - 1
-            self.refresh_list()
+        # The store moves the row once the model has been updated
+        self.store.move_entry_up(entry_id)
     
-    def move_item_down(self, index: int):
+    def move_item_down(self, entry_id: int):
         """Move item down in custom order"""
         if self.current_sort != "custom":
             QMessageBox.warning(self, "Error", "Items can only be reordered in Custom Order mode")
             return
         
-        # Get all entries in custom order (no search filter for reordering)
-        all_entries = self.model.get_password_entries()
-        if index < 0 or index >= len(all_entries) - 1:
+        # Bounds-check against the full custom order (no search filter for reordering)
+        if not self.model.has_next_entry(entry_id):
             return
         
-        # Move in model
-        if self.model.move_entry_down(index):
-            # Update selection
-            if self.selected_index == index:
-                self.selected_index = index + 1
-            self.refresh_list()
+        # The store moves the row once the model has been updated
+        self.store.move_entry_down(entry_id)
+    
+    def _entry_id_at(self, index: int):
+        """Get the entry id shown at a row of the list, or None"""
+        item = self.list_widget.item(index) if index >= 0 else None
+        return item.data(Qt.ItemDataRole.UserRole) if item is not None else None
+    
+    def _entry_at(self, index: int):
+        """Get the entry record shown at a row of the list, or None"""
+        item = self.list_widget.item(index) if index >= 0 else None
+        if item is None:
+            return None
+        return self.list_widget.itemWidget(item).entry
+    
+    def on_rows_moved(self, parent, start: int, end: int, destination, row: int):
+        """Persist a drag-and-drop reorder as a single move in the model"""
+        # Qt reports the destination before the moved row is taken out
+        new_row = row if row < start else row - 1
+        moved_item = self.list_widget.item(new_row)
+        if moved_item is None or self.list_widget.count() < 2:
+            return
+        
+        entry_id = moved_item.data(Qt.ItemDataRole.UserRole)
+        next_item = self.list_widget.item(new_row + 1)
+        if next_item is not None:
+            self.store.move_entry(entry_id, before_id=next_item.data(Qt.ItemDataRole.UserRole))
+        else:
+            previous_item = self.list_widget.item(new_row - 1)
+            self.store.move_entry(entry_id, after_id=previous_item.data(Qt.ItemDataRole.UserRole))
     
     def add_new_item(self):
         """Open the new item window"""
         from ViewModel.NewItem import NewItemWindow
         new_item_window = NewItemWindow(self.model, self)
         if new_item_window.exec():
-            # Refresh the list after adding
-            self.refresh_list()
+            # Show the new entry where it belongs in the list
+            self.store.refresh_entry(new_item_window.entry_id)
     
-    def edit_item(self, index: int):
+    def edit_item(self, entry_id: int):
         """Edit an existing password entry"""
         from ViewModel.NewItem import NewItemWindow
         
-        # Get the current sorted/filtered entries
-        entries = self.model.get_sorted_entries(self.current_sort, self.search_query)
-        
-        if index < 0 or index >= len(entries):
-            QMessageBox.warning(self, "Error", "Invalid item index")
-            return
-        
-        # Get the entry data
-        entry_data = entries[index]
-        
-        # Find the actual index in the unfiltered list (for updating)
-        all_entries = self.model.get_sorted_entries("custom", "")
-        actual_index = None
-        for i, e in enumerate(all_entries):
-            if (e['name'] == entry_data['name'] and 
-                e['username'] == entry_data['username'] and
-                e['custom_order'] == entry_data['custom_order']):
-                actual_index = i
-                break
-        
-        if actual_index is None:
+        # Get the current record for this entry
+        entry_data = self.model.get_entry(entry_id)
+        if entry_data is None:
             QMessageBox.warning(self, "Error", "Could not find entry to edit")
             return
         
@@ -357,61 +527,253 @@ class MainWindow(QMainWindow):
             self.model, 
             self, 
             edit_mode=True, 
-            edit_index=actual_index, 
             entry_data=entry_data
         )
         
         if edit_window.exec():
-            # Refresh the list after editing
-            self.refresh_list()
+            # Redraw the edited row and move it if its sort position changed
+            self.store.refresh_entry(entry_id, updated=True)
     
     def remove_selected_item(self):
         """Remove the selected password entry"""
-        if self.selected_index < 0:
+        if self.selected_id is None:
             QMessageBox.warning(self, "Error", "No item selected")
             return
         
-        # Get the filtered entries
-        entries = self.model.get_sorted_entries(self.current_sort, self.search_query)
+        entry = self.model.get_entry(self.selected_id)
         
-        if 0 <= self.selected_index < len(entries):
-            entry = entries[self.selected_index]
+        if entry is not None:
             reply = QMessageBox.question(
                 self,
                 "Confirm Deletion",
-                f"Are you sure you want to delete '{entry['name']}'?\nThis action cannot be reversed.",
+                f"Move '{entry.name}' to the trash?\nYou can undo this with {self._undo_shortcut()}.",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
             )
             
             if reply == QMessageBox.StandardButton.Yes:
-                # Find actual index in full list
-                all_entries = self.model.get_password_entries()
-                actual_index = all_entries.index(entry)
-                
-                self.model.delete_password_entry(actual_index)
-                self.selected_index = -1
-                self.refresh_list()
+                self.store.delete_entry(entry.id)
+                self.selected_id = None
+                self._update_remove_button()
     
     def remove_all_passwords(self):
         """Remove all password entries"""
-        entries = self.model.get_password_entries()
+        entry_count = self.model.count_entries()
         
-        if not entries:
+        if not entry_count:
             QMessageBox.information(self, "Info", "No passwords to remove")
             return
         
+        if self.model.can_undo(entry_count):
+            note = f"You can undo this with {self._undo_shortcut()}."
+        else:
+            note = "This is too large to undo, but the entries can be restored from the trash."
         reply = QMessageBox.question(
             self,
             "Confirm Deletion",
-            f"Are you sure you want to delete ALL {len(entries)} password(s)?\nThis action cannot be reversed.",
+            f"Move ALL {entry_count} password(s) to the trash?\n{note}",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            self.model.delete_all_entries()
-            self.selected_index = -1
+            self.selected_id = None
+            self.store.delete_all_entries()
+            QMessageBox.information(self, "Success", "All passwords have been moved to the trash")
+    
+    def _undo_shortcut(self) -> str:
+        """Get the undo shortcut as shown to the user"""
+        return self.undo_action.shortcut().toString(QKeySequence.SequenceFormat.NativeText)
+    
+    def _update_undo_actions(self):
+        """Name the change that undo and redo would act on"""
+        undo_label, redo_label = self.model.undo_label(), self.model.redo_label()
+        self.undo_action.setText(f"Undo {undo_label}" if undo_label else "Undo")
+        self.undo_action.setEnabled(undo_label is not None)
+        self.redo_action.setText(f"Redo {redo_label}" if redo_label else "Redo")
+        self.redo_action.setEnabled(redo_label is not None)
+    
+    def _enable_undo_actions(self):
+        """Keep the shortcuts live once the menu closes; undo and redo check for themselves"""
+        self.undo_action.setEnabled(True)
+        self.redo_action.setEnabled(True)
+    
+    def undo(self):
+        """Revert the latest change made in this session"""
+        if self.store.undo() is None:
+            QApplication.beep()
+        self._update_remove_button()
+    
+    def redo(self):
+        """Apply the latest undone change again"""
+        if self.store.redo() is None:
+            QApplication.beep()
+        self._update_remove_button()
+    
+    def start_backup(self, manual: bool):
+        """Back up the vault in the background"""
+        self.backup_action.setEnabled(False)
+        self.model.start_backup(
+            force=manual,
+            finished=lambda report: self.backup_finished.emit(report, manual)
+        )
+    
+    def on_backup_finished(self, report, manual: bool):
+        """Report the outcome of a backup the user asked for"""
+        self.backup_action.setEnabled(True)
+        if not manual:
+            return
+        if report.error:
+            QMessageBox.warning(self, "Error", f"Backup failed: {report.error}")
+        else:
+            QMessageBox.information(
+                self,
+                "Backup Complete",
+                f"Vault backed up to:\n{report.path}\n\n"
+                f"{report.bytes_done / 1024:.0f} KiB in {report.elapsed:.2f} s "
+                f"({report.throughput / (1024 * 1024):.1f} MiB/s)"
+            )
+    
+    def _ask_passphrase(self, title: str, label: str):
+        """Prompt for an archive passphrase, returning None if cancelled"""
+        passphrase, ok = QInputDialog.getText(self, title, label, QLineEdit.EchoMode.Password)
+        return passphrase if ok else None
+    
+    def export_vault(self):
+        """Export all entries to an encrypted archive file"""
+        path, _ = QFileDialog.getSaveFileName(self, "Export Vault", "vault.pvarchive", "Vault archives (*.pvarchive)")
+        if not path:
+            return
+        
+        passphrase = self._ask_passphrase("Export Vault", "Passphrase to protect the archive:")
+        if passphrase is None:
+            return
+        if self._ask_passphrase("Export Vault", "Repeat the passphrase:") != passphrase:
+            QMessageBox.warning(self, "Error", "Passphrases do not match")
+            return
+        
+        success, message = self.model.export_vault(path, passphrase)
+        if success:
+            QMessageBox.information(self, "Export Complete", message)
+        else:
+            QMessageBox.warning(self, "Error", message)
+    
+    def import_vault(self):
+        """Import entries from an encrypted archive file"""
+        path, _ = QFileDialog.getOpenFileName(self, "Import Vault", "", "Vault archives (*.pvarchive);;All files (*)")
+        if not path:
+            return
+        
+        passphrase = self._ask_passphrase("Import Vault", "Archive passphrase:")
+        if passphrase is None:
+            return
+        
+        success, message = self.model.import_vault(path, passphrase)
+        if success:
             self.refresh_list()
-            QMessageBox.information(self, "Success", "All passwords have been removed")
+            QMessageBox.information(self, "Import Complete", message)
+        else:
+            QMessageBox.warning(self, "Error", message)
+    
+    def import_csv(self):
+        """Import a CSV export from a browser or another password manager"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import from CSV", "", "CSV files (*.csv);;All files (*)"
+        )
+        if path:
+            self._show_import_report(self.model.import_csv(path))
+    
+    def import_json(self):
+        """Import a Bitwarden or 1Password JSON export"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import from JSON", "", "JSON exports (*.json *.data);;All files (*)"
+        )
+        if path:
+            self._show_import_report(self.model.import_json(path))
+    
+    def _show_import_report(self, report):
+        """Reload the list and show how a bulk import went"""
+        self.refresh_list()
+        if report.error:
+            QMessageBox.warning(self, "Error", report.summary())
+        else:
+            QMessageBox.information(self, "Import Complete", report.summary())
+    
+    def check_breached_passwords(self):
+        """List the entries whose password appears in the offline breach database"""
+        if not self.model.has_breach_database():
+            QMessageBox.information(
+                self,
+                "Breach Check",
+                "No breach database is installed. Convert a Have I Been Pwned SHA-1 dump with\n"
+                "python -m model.BreachChecker <dump> <output>\nand place it at:\n"
+                f"{self.model.breach_database_path()}"
+            )
+            return
+        
+        entry_ids = self.model.find_breached_entries()
+        if not entry_ids:
+            QMessageBox.information(self, "Breach Check", "None of your passwords appear in a known data breach.")
+            return
+        names = [entry.name for entry in map(self.model.get_entry, entry_ids[:20]) if entry]
+        if len(entry_ids) > 20:
+            names.append(f"... and {len(entry_ids) - 20} more")
+        QMessageBox.warning(
+            self,
+            "Breach Check",
+            f"{len(entry_ids)} of your passwords appear in a known data breach and should be changed:\n\n"
+            + "\n".join(names)
+        )
+    
+    def show_vault_health(self):
+        """Show counts of entries with problems and filter the list to the chosen kind"""
+        summary = self.model.audit_summary()
+        if summary.unaudited:
+            self.model.refresh_audit()
+            summary = self.model.audit_summary()
+        if summary.healthy:
+            QMessageBox.information(self, "Vault Health", f"All {summary.total} entries look healthy.")
+            return
+        
+        choices = [
+            (f"Weak passwords ({summary.weak})", "is:weak"),
+            (f"Reused passwords ({summary.reused})", "is:reused"),
+            (f"Passwords older than a year ({summary.old})", "is:old"),
+            (f"Breached passwords ({summary.breached})", "is:breached"),
+        ]
+        label, ok = QInputDialog.getItem(
+            self, "Vault Health", f"{summary.total} entries. Show:", [label for label, _ in choices], 0, False
+        )
+        if ok:
+            self.ui.lineEdit.setText(dict(choices)[label])
+    
+    def rotate_passwords(self):
+        """Rotate the passwords of the entries matching a filter, starting from the current search"""
+        dialog = RotationDialog(self.model, self.ui.lineEdit.text(), self)
+        dialog.exec()
+        if dialog.rotated:
+            self.refresh_list()
+    
+    def show_trash(self):
+        """List deleted entries to restore or remove them for good"""
+        dialog = TrashDialog(self.model, self)
+        dialog.exec()
+        if dialog.restored:
+            self.refresh_list()
+    
+    def edit_history_retention(self):
+        """Choose how many earlier versions of each entry are kept, and for how long"""
+        max_versions, retention_days = self.model.get_history_retention()
+        max_versions, ok = QInputDialog.getInt(
+            self, "History Retention", "Earlier versions kept per entry (0 for all):", max_versions, 0, 10000
+        )
+        if not ok:
+            return
+        retention_days, ok = QInputDialog.getInt(
+            self, "History Retention", "Days to keep earlier versions (0 for ever):", int(retention_days), 0, 36500
+        )
+        if not ok:
+            return
+        if not self.model.set_history_retention(max_versions, retention_days):
+            QMessageBox.warning(self, "Error", "Could not save the history retention")
     
     def handle_logout(self):
         """Handle logout"""
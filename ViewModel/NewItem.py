@@ -1,17 +1,22 @@
-from PySide6.QtWidgets import QDialog, QMessageBox
+from PySide6.QtWidgets import QDialog, QHBoxLayout, QMessageBox, QPushButton
 from View.NewItem_ui import Ui_Dialog
+from ViewModel.PolicyDialog import PolicyDialog
+from ViewModel.StrengthMeter import StrengthMeter
+from model import PasswordGenerator
+from model.PasswordGenerator import PolicyError
+from model.PolicyService import PolicyService
 
 
 class NewItemWindow(QDialog):
     """New item window ViewModel"""
     
-    def __init__(self, model, parent=None, edit_mode=False, edit_index=None, entry_data=None):
+    def __init__(self, model, parent=None, edit_mode=False, entry_data=None):
         super().__init__(parent)
         self.ui = Ui_Dialog()
         self.ui.setupUi(self)
         self.model = model
         self.edit_mode = edit_mode
-        self.edit_index = edit_index
+        self.entry_id = entry_data.id if edit_mode and entry_data else None  # Set to the new id after adding
         
         # Connect buttons
         self.ui.pushButton.clicked.connect(self.handle_add)
@@ -23,6 +28,25 @@ class NewItemWindow(QDialog):
         # Press Enter to add (from last field)
         self.ui.lineEdit_4.returnPressed.connect(self.handle_add)
         
+        # Live strength meter under the password field; the other fields count as guessable words
+        self.strength_meter = StrengthMeter(self)
+        self.ui.verticalLayout.insertWidget(
+            self.ui.verticalLayout.indexOf(self.ui.groupBox_3) + 1, self.strength_meter
+        )
+        for line_edit in (self.ui.lineEdit, self.ui.lineEdit_2, self.ui.lineEdit_3, self.ui.lineEdit_4):
+            line_edit.textChanged.connect(self.update_strength)
+        
+        # One-click generation with the policy saved for this entry or its site
+        self.pending_policy = None  # Policy chosen for a new entry, saved once the entry exists
+        self.generate_button = QPushButton("Generate", self)
+        self.generate_button.clicked.connect(self.generate_password)
+        self.policy_button = QPushButton("Policy...", self)
+        self.policy_button.clicked.connect(self.edit_policy)
+        generate_row = QHBoxLayout()
+        generate_row.addWidget(self.generate_button)
+        generate_row.addWidget(self.policy_button)
+        self.ui.verticalLayout.insertLayout(self.ui.verticalLayout.indexOf(self.strength_meter) + 1, generate_row)
+        
         # If in edit mode, pre-fill the fields
         if edit_mode and entry_data:
             self.ui.lineEdit.setText(entry_data.get('name', ''))
@@ -31,6 +55,53 @@ class NewItemWindow(QDialog):
             self.ui.lineEdit_4.setText(entry_data.get('url', ''))
             self.setWindowTitle("Edit Password Entry")
     
+    def update_strength(self):
+        """Rescore the password as the user types"""
+        self.strength_meter.set_password(
+            self.ui.lineEdit_3.text(),
+            (self.ui.lineEdit.text(), self.ui.lineEdit_2.text(), self.ui.lineEdit_4.text())
+        )
+    
+    def current_policy(self):
+        """Get the generator policy for this entry, falling back to its site's"""
+        if self.pending_policy is not None:
+            return self.pending_policy
+        return self.model.get_generator_policy(self.entry_id, self.ui.lineEdit_4.text().strip())
+    
+    def generate_password(self):
+        """Replace the password with one generated by the entry's policy"""
+        try:
+            password = PasswordGenerator.generate(self.current_policy())
+        except PolicyError as e:
+            QMessageBox.warning(self, "Error", f"Cannot generate a password: {e}")
+            return
+        self.ui.lineEdit_3.setText(password)
+    
+    def edit_policy(self):
+        """Edit and save the generator policy for this entry or its site, then generate with it"""
+        url = self.ui.lineEdit_4.text().strip()
+        dialog = PolicyDialog(self.current_policy(), PolicyService.site_of(url), self)
+        if dialog.exec() != QDialog.Accepted:
+            return
+        
+        policy = dialog.policy()
+        if dialog.scope() == "site":
+            saved = self.model.save_generator_policy(policy, url=url)
+            # The entry follows its site from now on
+            self.pending_policy = None
+            if saved and self.entry_id is not None:
+                self.model.delete_generator_policy(entry_id=self.entry_id)
+        elif self.entry_id is not None:
+            saved = self.model.save_generator_policy(policy, entry_id=self.entry_id)
+        else:
+            self.pending_policy = policy
+            saved = True
+        
+        if not saved:
+            QMessageBox.warning(self, "Error", "Failed to save password policy")
+            return
+        self.generate_password()
+    
     def handle_add(self):
         """Handle add/update button click"""
         name = self.ui.lineEdit.text().strip()
@@ -51,11 +122,17 @@ class NewItemWindow(QDialog):
             QMessageBox.warning(self, "Error", "Please enter a password")
             return
         
+        if not self.confirm_reused_password(password) or not self.confirm_breached_password(password):
+            return
+        
         # Update or add the entry based on mode
         if self.edit_mode:
-            success = self.model.update_password_entry(self.edit_index, name, username, password, url)
+            success = self.model.update_entry(self.entry_id, name, username, password, url)
         else:
-            success = self.model.add_password_entry(name, username, password, url)
+            self.entry_id = self.model.add_entry(name, username, password, url)
+            success = self.entry_id is not None
+            if success and self.pending_policy is not None:
+                self.model.save_generator_policy(self.pending_policy, entry_id=self.entry_id)
         
         if success:
             self.accept()  # Close dialog with success
@@ -63,6 +140,32 @@ class NewItemWindow(QDialog):
             action = "update" if self.edit_mode else "add"
             QMessageBox.warning(self, "Error", f"Failed to {action} password entry")
     
+    def confirm_reused_password(self, password):
+        """Ask before saving a password that other entries already use"""
+        others = self.model.find_entries_using_password(password, exclude_id=self.entry_id)
+        if not others:
+            return True
+        names = ", ".join(f"'{entry.name}'" for entry in others[:5])
+        if len(others) > 5:
+            names += f" and {len(others) - 5} more"
+        reply = QMessageBox.question(
+            self, "Reused Password",
+            f"This password is already used by {names}. Save anyway?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        return reply == QMessageBox.Yes
+    
+    def confirm_breached_password(self, password):
+        """Ask before saving a password that appears in the offline breach database"""
+        if not self.model.is_password_breached(password):
+            return True
+        reply = QMessageBox.question(
+            self, "Breached Password",
+            "This password appears in a known data breach and may be tried by attackers. Save anyway?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        return reply == QMessageBox.Yes
+    
     def handle_cancel(self):
         """Handle cancel button click"""
         self.reject()  # Close dialog without success
@@ -1,8 +1,12 @@
-from PySide6.QtWidgets import QWidget, QApplication
+from PySide6.QtWidgets import QWidget, QApplication, QCheckBox, QComboBox, QHBoxLayout, QLabel, QLineEdit
 from PySide6.QtCore import QByteArray, QTimer
 from PySide6.QtGui import QIcon, QPixmap, QPainter, QColor
 from PySide6.QtSvg import QSvgRenderer
 from View.PasswordGenerator_ui import Ui_Form
+from ViewModel.StrengthMeter import StrengthMeter
+from model import Passphrase, PasswordGenerator
+from model.Passphrase import PassphrasePolicy
+from model.PasswordGenerator import GeneratorPolicy
 import re
 
 
@@ -17,8 +21,38 @@ class PasswordGeneratorWidget(QWidget):
         # Set theme-aware icons
         self._set_theme_icons()
         
+        # Strength of the generated password, under it
+        self.strength_meter = StrengthMeter(self)
+        self.ui.verticalLayout_3.insertWidget(1, self.strength_meter)
+        self.entropy_label = QLabel(self)
+        self.ui.verticalLayout_3.insertWidget(2, self.entropy_label)
+        
+        # Password or passphrase, above the generated password
+        self.mode_box = QComboBox(self)
+        self.mode_box.addItems(["Password", "Passphrase"])
+        self.mode_box.setVisible(Passphrase.available())
+        self.ui.verticalLayout_3.insertWidget(0, self.mode_box)
+        
+        # Passphrase options, shown in place of the character classes (before the bottom spacer)
+        self.passphrase_options = QWidget(self)
+        options_layout = QHBoxLayout(self.passphrase_options)
+        options_layout.setContentsMargins(0, 0, 0, 0)
+        options_layout.addWidget(QLabel("Separator", self.passphrase_options))
+        self.separator_edit = QLineEdit("-", self.passphrase_options)
+        self.separator_edit.setMaxLength(3)
+        self.separator_edit.setFixedWidth(40)
+        options_layout.addWidget(self.separator_edit)
+        self.capitalize_box = QCheckBox("Capitalise", self.passphrase_options)
+        options_layout.addWidget(self.capitalize_box)
+        self.digit_box = QCheckBox("Add digit", self.passphrase_options)
+        options_layout.addWidget(self.digit_box)
+        options_layout.addStretch()
+        self.passphrase_options.setVisible(False)
+        self.ui.verticalLayout_3.insertWidget(self.ui.verticalLayout_3.count() - 1, self.passphrase_options)
+        
         # Initialize password length
         self.password_length = 12  # Default length
+        self.word_count = 6  # Default passphrase length
         self.ui.label_2.setText(str(self.password_length))
         
         # Connect copy button
@@ -35,6 +69,12 @@ class PasswordGeneratorWidget(QWidget):
         self.ui.checkBox_3.toggled.connect(self.generate_password)  # 0-9
         self.ui.checkBox_4.toggled.connect(self.generate_password)  # Special chars
         
+        # Connect passphrase controls
+        self.mode_box.currentIndexChanged.connect(self.switch_mode)
+        self.separator_edit.textChanged.connect(self.generate_password)
+        self.capitalize_box.toggled.connect(self.generate_password)
+        self.digit_box.toggled.connect(self.generate_password)
+        
         # Generate initial password
         self.generate_password()
     
@@ -102,77 +142,78 @@ class PasswordGeneratorWidget(QWidget):
         # Reset tooltip after delay
         QTimer.singleShot(1500, restore_tooltip)
     
+    def passphrase_mode(self) -> bool:
+        """Whether passphrases are generated instead of passwords"""
+        return self.mode_box.currentIndex() == 1
+    
+    def switch_mode(self):
+        """Swap the character options for the passphrase options and regenerate"""
+        passphrase = self.passphrase_mode()
+        for widget in (self.ui.label_5, self.ui.checkBox, self.ui.checkBox_2, self.ui.checkBox_3, self.ui.checkBox_4):
+            widget.setVisible(not passphrase)
+        self.passphrase_options.setVisible(passphrase)
+        self.ui.label_3.setText("Words" if passphrase else "Length")
+        self.ui.label_2.setText(str(self.word_count if passphrase else self.password_length))
+        self.generate_password()
+    
     def generate_password(self):
         """Generate a new password based on selected options"""
-        import random
-        import string
-        
-        # Build character sets for each category
-        categories = []
-        all_chars = ""
-        
-        if self.ui.checkBox.isChecked():  # A-Z
-            uppercase = string.ascii_uppercase
-            categories.append(uppercase)
-            all_chars += uppercase
-        
-        if self.ui.checkBox_2.isChecked():  # a-z
-            lowercase = string.ascii_lowercase
-            categories.append(lowercase)
-            all_chars += lowercase
-        
-        if self.ui.checkBox_3.isChecked():  # 0-9
-            digits = string.digits
-            categories.append(digits)
-            all_chars += digits
-        
-        if self.ui.checkBox_4.isChecked():  # Special characters
-            special = "!@#$%^&*"  # Only the specific characters shown in label
-            categories.append(special)
-            all_chars += special
-        
-        # If no character types selected, use all
-        if not categories:
-            uppercase = string.ascii_uppercase
-            lowercase = string.ascii_lowercase
-            digits = string.digits
-            special = "!@#$%^&*"
-            categories = [uppercase, lowercase, digits, special]
-            all_chars = uppercase + lowercase + digits + special
-        
-        # Ensure password is long enough for at least one char from each category
-        length = max(self.password_length, len(categories))
-        
-        # Start with one character from each selected category
-        password_chars = []
-        for category in categories:
-            password_chars.append(random.choice(category))
-        
-        # Fill remaining length with random characters from all categories
-        remaining_length = length - len(categories)
-        for _ in range(remaining_length):
-            password_chars.append(random.choice(all_chars))
-        
-        # Shuffle to avoid predictable pattern
-        random.shuffle(password_chars)
-        
-        password = ''.join(password_chars)
-        
-        # Insert line breaks every 20 characters
-        formatted_password = '\n'.join(password[i:i+20] for i in range(0, len(password), 20))
+        if self.passphrase_mode():
+            policy = PassphrasePolicy(
+                words=self.word_count,
+                separator=self.separator_edit.text(),
+                capitalize=self.capitalize_box.isChecked(),
+                digit=self.digit_box.isChecked(),
+            )
+            password = Passphrase.generate(policy)
+            entropy = Passphrase.entropy_bits(policy)
+            formatted_password = self._wrap_words(password, policy.separator)
+        else:
+            policy = GeneratorPolicy(
+                length=self.password_length,
+                uppercase=self.ui.checkBox.isChecked(),    # A-Z
+                lowercase=self.ui.checkBox_2.isChecked(),  # a-z
+                digits=self.ui.checkBox_3.isChecked(),     # 0-9
+                symbols=self.ui.checkBox_4.isChecked(),    # Only the special characters shown in the label
+            )
+            password = PasswordGenerator.generate(policy)
+            entropy = PasswordGenerator.entropy_bits(policy)
+            # Insert line breaks every 20 characters
+            formatted_password = '\n'.join(password[i:i+20] for i in range(0, len(password), 20))
         
         self.ui.label.setText(formatted_password)
+        self.strength_meter.set_password(password)
+        self.entropy_label.setText(f"{entropy:.1f} bits of entropy")
+    
+    @staticmethod
+    def _wrap_words(passphrase: str, separator: str, width: int = 20) -> str:
+        """Break a passphrase into lines after separators; copying strips the line breaks again"""
+        if not separator:
+            return '\n'.join(passphrase[i:i+width] for i in range(0, len(passphrase), width))
+        parts = passphrase.split(separator)
+        lines = [""]
+        for piece in [part + separator for part in parts[:-1]] + parts[-1:]:
+            if lines[-1] and len(lines[-1]) + len(piece) > width:
+                lines.append("")
+            lines[-1] += piece
+        return '\n'.join(lines)
     
     def increase_length(self):
         """Increase password length"""
-        if self.password_length < 64:  # Max length
-            self.password_length += 1
-            self.ui.label_2.setText(str(self.password_length))
-            self.generate_password()
+        self._adjust_length(1)
     
     def decrease_length(self):
         """Decrease password length"""
-        if self.password_length > 4:  # Min length
-            self.password_length -= 1
-            self.ui.label_2.setText(str(self.password_length))
-            self.generate_password()
+        self._adjust_length(-1)
+    
+    def _adjust_length(self, step: int):
+        """Change the password length or passphrase word count within its limits"""
+        if self.passphrase_mode():
+            self.word_count = min(max(self.word_count + step, Passphrase.MIN_WORDS), Passphrase.MAX_WORDS)
+            value = self.word_count
+        else:
+            self.password_length = min(max(self.password_length + step, PasswordGenerator.MIN_LENGTH),
+                                       PasswordGenerator.MAX_LENGTH)
+            value = self.password_length
+        self.ui.label_2.setText(str(value))
+        self.generate_password()
@@ -10,37 +10,33 @@ import re
 class PasswordItemWidget(QWidget):
     """Custom widget for displaying a password entry with up/down buttons"""
     
-    move_up_clicked = Signal(int)  # Emits the index
+    move_up_clicked = Signal(int)  # Emits the entry id
     move_down_clicked = Signal(int)
-    item_clicked = Signal(int)
-    edit_clicked = Signal(int)  # Emits the index for editing
+    edit_clicked = Signal(int)  # Emits the entry id for editing
     
-    def __init__(self, index: int, name: str, username: str, password: str = "", url: str = "", parent=None, model=None):
+    def __init__(self, entry, parent=None, model=None):
         super().__init__(parent)
         self.ui = Ui_Form()
         self.ui.setupUi(self)
         
-        self.index = index
-        self.name = name
-        self.username = username
-        self.password = password
-        self.url = url
+        self.entry = entry  # VaultEntry record shown by this row
         self.model = model
         
         # Set the text content
-        self.ui.nameLabel.setText(name)
-        self.ui.label_3.setText(url if url else "No URL")  # URL label
+        self.ui.nameLabel.setText(entry.name)
+        self.ui.label_3.setText(entry.url if entry.url else "No URL")  # URL label
         
         # Set theme-aware icons
         self._set_theme_icons()
         
         # Connect button signals
-        self.ui.upButton.clicked.connect(lambda: self.move_up_clicked.emit(self.index))
-        self.ui.downButton.clicked.connect(lambda: self.move_down_clicked.emit(self.index))
-        self.ui.toolButton_5.clicked.connect(lambda: self.edit_clicked.emit(self.index))
-        
-        # Make the whole widget clickable
-        self.mousePressEvent = lambda event: self.item_clicked.emit(self.index)
+        self.ui.upButton.clicked.connect(lambda: self.move_up_clicked.emit(self.entry.id))
+        self.ui.downButton.clicked.connect(lambda: self.move_down_clicked.emit(self.entry.id))
+        self.ui.toolButton_5.clicked.connect(lambda: self.edit_clicked.emit(self.entry.id))
+    
+    def mousePressEvent(self, event):
+        """Pass presses on to the list so the item can be clicked or dragged"""
+        event.ignore()
     
     def _recolor_svg_icon(self, svg_path: str, color: QColor, size: int = 16) -> QIcon:
         """Recolor an SVG icon to match the theme"""
@@ -95,7 +91,3 @@ class PasswordItemWidget(QWidget):
         """Show/hide up and down buttons"""
         self.ui.upButton.setVisible(visible)
         self.ui.downButton.setVisible(visible)
-    
-    def update_index(self, new_index: int):
-        """Update the stored index"""
-        self.index = new_index
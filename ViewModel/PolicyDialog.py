@@ -0,0 +1,129 @@
+from PySide6.QtWidgets import (QDialog, QDialogButtonBox, QCheckBox, QComboBox, QFormLayout, QGridLayout,
+                               QLabel, QLineEdit, QSpinBox, QVBoxLayout)
+from model import PasswordGenerator
+from model.PasswordGenerator import CLASS_NAMES, GeneratorPolicy, PolicyError
+
+
+class PolicyDialog(QDialog):
+    """Edits a password generator policy and where it is saved, with a live entropy preview"""
+    
+    CLASS_LABELS = ("A-Z", "a-z", "0-9", "Symbols")
+    
+    def __init__(self, policy: GeneratorPolicy, site: str = "", parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Password Policy")
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+        layout.addLayout(form)
+        
+        self.template_edit = QLineEdit(policy.template, self)
+        self.template_edit.setPlaceholderText("Optional, e.g. ?u?l?l?l-?d?d?d?d")
+        self.template_edit.setToolTip("?u A-Z, ?l a-z, ?d 0-9, ?s symbol, ?a any, ?? a question mark")
+        form.addRow("Template", self.template_edit)
+        
+        self.length_spin = QSpinBox(self)
+        self.length_spin.setRange(PasswordGenerator.MIN_LENGTH, PasswordGenerator.MAX_LENGTH)
+        self.length_spin.setValue(min(max(policy.length, PasswordGenerator.MIN_LENGTH), PasswordGenerator.MAX_LENGTH))
+        form.addRow("Length", self.length_spin)
+        
+        # One row per class: use it, fewest and most characters ("Any" for no limit)
+        grid = QGridLayout()
+        grid.addWidget(QLabel("Min", self), 0, 1)
+        grid.addWidget(QLabel("Max", self), 0, 2)
+        self.class_boxes, self.min_spins, self.max_spins = [], [], []
+        for row, (label, enabled, (minimum, maximum)) in enumerate(
+                zip(self.CLASS_LABELS, policy.enabled(), policy.bounds()), start=1):
+            box = QCheckBox(label, self)
+            box.setChecked(enabled)
+            min_spin = QSpinBox(self)
+            min_spin.setRange(0, PasswordGenerator.MAX_TEMPLATE_LENGTH)
+            min_spin.setValue(minimum)
+            max_spin = QSpinBox(self)
+            max_spin.setRange(-1, PasswordGenerator.MAX_TEMPLATE_LENGTH)
+            max_spin.setSpecialValueText("Any")
+            max_spin.setValue(-1 if maximum is None else maximum)
+            grid.addWidget(box, row, 0)
+            grid.addWidget(min_spin, row, 1)
+            grid.addWidget(max_spin, row, 2)
+            self.class_boxes.append(box)
+            self.min_spins.append(min_spin)
+            self.max_spins.append(max_spin)
+        form.addRow("Characters", grid)
+        
+        self.symbols_edit = QLineEdit(policy.symbol_chars, self)
+        form.addRow("Symbols", self.symbols_edit)
+        self.ambiguous_box = QCheckBox("Exclude look-alikes (Il1|O0o)", self)
+        self.ambiguous_box.setChecked(policy.exclude_ambiguous)
+        form.addRow("", self.ambiguous_box)
+        self.repeats_box = QCheckBox("No character twice in a row", self)
+        self.repeats_box.setChecked(policy.no_repeats)
+        form.addRow("", self.repeats_box)
+        
+        self.scope_box = QComboBox(self)
+        self.scope_box.addItem("This entry", "entry")
+        if site:
+            self.scope_box.addItem(f"All entries for {site}", "site")
+        form.addRow("Save for", self.scope_box)
+        
+        self.preview_label = QLabel(self)
+        self.preview_label.setWordWrap(True)
+        layout.addWidget(self.preview_label)
+        
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Cancel, self)
+        self.buttons.accepted.connect(self.accept)
+        self.buttons.rejected.connect(self.reject)
+        layout.addWidget(self.buttons)
+        
+        # Keep the preview live
+        self._templated = bool(policy.template)
+        self.template_edit.textChanged.connect(self.update_preview)
+        self.symbols_edit.textChanged.connect(self.update_preview)
+        for spin in [self.length_spin, *self.min_spins, *self.max_spins]:
+            spin.valueChanged.connect(self.update_preview)
+        for box in [*self.class_boxes, self.ambiguous_box, self.repeats_box]:
+            box.toggled.connect(self.update_preview)
+        self.update_preview()
+    
+    def policy(self) -> GeneratorPolicy:
+        """Get the policy described by the dialog"""
+        return GeneratorPolicy(
+            length=self.length_spin.value(),
+            uppercase=self.class_boxes[0].isChecked(),
+            lowercase=self.class_boxes[1].isChecked(),
+            digits=self.class_boxes[2].isChecked(),
+            symbols=self.class_boxes[3].isChecked(),
+            symbol_chars=self.symbols_edit.text(),
+            # Unselected classes only appear through template placeholders, so need none
+            minimums={name: spin.value() if box.isChecked() else 0
+                      for name, box, spin in zip(CLASS_NAMES, self.class_boxes, self.min_spins)},
+            maximums={name: spin.value() for name, spin in zip(CLASS_NAMES, self.max_spins) if spin.value() >= 0},
+            exclude_ambiguous=self.ambiguous_box.isChecked(),
+            no_repeats=self.repeats_box.isChecked(),
+            template=self.template_edit.text(),
+        )
+    
+    def scope(self) -> str:
+        """Get where to save the policy: "entry" or "site\""""
+        return self.scope_box.currentData()
+    
+    def update_preview(self):
+        """Show a sample password and the exact entropy, or why the policy cannot be met"""
+        templated = bool(self.template_edit.text())
+        self.length_spin.setEnabled(not templated)
+        if templated != self._templated:
+            # Templates place each class explicitly, so no class needs a minimum by default
+            self._templated = templated
+            for box, spin in zip(self.class_boxes, self.min_spins):
+                spin.blockSignals(True)
+                spin.setValue(0 if templated else int(box.isChecked()))
+                spin.blockSignals(False)
+        policy = self.policy()
+        try:
+            bits = PasswordGenerator.entropy_bits(policy)
+            sample = PasswordGenerator.generate(policy)
+        except PolicyError as e:
+            self.preview_label.setText(str(e))
+            self.buttons.button(QDialogButtonBox.Save).setEnabled(False)
+            return
+        self.preview_label.setText(f"{sample}\n{bits:.1f} bits of entropy")
+        self.buttons.button(QDialogButtonBox.Save).setEnabled(True)
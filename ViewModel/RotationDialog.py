@@ -0,0 +1,146 @@
+import time
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import (QDialog, QDialogButtonBox, QCheckBox, QFormLayout, QHBoxLayout, QHeaderView, QLabel,
+                               QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout)
+
+
+class RotationDialog(QDialog):
+    """Picks entries by filter, previews their new passwords and rotates them in one go"""
+    
+    FILTERS = (("Weak", "is:weak"), ("Breached", "is:breached"), ("Reused", "is:reused"), ("Old", "is:old"))
+    
+    def __init__(self, model, search_text: str = "", parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.staged = []
+        self.batch = None
+        self.rotated = False  # Whether anything was written, so the vault list needs reloading
+        self.setWindowTitle("Rotate Passwords")
+        self.resize(640, 480)
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+        layout.addLayout(form)
+        
+        self.text_edit = QLineEdit(search_text, self)
+        self.text_edit.setPlaceholderText("Name, username or URL contains")
+        form.addRow("Search", self.text_edit)
+        self.site_edit = QLineEdit(self)
+        self.site_edit.setPlaceholderText("e.g. example.com")
+        form.addRow("Site", self.site_edit)
+        filters = QHBoxLayout()
+        self.filter_boxes = []
+        for label, _ in self.FILTERS:
+            box = QCheckBox(label, self)
+            filters.addWidget(box)
+            self.filter_boxes.append(box)
+        filters.addStretch()
+        form.addRow("Only", filters)
+        
+        self.preview_button = QPushButton("Preview", self)
+        self.preview_button.clicked.connect(self.preview)
+        layout.addWidget(self.preview_button, alignment=Qt.AlignLeft)
+        
+        self.table = QTableWidget(0, 4, self)
+        self.table.setHorizontalHeaderLabels(["Name", "Username", "URL", "New password"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.itemChanged.connect(self.update_buttons)
+        layout.addWidget(self.table)
+        
+        self.status_label = QLabel(self)
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+        
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Close, self)
+        self.rotate_button = self.buttons.addButton("Rotate", QDialogButtonBox.ActionRole)
+        self.rotate_button.clicked.connect(self.rotate)
+        self.undo_button = self.buttons.addButton("Undo", QDialogButtonBox.ActionRole)
+        self.undo_button.clicked.connect(self.undo)
+        self.buttons.rejected.connect(self.reject)
+        layout.addWidget(self.buttons)
+        
+        # Count down the undo window of the last rotation
+        self.undo_timer = QTimer(self)
+        self.undo_timer.setInterval(1000)
+        self.undo_timer.timeout.connect(self.update_undo)
+        self.set_batch(self.model.last_rotation())
+        self.update_buttons()
+    
+    def search_query(self) -> str:
+        """Build the vault search that selects the entries to rotate"""
+        parts = [self.text_edit.text().strip()]
+        site = self.site_edit.text().strip()
+        if site:
+            parts.append(f"site:{site}")
+        parts += [token for box, (_, token) in zip(self.filter_boxes, self.FILTERS) if box.isChecked()]
+        return " ".join(part for part in parts if part)
+    
+    def preview(self):
+        """Stage new passwords for the matching entries and list them"""
+        self.staged = self.model.stage_rotation(self.search_query())
+        self.table.blockSignals(True)
+        self.table.setRowCount(len(self.staged))
+        for row, item in enumerate(self.staged):
+            name = QTableWidgetItem(item.name)
+            if item.password is not None:
+                name.setFlags(name.flags() | Qt.ItemIsUserCheckable)
+                name.setCheckState(Qt.Checked)
+            else:
+                name.setFlags(name.flags() & ~Qt.ItemIsEnabled)
+            self.table.setItem(row, 0, name)
+            self.table.setItem(row, 1, QTableWidgetItem(item.username))
+            self.table.setItem(row, 2, QTableWidgetItem(item.url))
+            self.table.setItem(row, 3, QTableWidgetItem(item.password if item.password is not None else item.error))
+        self.table.blockSignals(False)
+        self.status_label.setText(f"{len(self.staged)} matching entries." if self.staged else "No entries match.")
+        self.update_buttons()
+    
+    def checked_items(self) -> list:
+        """Get the staged entries ticked for rotation"""
+        return [item for row, item in enumerate(self.staged)
+                if item.password is not None and self.table.item(row, 0).checkState() == Qt.Checked]
+    
+    def update_buttons(self, *_):
+        """Enable Rotate only when something is ticked"""
+        self.rotate_button.setEnabled(bool(self.checked_items()))
+    
+    def rotate(self):
+        """Save the ticked passwords in one transaction"""
+        batch = self.model.commit_rotation(self.checked_items())
+        if batch is None:
+            self.status_label.setText("The passwords could not be rotated; nothing was changed.")
+            return
+        self.rotated = True
+        self.staged = []
+        self.table.setRowCount(0)
+        self.set_batch(batch)
+        self.update_buttons()
+    
+    def set_batch(self, batch):
+        """Offer to undo a rotation until its window closes"""
+        self.batch = batch
+        if batch is not None and batch.can_undo:
+            self.undo_timer.start()
+        self.update_undo()
+    
+    def update_undo(self):
+        """Refresh the undo countdown"""
+        if self.batch is None or not self.batch.can_undo:
+            self.undo_timer.stop()
+            self.undo_button.setEnabled(False)
+            return
+        minutes, seconds = divmod(int(self.batch.undo_deadline - time.time()), 60)
+        self.undo_button.setEnabled(True)
+        self.undo_button.setText(f"Undo ({minutes}:{seconds:02d})")
+        self.status_label.setText(f"Rotated {self.batch.rotated} passwords. You can undo this for {minutes}:{seconds:02d}.")
+    
+    def undo(self):
+        """Put back the passwords of the last rotation"""
+        if self.batch is None:
+            return
+        success, message = self.model.undo_rotation(self.batch.id)
+        self.rotated = self.rotated or success
+        self.batch = None
+        self.undo_button.setText("Undo")
+        self.update_undo()
+        self.status_label.setText(message)
@@ -1,6 +1,8 @@
 from PySide6.QtWidgets import QDialog, QMessageBox, QApplication
 from PySide6.QtCore import Signal
 from View.SignUpWindow_ui import Ui_Dialog
+from ViewModel.StrengthMeter import StrengthMeter
+from model import PasswordStrength
 import re
 
 
@@ -8,6 +10,7 @@ class SignUpWindow(QDialog):
     """Sign up window ViewModel"""
     
     login_successful = Signal(str)  # Signal emitted with user email on successful registration
+    MIN_STRENGTH_SCORE = 3  # Lowest PasswordStrength score accepted for a master password
     
     def __init__(self, model, parent=None):
         super().__init__(parent)
@@ -31,6 +34,18 @@ class SignUpWindow(QDialog):
         self.ui.lineEdit.returnPressed.connect(self.handle_signup)
         self.ui.lineEdit_2.returnPressed.connect(self.handle_signup)
         self.ui.lineEdit_3.returnPressed.connect(self.handle_signup)
+        
+        # Live strength meter under the password field
+        self.strength_meter = StrengthMeter(self)
+        self.ui.verticalLayout.insertWidget(
+            self.ui.verticalLayout.indexOf(self.ui.lineEdit_2) + 1, self.strength_meter
+        )
+        self.ui.lineEdit.textChanged.connect(self.update_strength)
+        self.ui.lineEdit_2.textChanged.connect(self.update_strength)
+    
+    def update_strength(self):
+        """Rescore the password as the user types; the e-mail counts as a guessable word"""
+        self.strength_meter.set_password(self.ui.lineEdit_2.text(), (self.ui.lineEdit.text(),))
     
     def validate_password(self, password: str) -> tuple[bool, str]:
         """Validate password strength"""
@@ -48,6 +63,14 @@ class SignUpWindow(QDialog):
         if not (has_upper and has_lower and has_digit and has_special):
             return False, "Password must contain uppercase, lowercase, numbers, and special characters"
         
+        estimate = PasswordStrength.estimate(password, (self.ui.lineEdit.text(),))
+        if estimate.score < self.MIN_STRENGTH_SCORE:
+            reason = f": {estimate.warning}" if estimate.warning else ""
+            return False, f"Password is too easy to guess{reason}"
+        
+        if self.model.is_password_breached(password):
+            return False, "This password appears in a known data breach, please choose another"
+        
         return True, "Password is valid"
     
     def handle_signup(self):
@@ -0,0 +1,50 @@
+from PySide6.QtWidgets import QLabel, QProgressBar, QVBoxLayout, QWidget
+from model import PasswordStrength
+
+
+class StrengthMeter(QWidget):
+    """Live password strength bar with a short explanation of weak passwords"""
+    
+    LABELS = ("Very weak", "Weak", "Fair", "Strong", "Very strong")
+    COLORS = ("#d9534f", "#f0ad4e", "#e6c229", "#5cb85c", "#2e8b57")
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(2)
+        
+        # One step per score, plus one so that even "very weak" shows a sliver
+        self.bar = QProgressBar(self)
+        self.bar.setRange(0, len(self.LABELS))
+        self.bar.setTextVisible(False)
+        self.bar.setFixedHeight(6)
+        layout.addWidget(self.bar)
+        
+        self.label = QLabel(self)
+        self.label.setWordWrap(True)
+        font = self.label.font()
+        font.setPointSizeF(font.pointSizeF() * 0.9)
+        self.label.setFont(font)
+        layout.addWidget(self.label)
+        
+        self.estimate = None
+        self.set_password("")
+    
+    def set_password(self, password: str, user_inputs=()):
+        """Score a password and show the result; returns the estimate, or None when empty"""
+        if not password:
+            self.estimate = None
+            self.bar.setValue(0)
+            self.label.setText("")
+            return None
+        
+        self.estimate = PasswordStrength.estimate(password, user_inputs)
+        score = self.estimate.score
+        self.bar.setValue(score + 1)
+        self.bar.setStyleSheet(f"QProgressBar::chunk {{ background-color: {self.COLORS[score]}; }}")
+        text = self.LABELS[score]
+        if self.estimate.warning:
+            text += f" - {self.estimate.warning}"
+        self.label.setText(text)
+        return self.estimate
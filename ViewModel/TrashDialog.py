@@ -0,0 +1,106 @@
+from datetime import datetime
+from PySide6.QtCore import Signal
+from PySide6.QtWidgets import (QDialog, QDialogButtonBox, QCheckBox, QHeaderView, QLabel, QMessageBox,
+                               QTableWidget, QTableWidgetItem, QVBoxLayout)
+
+
+class TrashDialog(QDialog):
+    """Lists deleted entries to restore them or remove them for good"""
+    
+    purge_finished = Signal(int)  # Entries removed; emitted from the purge thread, delivered queued
+    
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.entries = []
+        self.restored = False  # Whether anything came back, so the vault list needs reloading
+        self.purging = False
+        self.setWindowTitle("Trash")
+        self.resize(640, 420)
+        layout = QVBoxLayout(self)
+        
+        self.table = QTableWidget(0, 4, self)
+        self.table.setHorizontalHeaderLabels(["Name", "Username", "URL", "Deleted"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionMode(QTableWidget.ExtendedSelection)
+        self.table.itemSelectionChanged.connect(self.update_buttons)
+        layout.addWidget(self.table)
+        
+        self.secure_box = QCheckBox("Overwrite removed entries on disk (slower)", self)
+        layout.addWidget(self.secure_box)
+        self.status_label = QLabel(self)
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+        
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Close, self)
+        self.restore_button = self.buttons.addButton("Restore", QDialogButtonBox.ActionRole)
+        self.restore_button.clicked.connect(self.restore)
+        self.purge_button = self.buttons.addButton("Delete forever", QDialogButtonBox.ActionRole)
+        self.purge_button.clicked.connect(lambda: self.purge(self.selected_ids()))
+        self.empty_button = self.buttons.addButton("Empty trash", QDialogButtonBox.ActionRole)
+        self.empty_button.clicked.connect(lambda: self.purge(None))
+        self.buttons.rejected.connect(self.reject)
+        layout.addWidget(self.buttons)
+        
+        self.purge_finished.connect(self.on_purge_finished)
+        self.load()
+    
+    def load(self):
+        """List the entries in the trash"""
+        self.entries = self.model.get_trash()
+        self.table.setRowCount(len(self.entries))
+        for row, entry in enumerate(self.entries):
+            self.table.setItem(row, 0, QTableWidgetItem(entry.name))
+            self.table.setItem(row, 1, QTableWidgetItem(entry.username))
+            self.table.setItem(row, 2, QTableWidgetItem(entry.url))
+            deleted = QTableWidgetItem(f"{datetime.fromtimestamp(entry.deleted_at):%Y-%m-%d %H:%M}")
+            deleted.setToolTip(f"Removed for good after {datetime.fromtimestamp(entry.expires_at):%Y-%m-%d}")
+            self.table.setItem(row, 3, deleted)
+        if not self.purging:
+            count = len(self.entries)
+            self.status_label.setText(f"{count} entr{'y' if count == 1 else 'ies'} in the trash." if count else "The trash is empty.")
+        self.update_buttons()
+    
+    def selected_ids(self) -> list:
+        """Get the ids of the selected entries"""
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()})
+        return [self.entries[row].id for row in rows if row < len(self.entries)]
+    
+    def update_buttons(self):
+        """Enable the actions that apply to the selection"""
+        selected = bool(self.selected_ids()) and not self.purging
+        self.restore_button.setEnabled(selected)
+        self.purge_button.setEnabled(selected)
+        self.empty_button.setEnabled(bool(self.entries) and not self.purging)
+    
+    def restore(self):
+        """Put the selected entries back in the vault"""
+        restored = self.model.restore_entries(self.selected_ids())
+        self.restored = self.restored or restored > 0
+        self.load()
+        self.status_label.setText(f"Restored {restored} entr{'y' if restored == 1 else 'ies'}.")
+    
+    def purge(self, entry_ids):
+        """Remove the given entries, or the whole trash, for good in the background"""
+        count = len(self.entries) if entry_ids is None else len(entry_ids)
+        reply = QMessageBox.question(
+            self,
+            "Delete Forever",
+            f"Permanently delete {count} entr{'y' if count == 1 else 'ies'}? This cannot be undone.",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        self.purging = True
+        self.status_label.setText("Deleting...")
+        self.update_buttons()
+        self.model.start_purge(entry_ids, self.secure_box.isChecked(), finished=self.purge_finished.emit)
+    
+    def on_purge_finished(self, removed: int):
+        """Reload the trash once a purge is done"""
+        self.purging = False
+        self.load()
+        self.status_label.setText(f"Permanently deleted {removed} entr{'y' if removed == 1 else 'ies'}.")
@@ -0,0 +1,31 @@
+from PySide6.QtCore import QObject, Signal
+from model.VaultStore import VaultChange
+
+
+class VaultStoreSignals(QObject):
+    """Qt signal adapter that re-emits VaultStore changes as typed signals"""
+    
+    reset = Signal()
+    inserted = Signal(int, int)  # entry id, position
+    removed = Signal(int, int)  # entry id, old position
+    updated = Signal(int, int)  # entry id, position
+    moved = Signal(int, int, int)  # entry id, old position, new position
+    
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.store.subscribe(self._on_change)
+        self.destroyed.connect(lambda: store.unsubscribe(self._on_change))
+    
+    def _on_change(self, change: VaultChange):
+        """Translate a store change into the matching signal"""
+        if change.kind == VaultChange.RESET:
+            self.reset.emit()
+        elif change.kind == VaultChange.INSERTED:
+            self.inserted.emit(change.entry_id, change.position)
+        elif change.kind == VaultChange.REMOVED:
+            self.removed.emit(change.entry_id, change.position)
+        elif change.kind == VaultChange.UPDATED:
+            self.updated.emit(change.entry_id, change.position)
+        elif change.kind == VaultChange.MOVED:
+            self.moved.emit(change.entry_id, change.position, change.new_position)
@@ -10,6 +10,7 @@ pyinstaller --name="PasswordVault" \
     --onefile \
     --add-data "icons:icons" \
     --add-data "View/*.ui:View" \
+    --add-data "model/data:model/data" \
     --icon="icons/app_icon.png" \
     Main.py
 
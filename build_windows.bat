@@ -10,6 +10,7 @@ pyinstaller --name="PasswordVault" ^
     --onefile ^
     --add-data "icons;icons" ^
     --add-data "View/*.ui;View" ^
+    --add-data "model/data;model/data" ^
     Main.py
 
 echo Build complete! Executable is in dist\PasswordVault.exe
@@ -0,0 +1,216 @@
+import json
+import os
+import struct
+from typing import BinaryIO, Iterator, Optional, Tuple
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from .DatabaseManager import DatabaseManager
+from .PasswordService import PasswordService
+
+
+class ArchiveError(Exception):
+    """Raised when an archive is malformed, truncated, tampered with or the passphrase is wrong"""
+
+
+class ArchiveService:
+    """Exports and imports the vault as a single passphrase-encrypted file
+    
+    Entries are written as JSON lines and the resulting byte stream is cut into
+    fixed-size chunks. Each chunk is sealed with AES-GCM using the STREAM
+    construction: the nonce is a random per-file prefix, the chunk index and a
+    flag marking the final chunk. Reordered, dropped, duplicated or appended
+    chunks, and files cut short, all fail authentication. Only one chunk is
+    held in memory at a time in either direction.
+    
+    File layout:
+        header: MAGIC, version (1 byte), KDF iterations (4), chunk size (4),
+                salt (16), nonce prefix (7)
+        chunks: ciphertext length (4) followed by the ciphertext
+    The header is authenticated as associated data of every chunk.
+    """
+    
+    MAGIC = b"PVARCHIV"
+    VERSION = 1
+    CHUNK_SIZE = 64 * 1024  # Plaintext bytes per chunk
+    MAX_CHUNK_SIZE = 16 * 1024 * 1024  # Largest chunk size accepted when importing
+    KDF_ITERATIONS = 600000
+    MAX_KDF_ITERATIONS = 10000000  # Bounds the work a crafted header can demand
+    SALT_SIZE = 16
+    NONCE_PREFIX_SIZE = 7
+    IMPORT_BATCH_SIZE = 500  # Entries inserted per batch when importing
+    _HEADER = struct.Struct(">8sBII16s7s")
+    _LENGTH = struct.Struct(">I")
+    _TAG_SIZE = 16
+    
+    def __init__(self, db_manager: DatabaseManager, password_service: PasswordService):
+        self.db_manager = db_manager
+        self.password_service = password_service
+    
+    @staticmethod
+    def _derive_key(passphrase: str, salt: bytes, iterations: int) -> bytes:
+        """Derive the archive key from a passphrase"""
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=iterations)
+        return kdf.derive(passphrase.encode())
+    
+    @staticmethod
+    def _nonce(prefix: bytes, index: int, last: bool) -> bytes:
+        """Build the STREAM nonce for a chunk"""
+        if index >= 2 ** 32:
+            raise ArchiveError("Archive has too many chunks")
+        return prefix + struct.pack(">IB", index, 1 if last else 0)
+    
+    # ==================== Export ====================
+    
+    def export_vault(self, path: str, passphrase: str) -> Tuple[bool, str]:
+        """Write all of the current user's entries to an encrypted archive"""
+        if not self.password_service.current_user:
+            return False, "No user is logged in"
+        if not passphrase:
+            return False, "Passphrase cannot be empty"
+        
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                count = self._write_archive(f, passphrase)
+            os.replace(temp_path, path)
+            return True, f"Exported {count} entries"
+        except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            print(f"Error exporting vault: {e}")
+            return False, f"Export failed: {e}"
+    
+    def _write_archive(self, f: BinaryIO, passphrase: str) -> int:
+        """Stream entries into an open file and return how many were written"""
+        salt = os.urandom(self.SALT_SIZE)
+        prefix = os.urandom(self.NONCE_PREFIX_SIZE)
+        header = self._HEADER.pack(self.MAGIC, self.VERSION, self.KDF_ITERATIONS,
+                                   self.CHUNK_SIZE, salt, prefix)
+        cipher = AESGCM(self._derive_key(passphrase, salt, self.KDF_ITERATIONS))
+        f.write(header)
+        
+        index = 0
+        buffer = bytearray()
+        
+        def seal(chunk: bytes, last: bool):
+            ciphertext = cipher.encrypt(self._nonce(prefix, index, last), chunk, header)
+            f.write(self._LENGTH.pack(len(ciphertext)))
+            f.write(ciphertext)
+        
+        count = 0
+        for entry in self.password_service.iter_entries():
+            record = {"name": entry.name, "username": entry.username,
+                      "password": entry.password, "url": entry.url}
+            buffer += json.dumps(record, ensure_ascii=False).encode() + b"\n"
+            count += 1
+            # Keep at least one byte back so the final chunk is never empty unless the vault is
+            while len(buffer) > self.CHUNK_SIZE:
+                seal(bytes(buffer[:self.CHUNK_SIZE]), last=False)
+                del buffer[:self.CHUNK_SIZE]
+                index += 1
+        
+        seal(bytes(buffer), last=True)
+        return count
+    
+    # ==================== Import ====================
+    
+    def import_vault(self, path: str, passphrase: str) -> Tuple[bool, str]:
+        """Add the entries of an encrypted archive to the current user's vault
+        
+        Entries are inserted in batches as chunks are verified, all inside one
+        transaction, so a damaged archive or wrong passphrase adds nothing.
+        """
+        if not self.password_service.current_user:
+            return False, "No user is logged in"
+        
+        try:
+            with open(path, "rb") as f, self.db_manager.transaction():
+                count = 0
+                batch = []
+                for record in self._read_records(f, passphrase):
+                    batch.append(record)
+                    if len(batch) >= self.IMPORT_BATCH_SIZE:
+                        self._add_batch(batch)
+                        count += len(batch)
+                        batch = []
+                self._add_batch(batch)
+                count += len(batch)
+            return True, f"Imported {count} entries"
+        except ArchiveError as e:
+            return False, str(e)
+        except Exception as e:
+            print(f"Error importing vault: {e}")
+            return False, f"Import failed: {e}"
+    
+    def _add_batch(self, batch) -> None:
+        """Insert a batch of imported entries, failing the whole import if any is invalid"""
+        if batch and not self.password_service.add_entries(batch):
+            raise ArchiveError("Archive contains an invalid entry")
+    
+    def _read_records(self, f: BinaryIO, passphrase: str) -> Iterator[dict]:
+        """Decrypt and parse an archive one chunk at a time"""
+        header = f.read(self._HEADER.size)
+        if len(header) != self._HEADER.size:
+            raise ArchiveError("Not a vault archive")
+        magic, version, iterations, chunk_size, salt, prefix = self._HEADER.unpack(header)
+        if magic != self.MAGIC:
+            raise ArchiveError("Not a vault archive")
+        if version != self.VERSION:
+            raise ArchiveError(f"Unsupported archive version {version}")
+        if not 0 < chunk_size <= self.MAX_CHUNK_SIZE or not 0 < iterations <= self.MAX_KDF_ITERATIONS:
+            raise ArchiveError("Archive header is corrupt")
+        cipher = AESGCM(self._derive_key(passphrase, salt, iterations))
+        
+        pending = b""
+        index = 0
+        ciphertext = self._read_chunk(f, chunk_size)
+        if ciphertext is None:
+            raise ArchiveError("Archive is truncated")
+        while ciphertext is not None:
+            # Look one chunk ahead: only the final chunk may be sealed as last
+            following = self._read_chunk(f, chunk_size)
+            last = following is None
+            try:
+                chunk = cipher.decrypt(self._nonce(prefix, index, last), ciphertext, header)
+            except InvalidTag:
+                if index == 0:
+                    raise ArchiveError("Wrong passphrase or damaged archive")
+                raise ArchiveError("Archive is damaged, truncated or has been modified")
+            
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                yield self._parse_record(line)
+            ciphertext = following
+            index += 1
+        
+        if pending:
+            raise ArchiveError("Archive ends with an incomplete entry")
+    
+    def _read_chunk(self, f: BinaryIO, chunk_size: int) -> Optional[bytes]:
+        """Read the next sealed chunk, or None at the end of the file"""
+        length_bytes = f.read(self._LENGTH.size)
+        if not length_bytes:
+            return None
+        if len(length_bytes) != self._LENGTH.size:
+            raise ArchiveError("Archive is truncated")
+        (length,) = self._LENGTH.unpack(length_bytes)
+        if length > chunk_size + self._TAG_SIZE:
+            raise ArchiveError("Archive is damaged, truncated or has been modified")
+        ciphertext = f.read(length)
+        if len(ciphertext) != length:
+            raise ArchiveError("Archive is truncated")
+        return ciphertext
+    
+    @staticmethod
+    def _parse_record(line: bytes) -> dict:
+        """Parse one JSON line into an entry dict"""
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise ArchiveError("Archive contains a malformed entry")
+        if not isinstance(record, dict):
+            raise ArchiveError("Archive contains a malformed entry")
+        return {key: str(record.get(key) or "") for key in ("name", "username", "password", "url")}
@@ -0,0 +1,149 @@
+import re
+import time
+import zlib
+from typing import List, Optional, Tuple
+from . import PasswordStrength
+from .BreachChecker import BreachChecker
+from .DatabaseManager import DatabaseManager
+
+
+class AuditSummary:
+    """Counts of a user's entries with each kind of health problem"""
+    
+    __slots__ = ("total", "weak", "reused", "old", "breached", "unaudited")
+    
+    def __init__(self, total=0, weak=0, reused=0, old=0, breached=0, unaudited=0):
+        self.total = total
+        self.weak = weak
+        self.reused = reused  # Entries sharing their password with another entry
+        self.old = old
+        self.breached = breached
+        self.unaudited = unaudited  # Entries not yet scored by the current audit
+    
+    @property
+    def healthy(self) -> bool:
+        """Whether no entry has any problem"""
+        return not (self.weak or self.reused or self.old or self.breached)
+
+
+class AuditService:
+    """Keeps per-entry health facts current so vault audits never decrypt the vault
+    
+    Strength score, breach flag and the time the password last changed are
+    computed whenever an entry is written and stored in indexed columns of
+    the passwords table; the reuse group is the entry's password fingerprint.
+    Summary counts and filters are then index range counts and scans.
+    
+    Each entry also records the audit stamp it was scored with. The stamp
+    changes when the strength scoring or the installed breach database
+    changes, and refresh() re-audits just the entries with a stale stamp.
+    """
+    
+    WEAK_SCORE = 2  # Entries scoring below this are weak
+    MAX_AGE_DAYS = 365  # Passwords unchanged for longer than this are old
+    ISSUES = ("weak", "reused", "old", "breached")
+    _ISSUE_PATTERN = re.compile(r"(?:^|\s)is:(weak|reused|old|breached)(?=\s|$)", re.IGNORECASE)
+    
+    def __init__(self, db_manager: DatabaseManager, breach_checker: Optional[BreachChecker] = None):
+        self.db_manager = db_manager
+        self.breach_checker = breach_checker
+    
+    def stamp(self) -> int:
+        """Identify the scoring and breach data that current audit facts come from"""
+        breach_count = len(self.breach_checker) if self.breach_checker is not None else 0
+        return zlib.crc32(f"{PasswordStrength.VERSION}:{breach_count}".encode())
+    
+    def assess(self, password: str) -> Tuple[int, int, int]:
+        """Get the (strength, breached, stamp) facts stored for a password"""
+        breached = self.breach_checker is not None and self.breach_checker.is_breached(password)
+        return PasswordStrength.score(password), int(breached), self.stamp()
+    
+    # ==================== Refresh ====================
+    
+    def refresh(self, user_email: str) -> int:
+        """Re-audit a user's entries scored with an outdated stamp and return how many changed
+        
+        Only needed after an upgrade or a new breach database; writes keep
+        the facts current otherwise.
+        """
+        stamp = self.stamp()
+        now = time.time()
+        try:
+            with self.db_manager.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT id, password FROM passwords WHERE user_email = ? AND deleted_at IS NULL AND audit_stamp IS NOT ?",
+                    (user_email, stamp)
+                )
+                rows = []
+                for entry_id, encrypted_password in cursor.fetchall():
+                    try:
+                        strength, breached, _ = self.assess(self.db_manager.decrypt(encrypted_password))
+                    except Exception:
+                        continue
+                    rows.append((strength, breached, stamp, now, entry_id))
+                cursor.executemany(
+                    """UPDATE passwords SET strength = ?, breached = ?, audit_stamp = ?,
+                       password_changed_at = COALESCE(password_changed_at, ?) WHERE id = ?""",
+                    rows
+                )
+            return len(rows)
+        except Exception as e:
+            print(f"Error refreshing vault audit: {e}")
+            return 0
+    
+    # ==================== Queries ====================
+    
+    def summary(self, user_email: str) -> AuditSummary:
+        """Count a user's entries with each problem, one index range per count"""
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """SELECT
+                       (SELECT COUNT(*) FROM passwords WHERE user_email = ? AND deleted_at IS NULL),
+                       (SELECT COUNT(*) FROM passwords WHERE user_email = ? AND deleted_at IS NULL AND strength < ?),
+                       (SELECT COALESCE(SUM(uses), 0) FROM (
+                            SELECT COUNT(*) AS uses FROM passwords
+                            WHERE user_email = ? AND deleted_at IS NULL AND password_fingerprint IS NOT NULL
+                            GROUP BY password_fingerprint HAVING COUNT(*) > 1)),
+                       (SELECT COUNT(*) FROM passwords WHERE user_email = ? AND deleted_at IS NULL AND password_changed_at < ?),
+                       (SELECT COUNT(*) FROM passwords WHERE user_email = ? AND deleted_at IS NULL AND breached = 1),
+                       (SELECT COUNT(*) FROM passwords WHERE user_email = ? AND deleted_at IS NULL AND audit_stamp IS NOT ?)""",
+                (user_email, user_email, self.WEAK_SCORE, user_email, user_email, self._old_cutoff(),
+                 user_email, user_email, self.stamp())
+            )
+            return AuditSummary(*cursor.fetchone())
+        finally:
+            conn.close()
+    
+    @classmethod
+    def _old_cutoff(cls) -> float:
+        """Get the change time before which a password counts as old"""
+        return time.time() - cls.MAX_AGE_DAYS * 86400
+    
+    @classmethod
+    def split_issue_filters(cls, search_query: str) -> Tuple[List[str], str]:
+        """Split "is:weak"-style filters from the rest of a search query"""
+        issues = [issue.lower() for issue in cls._ISSUE_PATTERN.findall(search_query)]
+        return issues, cls._ISSUE_PATTERN.sub(" ", search_query).strip()
+    
+    @classmethod
+    def issue_condition(cls, issue: str, alias: str = "") -> Tuple[str, tuple]:
+        """Get the SQL condition and parameters matching entries with a problem"""
+        if issue == "weak":
+            return f"{alias}strength < ?", (cls.WEAK_SCORE,)
+        if issue == "old":
+            return f"{alias}password_changed_at < ?", (cls._old_cutoff(),)
+        if issue == "breached":
+            return f"{alias}breached = 1", ()
+        if issue == "reused":
+            table = alias or "passwords."
+            return (
+                f"""EXISTS (SELECT 1 FROM passwords other
+                            WHERE other.user_email = {table}user_email
+                            AND other.password_fingerprint = {table}password_fingerprint
+                            AND other.id != {table}id AND other.deleted_at IS NULL)""",
+                ()
+            )
+        raise ValueError(f"Unknown audit issue: {issue}")
@@ -0,0 +1,244 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+from .DatabaseManager import DatabaseManager
+
+
+class BackupProgress:
+    """Progress and throughput of a single backup run"""
+    
+    __slots__ = (
+        "pages_total", "pages_done", "page_size", "started_at", "finished_at",
+        "path", "skipped", "verified", "error",
+    )
+    
+    def __init__(self):
+        self.pages_total = 0
+        self.pages_done = 0
+        self.page_size = 0
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.path: Optional[str] = None
+        self.skipped = False  # True when nothing had changed since the last backup
+        self.verified = False
+        self.error: Optional[str] = None
+    
+    @property
+    def fraction(self) -> float:
+        """Fraction of pages copied so far, from 0 to 1"""
+        return self.pages_done / self.pages_total if self.pages_total else 0.0
+    
+    @property
+    def bytes_done(self) -> int:
+        """Number of bytes copied so far"""
+        return self.pages_done * self.page_size
+    
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the backup started, or its total duration once finished"""
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+    
+    @property
+    def throughput(self) -> float:
+        """Bytes copied per second"""
+        return self.bytes_done / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class BackupService:
+    """Takes consistent online backups with SQLite's backup API
+    
+    Pages are copied a few at a time with a short pause between steps, so
+    other connections keep writing while a backup runs. Backups are written
+    to a temporary file, optionally gzip-compressed, verified and only then
+    renamed into place. The newest GENERATIONS backups are kept. A backup is
+    skipped when the vault has not changed since the previous one.
+    """
+    
+    PAGES_PER_STEP = 256  # Pages copied per backup step
+    STEP_PAUSE = 0.005  # Seconds to yield to other connections between steps
+    GENERATIONS = 5  # Number of backups kept
+    MANIFEST = "manifest.json"
+    
+    def __init__(self, db_manager: DatabaseManager, backup_dir: Optional[str] = None):
+        self.db_manager = db_manager
+        if backup_dir is None:
+            backup_dir = Path(db_manager.db_file).resolve().parent / "backups"
+        self.backup_dir = Path(backup_dir)
+        self.last_progress: Optional[BackupProgress] = None
+        self._lock = threading.Lock()  # One backup at a time
+    
+    def _read_manifest(self) -> dict:
+        """Read what is known about existing backups"""
+        try:
+            with open(self.backup_dir / self.MANIFEST, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _write_manifest(self, manifest: dict) -> None:
+        """Atomically replace the manifest"""
+        temp_path = self.backup_dir / (self.MANIFEST + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, self.backup_dir / self.MANIFEST)
+    
+    def _vault_state(self, conn) -> str:
+        """Fingerprint the vault contents without reading the entries
+        
+        Entry changes advance the change log's revision; the users table is
+        small enough to hash directly.
+        """
+        cursor = conn.cursor()
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'entry_changes'")
+        result = cursor.fetchone()
+        revision = result[0] if result else 0
+        digest = hashlib.sha256()
+        cursor.execute("SELECT email, password_hash FROM users ORDER BY email")
+        for email, password_hash in cursor.fetchall():
+            digest.update(f"{email}\0{password_hash}\0".encode())
+        return f"{revision}:{digest.hexdigest()}"
+    
+    def list_backups(self) -> List[str]:
+        """Get the paths of existing backups, newest first"""
+        generations = self._read_manifest().get("generations", [])
+        return [str(self.backup_dir / g["file"]) for g in generations
+                if (self.backup_dir / g["file"]).exists()]
+    
+    def backup(self, compress: bool = True, verify: bool = True, force: bool = False,
+               progress: Optional[Callable[[BackupProgress], None]] = None) -> BackupProgress:
+        """Back up the vault and return the run's progress record
+        
+        progress, if given, is called after every step with the same record.
+        On failure the record's error is set and no existing backup is touched.
+        """
+        report = BackupProgress()
+        self.last_progress = report
+        with self._lock:
+            try:
+                self._run_backup(report, compress, verify, force, progress)
+            except Exception as e:
+                report.error = str(e)
+                print(f"Error backing up vault: {e}")
+            report.finished_at = time.monotonic()
+        return report
+    
+    def start_backup(self, compress: bool = True, verify: bool = True, force: bool = False,
+                     progress: Optional[Callable[[BackupProgress], None]] = None,
+                     finished: Optional[Callable[[BackupProgress], None]] = None) -> threading.Thread:
+        """Run backup() on a background thread and call finished with its result"""
+        def run():
+            report = self.backup(compress, verify, force, progress)
+            if finished is not None:
+                finished(report)
+        
+        thread = threading.Thread(target=run, name="vault-backup", daemon=True)
+        thread.start()
+        return thread
+    
+    def _run_backup(self, report: BackupProgress, compress: bool, verify: bool, force: bool,
+                    progress: Optional[Callable[[BackupProgress], None]]) -> None:
+        """Copy, verify, compress and rotate one backup"""
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self._read_manifest()
+        
+        source = self.db_manager.connect()
+        try:
+            state = self._vault_state(source)
+            if not force and manifest.get("state") == state and self.list_backups():
+                report.skipped = True
+                report.path = self.list_backups()[0]
+                return
+            
+            report.page_size = source.execute("PRAGMA page_size").fetchone()[0]
+            
+            # Copy from one read snapshot. Without it every commit by another
+            # connection restarts the backup, which may then never finish;
+            # with WAL, writers carry on regardless of the open read.
+            source.isolation_level = None
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            
+            def on_step(status, remaining, total):
+                report.pages_total = total
+                report.pages_done = total - remaining
+                if progress is not None:
+                    progress(report)
+                # Give writers a chance to get the lock between steps
+                time.sleep(self.STEP_PAUSE)
+            
+            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+            name = f"vault-{timestamp}.db"
+            temp_path = self.backup_dir / (name + ".tmp")
+            compressed_temp_path = Path(str(temp_path) + ".gz")
+            try:
+                target = sqlite3.connect(temp_path)
+                try:
+                    source.backup(target, pages=self.PAGES_PER_STEP, progress=on_step)
+                    if verify:
+                        result = target.execute("PRAGMA integrity_check").fetchone()[0]
+                        if result != "ok":
+                            raise sqlite3.DatabaseError(f"backup failed integrity check: {result}")
+                    # A single-file copy is easier to restore than one with a WAL
+                    target.execute("PRAGMA journal_mode=DELETE")
+                finally:
+                    target.close()
+                
+                if compress:
+                    self._compress(temp_path, compressed_temp_path, verify)
+                    name += ".gz"
+                    os.replace(compressed_temp_path, self.backup_dir / name)
+                else:
+                    os.replace(temp_path, self.backup_dir / name)
+            finally:
+                # Never leave partial files behind
+                for leftover in (temp_path, compressed_temp_path):
+                    if leftover.exists():
+                        leftover.unlink()
+        finally:
+            if source.in_transaction:
+                source.execute("ROLLBACK")
+            source.close()
+        
+        report.verified = verify
+        report.path = str(self.backup_dir / name)
+        
+        generations = [{"file": name, "state": state, "created": time.time()}]
+        generations += manifest.get("generations", [])
+        self._rotate(generations)
+        manifest = {"state": state, "generations": generations[:self.GENERATIONS]}
+        self._write_manifest(manifest)
+    
+    @staticmethod
+    def _compress(path: Path, compressed_path: Path, verify: bool) -> None:
+        """Gzip a file in a streaming fashion and optionally check it decompresses intact"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as source, gzip.open(compressed_path, "wb") as target:
+            for block in iter(lambda: source.read(1024 * 1024), b""):
+                digest.update(block)
+                target.write(block)
+        
+        if verify:
+            check = hashlib.sha256()
+            with gzip.open(compressed_path, "rb") as written:
+                for block in iter(lambda: written.read(1024 * 1024), b""):
+                    check.update(block)
+            if check.digest() != digest.digest():
+                raise OSError("compressed backup does not match the database copy")
+    
+    def _rotate(self, generations: List[dict]) -> None:
+        """Delete backups beyond the number of generations kept"""
+        for old in generations[self.GENERATIONS:]:
+            path = self.backup_dir / old["file"]
+            try:
+                if path.exists():
+                    path.unlink()
+            except OSError as e:
+                print(f"Error removing old backup {path}: {e}")
@@ -0,0 +1,253 @@
+import hashlib
+import heapq
+import itertools
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Union
+
+
+class BreachFileError(Exception):
+    """Raised when a breach database file is not in the expected format"""
+
+
+class BreachChecker:
+    """Checks passwords against an offline database of breached password hashes
+    
+    The database is converted once from a Have I Been Pwned style dump (one
+    "SHA1HASH:COUNT" line per password) into a binary file of sorted,
+    fixed-width SHA-1 prefixes. Lookups binary-search that file through mmap,
+    so only the few pages a search touches are ever read and nothing is
+    loaded up front. A fan-out table indexed by the first two bytes of the
+    hash narrows each search to a small slice of the file first.
+    
+    File layout:
+        header: MAGIC, version (1 byte), prefix width (1), record count (8)
+        fan-out: 65536 cumulative record counts (8 bytes each)
+        records: sorted, de-duplicated hash prefixes
+    
+    With 8-byte prefixes a false positive needs a 64-bit collision with one
+    of the listed hashes, which is negligible even for the full HIBP list.
+    """
+    
+    FILE_NAME = "breached_passwords.bin"
+    MAGIC = b"PVBREACH"
+    VERSION = 1
+    PREFIX_BYTES = 8  # Bytes of each SHA-1 hash kept
+    RUN_SIZE = 1000000  # Hashes sorted in memory at a time while converting
+    _HEADER = struct.Struct(">8sBBQ")
+    _FANOUT = struct.Struct(">65536Q")
+    
+    def __init__(self, path: Union[str, Path, None] = None):
+        self.path = Path(path) if path is not None else None
+        self._file: Optional[BinaryIO] = None
+        self._map: Optional[mmap.mmap] = None
+        self._width = 0
+        self._records_offset = 0
+        self._opened = False
+    
+    # ==================== Lookup ====================
+    
+    def _open(self) -> bool:
+        """Map the database file on first use; False if there is none"""
+        if self._opened:
+            return self._map is not None
+        self._opened = True
+        if self.path is None or not self.path.exists():
+            return False
+        
+        try:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, width, count = self._HEADER.unpack_from(self._map, 0)
+            if magic != self.MAGIC or version != self.VERSION or not 0 < width <= 20:
+                raise BreachFileError("Not a breach database file")
+            self._width = width
+            self._records_offset = self._HEADER.size + self._FANOUT.size
+            if len(self._map) != self._records_offset + count * width:
+                raise BreachFileError("Breach database file is truncated")
+            return True
+        except (OSError, ValueError, struct.error, BreachFileError) as e:
+            print(f"Error opening breach database {self.path}: {e}")
+            self.close()
+            return False
+    
+    def close(self) -> None:
+        """Unmap the database file"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def reload(self) -> None:
+        """Pick up a database file installed or replaced since the last lookup"""
+        self.close()
+        self._opened = False
+    
+    @property
+    def available(self) -> bool:
+        """Whether a breach database is installed"""
+        return self._open()
+    
+    def __len__(self) -> int:
+        """Number of breached hashes in the database"""
+        if not self._open():
+            return 0
+        return (len(self._map) - self._records_offset) // self._width
+    
+    def is_breached(self, password: str) -> bool:
+        """Check whether a password appears in the breach database
+        
+        Always False when no database is installed.
+        """
+        if not password or not self._open():
+            return False
+        return self.contains_hash(hashlib.sha1(password.encode()).digest())
+    
+    def contains_hash(self, digest: bytes) -> bool:
+        """Check whether a SHA-1 digest (or a prefix at least as wide as the records) is listed"""
+        if not self._open():
+            return False
+        width = self._width
+        key = digest[:width]
+        bucket = int.from_bytes(key[:2], "big")
+        
+        mapped = self._map
+        fanout_offset = self._HEADER.size
+        lo = struct.unpack_from(">Q", mapped, fanout_offset + (bucket - 1) * 8)[0] if bucket else 0
+        hi = struct.unpack_from(">Q", mapped, fanout_offset + bucket * 8)[0]
+        base = self._records_offset
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = base + mid * width
+            record = mapped[start:start + width]
+            if record < key:
+                lo = mid + 1
+            elif record > key:
+                hi = mid
+            else:
+                return True
+        return False
+    
+    # ==================== Conversion ====================
+    
+    @classmethod
+    def convert(cls, source_path: Union[str, Path], target_path: Union[str, Path],
+                prefix_bytes: Optional[int] = None) -> int:
+        """Convert a HIBP SHA-1 text dump into a breach database file and return its record count
+        
+        Lines that are not a 40-digit hex hash (optionally followed by
+        ":count") are ignored. Hashes are sorted in runs on disk; dumps
+        already ordered by hash, as HIBP publishes them, skip the merge. The
+        target is replaced atomically.
+        """
+        width = prefix_bytes or cls.PREFIX_BYTES
+        if not 0 < width <= 20:
+            raise ValueError("prefix_bytes must be between 1 and 20")
+        target_path = Path(target_path)
+        temp_path = target_path.with_name(target_path.name + ".tmp")
+        
+        with tempfile.TemporaryDirectory(dir=target_path.parent) as run_dir:
+            with open(source_path, "rb") as source:
+                run_paths, in_order = cls._write_runs(cls._parse_dump(source, width), run_dir)
+            readers = [cls._read_run(path, width) for path in run_paths]
+            # Sorted runs that follow each other in order need no merge
+            records = itertools.chain(*readers) if in_order else heapq.merge(*readers)
+            try:
+                with open(temp_path, "wb") as target:
+                    count = cls._write_database(target, records, width)
+                os.replace(temp_path, target_path)
+            finally:
+                if temp_path.exists():
+                    temp_path.unlink()
+        return count
+    
+    @staticmethod
+    def _parse_dump(source: BinaryIO, width: int) -> Iterator[bytes]:
+        """Yield the hash prefix of every well-formed line of a dump"""
+        for line in source:
+            hex_hash = line.split(b":", 1)[0].strip()
+            if len(hex_hash) != 40:
+                continue
+            try:
+                yield bytes.fromhex(hex_hash.decode("ascii"))[:width]
+            except ValueError:
+                continue
+    
+    @classmethod
+    def _write_runs(cls, prefixes: Iterable[bytes], run_dir: str) -> tuple[List[str], bool]:
+        """Sort prefixes in memory-sized runs written to disk
+        
+        Also reports whether the input was already in order, so that the
+        runs can simply be concatenated.
+        """
+        run_paths = []
+        in_order = True
+        previous = b""
+        run = []
+        
+        def flush():
+            run.sort()
+            path = os.path.join(run_dir, f"run{len(run_paths)}")
+            with open(path, "wb") as f:
+                f.write(b"".join(run))
+            run_paths.append(path)
+            run.clear()
+        
+        for prefix in prefixes:
+            if prefix < previous:
+                in_order = False
+            previous = prefix
+            run.append(prefix)
+            if len(run) >= cls.RUN_SIZE:
+                flush()
+        if run:
+            flush()
+        return run_paths, in_order
+    
+    @staticmethod
+    def _read_run(path: str, width: int) -> Iterator[bytes]:
+        """Yield the fixed-width records of a sorted run"""
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(width * 8192), b""):
+                for start in range(0, len(block), width):
+                    yield block[start:start + width]
+    
+    @classmethod
+    def _write_database(cls, target: BinaryIO, records: Iterable[bytes], width: int) -> int:
+        """Write the header, fan-out table and de-duplicated records"""
+        target.write(b"\0" * (cls._HEADER.size + cls._FANOUT.size))
+        fanout = [0] * 65536
+        count = 0
+        previous = None
+        buffer = []
+        for record in records:
+            if record == previous:
+                continue
+            previous = record
+            fanout[int.from_bytes(record[:2], "big")] += 1
+            buffer.append(record)
+            count += 1
+            if len(buffer) >= 8192:
+                target.write(b"".join(buffer))
+                buffer.clear()
+        target.write(b"".join(buffer))
+        
+        target.seek(0)
+        target.write(cls._HEADER.pack(cls.MAGIC, cls.VERSION, width, count))
+        target.write(cls._FANOUT.pack(*itertools.accumulate(fanout)))
+        return count
+
+
+if __name__ == "__main__":
+    # python -m model.BreachChecker pwned-passwords-sha1-ordered-by-hash.txt breached_passwords.bin
+    if len(sys.argv) != 3:
+        print("Usage: python -m model.BreachChecker <HIBP SHA-1 dump> <output file>")
+        sys.exit(2)
+    total = BreachChecker.convert(sys.argv[1], sys.argv[2])
+    print(f"Wrote {total} breached password hashes to {sys.argv[2]}")
@@ -0,0 +1,101 @@
+import time
+from typing import List, Optional
+from .DatabaseManager import DatabaseManager
+
+
+class ChangeLog:
+    """Answers "which entries changed since revision N" from the trigger-maintained log
+    
+    Each entry carries the revision of its latest change, so changed entries
+    that still exist are found through an index on passwords alone. The
+    entry_changes log is only needed for deletions and for history, which is
+    what lets compact() trim it aggressively. Once a deletion has been trimmed
+    away, callers asking about revisions before it must reload everything;
+    changes_since() returns None for them.
+    """
+    
+    RETENTION_DAYS = 30  # Log rows older than this are removed by compact()
+    
+    def __init__(self, db_manager: DatabaseManager, retention_days: Optional[float] = None):
+        self.db_manager = db_manager
+        self.retention_days = self.RETENTION_DAYS if retention_days is None else retention_days
+    
+    @staticmethod
+    def _get_horizon(cursor) -> int:
+        """Get the newest revision whose deletion record has been removed"""
+        cursor.execute("SELECT value FROM change_log_state WHERE name = 'horizon'")
+        result = cursor.fetchone()
+        return result[0] if result else 0
+    
+    def latest_revision(self) -> int:
+        """Get the revision of the most recent change, or 0 if nothing has changed"""
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'entry_changes'")
+        result = cursor.fetchone()
+        conn.close()
+        return result[0] if result else 0
+    
+    def changes_since(self, user_email: str, revision: int) -> Optional[List[int]]:
+        """Get the ids of a user's entries changed after a revision, ordered by their latest change
+        
+        Returns None if the log no longer covers that revision, in which case
+        the caller has to reload everything.
+        """
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        try:
+            if revision < self._get_horizon(cursor):
+                return None
+            cursor.execute(
+                """SELECT id, revision FROM passwords
+                   WHERE user_email = ? AND revision > ?
+                   UNION ALL
+                   SELECT entry_id, revision FROM entry_changes
+                   WHERE revision > ? AND op = 'delete' AND user_email = ?
+                   ORDER BY revision""",
+                (user_email, revision, revision, user_email)
+            )
+            return list(dict.fromkeys(row[0] for row in cursor.fetchall()))
+        finally:
+            conn.close()
+    
+    def compact(self, retention_days: Optional[float] = None) -> int:
+        """Trim the log and return the number of rows removed
+        
+        Rows superseded by a later change to the same entry are removed, as
+        are rows older than the retention period. The horizon is raised past
+        any deletion removed that way.
+        """
+        if retention_days is None:
+            retention_days = self.retention_days
+        cutoff = time.time() - retention_days * 86400
+        
+        try:
+            with self.db_manager.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """DELETE FROM entry_changes WHERE EXISTS (
+                           SELECT 1 FROM entry_changes later
+                           WHERE later.entry_id = entry_changes.entry_id
+                           AND later.revision > entry_changes.revision)"""
+                )
+                removed = cursor.rowcount
+                
+                cursor.execute(
+                    "SELECT MAX(revision) FROM entry_changes WHERE COALESCE(changed_at, 0) < ? AND op = 'delete'",
+                    (cutoff,)
+                )
+                horizon = cursor.fetchone()[0]
+                if horizon is not None and horizon > self._get_horizon(cursor):
+                    cursor.execute(
+                        "INSERT OR REPLACE INTO change_log_state (name, value) VALUES ('horizon', ?)",
+                        (horizon,)
+                    )
+                
+                cursor.execute("DELETE FROM entry_changes WHERE COALESCE(changed_at, 0) < ?", (cutoff,))
+                removed += cursor.rowcount
+            return removed
+        except Exception as e:
+            print(f"Error compacting change log: {e}")
+            return 0
@@ -0,0 +1,63 @@
+from typing import List, Optional
+from .ChangeLog import ChangeLog
+from .DatabaseManager import DatabaseManager
+
+
+class ChangeMonitor:
+    """Detects commits made by other connections and reports the entries they touched
+    
+    A dedicated connection is kept open because PRAGMA data_version only
+    changes, for a given connection, when some other connection commits. That
+    makes each poll a single cheap pragma while nothing has changed. When it
+    has, the change log says which entries to refresh.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager, change_log: ChangeLog):
+        self.db_manager = db_manager
+        self.change_log = change_log
+        self._conn = None
+        self._data_version = None
+        self._last_revision = 0
+    
+    def start(self) -> None:
+        """Open the monitoring connection and ignore everything logged so far"""
+        self.stop()
+        self._conn = self.db_manager.connect()
+        self._data_version = self._read_data_version()
+        self._last_revision = self.change_log.latest_revision()
+    
+    def stop(self) -> None:
+        """Close the monitoring connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+    
+    def _read_data_version(self) -> int:
+        """Read the connection's data version counter"""
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+    
+    def poll(self, user_email: str) -> Optional[List[int]]:
+        """Get the ids of a user's entries changed since the last poll, oldest change first
+        
+        Changes made through this process are reported too; refreshing an
+        entry that is already up to date is harmless. Returns None when the
+        change log no longer reaches back to the last poll.
+        """
+        if self._conn is None:
+            self.start()
+            return []
+        
+        try:
+            data_version = self._read_data_version()
+            if data_version == self._data_version:
+                return []
+            self._data_version = data_version
+            
+            # Read the latest revision first so changes committed meanwhile are seen next time
+            latest_revision = self.change_log.latest_revision()
+            changed = self.change_log.changes_since(user_email, self._last_revision)
+            self._last_revision = latest_revision
+            return changed
+        except Exception as e:
+            print(f"Error checking for external changes: {e}")
+            return []
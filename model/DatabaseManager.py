@@ -1,17 +1,130 @@
 import base64
 import hashlib
+import hmac
 import os
+import random
 import sqlite3
 import sys
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from .Frecency import log_add_exp
+from .Sites import on_site
+
+
+class _TransactionConnection:
+    """Connection handle given out while a transaction is active
+
+    Services call commit() and close() after each operation; inside a
+    transaction those are deferred to the transaction itself so that all
+    statements are committed (or rolled back) together.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def commit(self):
+        """Deferred until the enclosing transaction ends"""
+
+    def close(self):
+        """Deferred until the enclosing transaction ends"""
+
+
+class TransactionAborted(Exception):
+    """Raised inside a transaction when a vault change fails, so the whole block rolls back"""
+
+
+def _is_busy_error(error: Exception) -> bool:
+    """Check whether an error means another connection holds a conflicting lock"""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    message = str(error).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+def retry_on_busy(operation, attempts: int = 6, base_delay: float = 0.05, max_delay: float = 1.0,
+                  before_retry=None):
+    """Run an operation, retrying with exponential backoff while the database is locked
+
+    SQLite's own busy timeout already waits for a while on each attempt; this
+    covers the cases it gives up on, such as another instance holding a long
+    write transaction. Jitter keeps competing instances from retrying in step.
+    before_retry, if given, is called after each failed attempt.
+    """
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if not _is_busy_error(e) or attempt == attempts - 1:
+                raise
+            if before_retry is not None:
+                before_retry()
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+class _RetryingCursor(sqlite3.Cursor):
+    """Cursor whose statements are retried while another writer holds the lock"""
+
+    def execute(self, sql, parameters=()):
+        return self._retry(lambda: super(_RetryingCursor, self).execute(sql, parameters))
+
+    def executemany(self, sql, seq_of_parameters):
+        # Materialise generators so a retry sees the same rows again
+        rows = list(seq_of_parameters)
+        return self._retry(lambda: super(_RetryingCursor, self).executemany(sql, rows))
+
+    def _retry(self, operation):
+        """Retry a statement, discarding the implicit transaction it opened if it failed
+
+        Python opens a deferred transaction just before the first write. If
+        that write is refused, the transaction may hold a stale snapshot that
+        can never be upgraded to a write, so it is rolled back before retrying.
+        Transactions opened earlier are left alone.
+        """
+        conn = self.connection
+        started_here = not conn.in_transaction
+
+        def reset():
+            if started_here and conn.in_transaction:
+                conn.rollback()
+
+        return retry_on_busy(operation, before_retry=reset)
+
+
+class _RetryingConnection(sqlite3.Connection):
+    """Connection that retries statements and commits while the database is locked
+
+    A statement that fails with SQLITE_BUSY has no effect, so running it again
+    is safe. Services keep using plain execute()/commit() calls.
+    """
+
+    def cursor(self, factory=_RetryingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        return retry_on_busy(super().commit)
 
 
 class DatabaseManager:
     """Manages database connections, encryption, and schema initialization"""
+    
+    BUSY_TIMEOUT = 1.0  # Seconds SQLite itself waits for a lock before each retry
 
     @staticmethod
     def get_data_directory():
@@ -39,11 +152,13 @@ class DatabaseManager:
         else:
             self.db_file = db_file
         self.master_key = master_key
-        self._cipher = self._create_cipher(master_key)
+        self._cipher, self._fingerprint_key = self._create_cipher(master_key)
+        # Per-thread transaction state (connection and savepoint depth)
+        self._local = threading.local()
         self._init_database()
     
     def _create_cipher(self, password: str):
-        """Create Fernet cipher from password"""
+        """Create Fernet cipher and password fingerprint key from password"""
         # Derive a key from the password
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
@@ -51,28 +166,125 @@ class DatabaseManager:
             salt=b'password_vault_salt',  # In production, use a random salt stored separately
             iterations=100000,
         )
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
-        return Fernet(key)
+        master = kdf.derive(password.encode())
+        key = base64.urlsafe_b64encode(master)
+        # A separate key for fingerprints, so they reveal nothing about the cipher key
+        fingerprint_key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=b'password_vault_fingerprint',
+        ).derive(master)
+        return Fernet(key), fingerprint_key
     
     def encrypt(self, data: str) -> str:
         """Encrypt string data"""
         return self._cipher.encrypt(data.encode()).decode()
     
+    def fingerprint(self, data: str) -> str:
+        """Keyed fingerprint of a password, equal for equal passwords
+        
+        Lets reused passwords be found with an index lookup instead of
+        decrypting the vault. Without the vault key it cannot be checked
+        against guesses.
+        """
+        return hmac.new(self._fingerprint_key, data.encode(), hashlib.sha256).hexdigest()[:32]
+    
     def decrypt(self, encrypted_data: str) -> str:
         """Decrypt string data"""
         return self._cipher.decrypt(encrypted_data.encode()).decode()
     
     def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_file)
+        """Get database connection
+
+        Inside a transaction this returns a handle to the transaction's
+        connection, so existing service methods join the unit of work.
+        """
+        active = getattr(self._local, "conn", None)
+        if active is not None:
+            return _TransactionConnection(active)
+        return self.connect()
+    
+    def connect(self, **kwargs) -> sqlite3.Connection:
+        """Open a new connection with row access by name and the SQL helper functions"""
+        conn = sqlite3.connect(self.db_file, timeout=self.BUSY_TIMEOUT, factory=_RetryingConnection, **kwargs)
         conn.row_factory = sqlite3.Row
+        conn.create_function("log_add_exp", 2, log_add_exp, deterministic=True)
+        conn.create_function("on_site", 2, on_site, deterministic=True)
         return conn
     
+    @property
+    def in_transaction(self) -> bool:
+        """Whether this thread is inside transaction()"""
+        return getattr(self._local, "conn", None) is not None
+    
+    @contextmanager
+    def transaction(self):
+        """Group several operations into a single all-or-nothing commit
+        
+        Any exception raised inside the block rolls back every change made
+        since the block was entered. Nested transactions use savepoints, so
+        an inner failure only undoes the inner block.
+        """
+        active = getattr(self._local, "conn", None)
+        if active is not None:
+            self._local.depth += 1
+            savepoint = f"sp_{self._local.depth}"
+            pending = len(self._local.after_commit)
+            active.execute(f"SAVEPOINT {savepoint}")
+            try:
+                yield _TransactionConnection(active)
+            except BaseException:
+                active.execute(f"ROLLBACK TO {savepoint}")
+                active.execute(f"RELEASE {savepoint}")
+                del self._local.after_commit[pending:]
+                raise
+            else:
+                active.execute(f"RELEASE {savepoint}")
+            finally:
+                self._local.depth -= 1
+            return
+        
+        conn = self.connect(isolation_level=None)
+        self._local.conn = conn
+        self._local.depth = 0
+        self._local.after_commit = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield _TransactionConnection(conn)
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+            callbacks = self._local.after_commit
+        finally:
+            self._local.conn = None
+            self._local.after_commit = []
+            conn.close()
+        for callback in callbacks:
+            callback()
+    
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """Call back once the active transaction commits, or now if there is none
+        
+        Callbacks registered inside a block that rolls back are dropped, so
+        in-memory bookkeeping never outlives the changes it describes.
+        """
+        if self.in_transaction:
+            self._local.after_commit.append(callback)
+        else:
+            callback()
+    
     def _init_database(self):
         """Initialize database schema"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        # Write-ahead logging lets other instances read while one of them writes
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
         # Create users table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -101,15 +313,276 @@ class DatabaseManager:
         if "copy_count" not in columns:
             cursor.execute("ALTER TABLE passwords ADD COLUMN copy_count INTEGER NOT NULL DEFAULT 0")
         
+        # Add usage recency columns (see Frecency) if they don't exist
+        if "last_used_at" not in columns:
+            cursor.execute("ALTER TABLE passwords ADD COLUMN last_used_at REAL")
+        if "frecency" not in columns:
+            cursor.execute("ALTER TABLE passwords ADD COLUMN frecency REAL")
+        
+        # Add the per-row revision (see ChangeLog) if it doesn't exist
+        if "revision" not in columns:
+            cursor.execute("ALTER TABLE passwords ADD COLUMN revision INTEGER")
+        
+        # Add the keyed password fingerprint if it doesn't exist
+        if "password_fingerprint" not in columns:
+            cursor.execute("ALTER TABLE passwords ADD COLUMN password_fingerprint TEXT")
+        
+        # Add the per-entry health facts (see AuditService) if they don't exist
+        for column, column_type in (("strength", "INTEGER"), ("breached", "INTEGER"),
+                                    ("password_changed_at", "REAL"), ("audit_stamp", "INTEGER")):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE passwords ADD COLUMN {column} {column_type}")
+        
+        # Add the trash timestamp (see TrashService) if it doesn't exist
+        if "deleted_at" not in columns:
+            cursor.execute("ALTER TABLE passwords ADD COLUMN deleted_at REAL")
+        
         # Create index for faster queries
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_passwords_user 
             ON passwords(user_email)
         """)
+        # Covers trashed entries too, since the change log must see them leave
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_passwords_user_revision
+            ON passwords(user_email, revision)
+        """)
+        # The list, search and audit only read live entries, so their indexes
+        # leave the trash out; replace full indexes from older versions
+        for name, columns in (
+            ("idx_passwords_user_order", "user_email, custom_order"),
+            ("idx_passwords_user_frecency", "user_email, frecency"),
+            ("idx_passwords_user_name", "user_email, name COLLATE NOCASE"),
+            ("idx_passwords_user_copy_count", "user_email, copy_count"),
+            ("idx_passwords_user_fingerprint", "user_email, password_fingerprint"),
+            ("idx_passwords_user_strength", "user_email, strength"),
+            ("idx_passwords_user_breached", "user_email, breached"),
+            ("idx_passwords_user_changed", "user_email, password_changed_at"),
+            ("idx_passwords_user_audit_stamp", "user_email, audit_stamp"),
+        ):
+            self._replace_index(cursor, name, f"passwords({columns}) WHERE deleted_at IS NULL")
+        self._replace_index(cursor, "idx_passwords_trash", "passwords(user_email, deleted_at) WHERE deleted_at IS NOT NULL")
+        
+        self._init_change_log(cursor)
+        self._init_generator_policies(cursor)
+        self._init_rotations(cursor)
+        self._init_history(cursor)
+        self._backfill_fingerprints(cursor)
         
         conn.commit()
         conn.close()
     
+    @staticmethod
+    def _replace_index(cursor, name: str, definition: str):
+        """Create an index, replacing one of the same name whose definition differs"""
+        sql = f"CREATE INDEX {name} ON {definition}"
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (name,))
+        existing = cursor.fetchone()
+        if existing is None or existing[0] != sql:
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+            cursor.execute(sql)
+    
+    def _backfill_fingerprints(self, cursor):
+        """Fingerprint entries stored before fingerprints existed
+        
+        Entries that cannot be decrypted with this key are left without one.
+        """
+        cursor.execute("SELECT id, password FROM passwords WHERE password_fingerprint IS NULL")
+        rows = []
+        for entry_id, encrypted_password in cursor.fetchall():
+            try:
+                rows.append((self.fingerprint(self.decrypt(encrypted_password)), entry_id))
+            except Exception:
+                continue
+        if rows:
+            cursor.executemany("UPDATE passwords SET password_fingerprint = ? WHERE id = ?", rows)
+    
+    def _init_change_log(self, cursor):
+        """Create the change log and the triggers that maintain it
+        
+        Every insert, update and delete on passwords appends a row to
+        entry_changes, and the revision of that row is stamped on the entry.
+        Revisions only increase, so "what changed since revision N" is a range
+        query. The update trigger skips its own revision stamp to avoid
+        logging every change twice.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS entry_changes (
+                revision INTEGER PRIMARY KEY AUTOINCREMENT,
+                entry_id INTEGER NOT NULL,
+                user_email TEXT NOT NULL
+            )
+        """)
+        cursor.execute("PRAGMA table_info(entry_changes)")
+        columns = [row[1] for row in cursor.fetchall()]
+        if "op" not in columns:
+            cursor.execute("ALTER TABLE entry_changes ADD COLUMN op TEXT NOT NULL DEFAULT 'update'")
+        if "changed_at" not in columns:
+            cursor.execute("ALTER TABLE entry_changes ADD COLUMN changed_at REAL")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_entry_changes_entry
+            ON entry_changes(entry_id, revision)
+        """)
+        
+        # Single-value bookkeeping for the change log, e.g. the compaction horizon
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS change_log_state (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+        
+        # Replace triggers whose definition differs, e.g. in databases from older versions
+        now = "(julianday('now') - 2440587.5) * 86400.0"
+        for event, row, condition in (
+            ("INSERT", "NEW", ""),
+            ("UPDATE", "NEW", "WHEN NEW.revision IS OLD.revision"),
+            ("DELETE", "OLD", ""),
+        ):
+            stamp = "" if event == "DELETE" else f"""
+                    UPDATE passwords SET revision = last_insert_rowid() WHERE id = NEW.id;"""
+            name = f"trg_passwords_{event.lower()}"
+            sql = f"""CREATE TRIGGER {name}
+                AFTER {event} ON passwords {condition}
+                BEGIN
+                    INSERT INTO entry_changes (entry_id, user_email, op, changed_at)
+                    VALUES ({row}.id, {row}.user_email, '{event.lower()}', {now});{stamp}
+                END"""
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,))
+            existing = cursor.fetchone()
+            if existing is None or existing[0] != sql:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+                cursor.execute(sql)
+    
+    def _init_generator_policies(self, cursor):
+        """Create the table of saved generator policies (see PolicyService)
+        
+        Scopes are "entry:<id>" or "site:<host>"; an entry's policy is
+        dropped along with the entry.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS generator_policies (
+                user_email TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                policy TEXT NOT NULL,
+                PRIMARY KEY (user_email, scope)
+            )
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_passwords_delete_policy
+            AFTER DELETE ON passwords
+            BEGIN
+                DELETE FROM generator_policies
+                WHERE user_email = OLD.user_email AND scope = 'entry:' || OLD.id;
+            END
+        """)
+    
+    def _init_rotations(self, cursor):
+        """Create the tables that keep the old passwords of bulk rotations (see RotationService)
+        
+        Each rotation is a batch; its items hold every rotated entry's
+        encrypted password and audit facts from before the rotation, so the
+        batch can be undone without decrypting anything.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rotation_batches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_email TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                undone_at REAL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_rotation_batches_user
+            ON rotation_batches(user_email, created_at)
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rotation_items (
+                batch_id INTEGER NOT NULL,
+                entry_id INTEGER NOT NULL,
+                old_password TEXT NOT NULL,
+                old_fingerprint TEXT,
+                old_strength INTEGER,
+                old_breached INTEGER,
+                old_audit_stamp INTEGER,
+                old_changed_at REAL,
+                new_fingerprint TEXT NOT NULL,
+                PRIMARY KEY (batch_id, entry_id)
+            )
+        """)
+    
+    def _init_history(self, cursor):
+        """Create the entry history (see HistoryService) and the trigger that fills it
+        
+        Every update that changes an entry's name, username, URL or password
+        records what it replaced: a bitmask of the changed fields and only
+        their old values, with the old password still encrypted. An entry's
+        history is dropped along with the entry.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS entry_history (
+                revision INTEGER PRIMARY KEY AUTOINCREMENT,
+                entry_id INTEGER NOT NULL,
+                user_email TEXT NOT NULL,
+                changed_at REAL NOT NULL,
+                fields INTEGER NOT NULL,
+                name TEXT,
+                username TEXT,
+                url TEXT,
+                password TEXT,
+                password_fingerprint TEXT
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_entry_history_entry
+            ON entry_history(entry_id, revision)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_entry_history_user_changed
+            ON entry_history(user_email, changed_at)
+        """)
+        
+        # Per-user retention; users without a row get HistoryService's defaults
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS history_settings (
+                user_email TEXT PRIMARY KEY,
+                max_versions INTEGER NOT NULL,
+                retention_days REAL NOT NULL
+            )
+        """)
+        
+        changed = {
+            "name": "OLD.name IS NOT NEW.name",
+            "username": "OLD.username IS NOT NEW.username",
+            "url": "OLD.url IS NOT NEW.url",
+            "password": "OLD.password_fingerprint IS NOT NEW.password_fingerprint",
+        }
+        mask = " | ".join(f"(CASE WHEN {condition} THEN {1 << bit} ELSE 0 END)"
+                          for bit, condition in enumerate(changed.values()))
+        now = "(julianday('now') - 2440587.5) * 86400.0"
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_passwords_history
+            AFTER UPDATE OF name, username, url, password_fingerprint ON passwords
+            WHEN {" OR ".join(changed.values())}
+            BEGIN
+                INSERT INTO entry_history (entry_id, user_email, changed_at, fields,
+                                           name, username, url, password, password_fingerprint)
+                VALUES (OLD.id, OLD.user_email, {now}, {mask},
+                        CASE WHEN {changed["name"]} THEN OLD.name END,
+                        CASE WHEN {changed["username"]} THEN OLD.username END,
+                        CASE WHEN {changed["url"]} THEN OLD.url END,
+                        CASE WHEN {changed["password"]} THEN OLD.password END,
+                        CASE WHEN {changed["password"]} THEN OLD.password_fingerprint END);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_passwords_delete_history
+            AFTER DELETE ON passwords
+            BEGIN
+                DELETE FROM entry_history WHERE entry_id = OLD.id;
+            END
+        """)
+    
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash password using SHA-256"""
@@ -0,0 +1,44 @@
+"""Time-decayed usage scores ("frecency") for password entries
+
+Each use adds exp(-DECAY_RATE * age) to an entry's score, so a use loses half
+its weight every HALF_LIFE_DAYS. Rather than the decaying score itself, the
+database stores its time-independent log form
+
+    key = ln(sum(exp(DECAY_RATE * t_use)))
+
+which only changes when the entry is used. Ordering by key is the same as
+ordering by the current score, so the column can be indexed and sorted
+without replaying usage history.
+"""
+import math
+import time
+from typing import Optional
+
+HALF_LIFE_DAYS = 14
+DECAY_RATE = math.log(2) / (HALF_LIFE_DAYS * 24 * 60 * 60)
+
+
+def log_add_exp(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    """Compute ln(exp(a) + exp(b)) without overflow, treating None as no uses"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def use_key(timestamp: Optional[float] = None) -> float:
+    """Get the key contribution of a single use at the given time"""
+    if timestamp is None:
+        timestamp = time.time()
+    return DECAY_RATE * timestamp
+
+
+def score_at(key: Optional[float], timestamp: Optional[float] = None) -> float:
+    """Get the decayed score of a key at the given time"""
+    if key is None:
+        return 0.0
+    if timestamp is None:
+        timestamp = time.time()
+    return math.exp(key - DECAY_RATE * timestamp)
@@ -0,0 +1,148 @@
+import time
+from typing import Callable, List, Optional, Tuple
+from .DatabaseManager import DatabaseManager
+
+
+class EntryVersion:
+    """One version of an entry, newest first in a history
+    
+    The password stays encrypted until it is read, as in VaultEntry.
+    """
+    
+    __slots__ = ("revision", "name", "username", "url", "replaced_at", "changed",
+                 "_encrypted_password", "_decrypt")
+    
+    def __init__(self, revision: Optional[int], name: str, username: str, url: str,
+                 encrypted_password: str, decrypt: Callable[[str], str],
+                 replaced_at: Optional[float] = None, changed: Tuple[str, ...] = ()):
+        self.revision = revision  # None for the current version
+        self.name = name
+        self.username = username
+        self.url = url or ""
+        self.replaced_at = replaced_at  # When the next version replaced this one
+        self.changed = changed  # Fields the next version changed
+        self._encrypted_password = encrypted_password
+        self._decrypt = decrypt
+    
+    @property
+    def current(self) -> bool:
+        """Whether this is the entry as it is now"""
+        return self.revision is None
+    
+    @property
+    def password(self) -> str:
+        """Decrypt and return the password"""
+        try:
+            return self._decrypt(self._encrypted_password)
+        except Exception:
+            return ""
+
+
+class HistoryService:
+    """Reads and trims the per-entry history kept by the entry_history trigger
+    
+    A history row holds only what one update replaced, so versions are
+    rebuilt by starting from the entry as it is now and applying the rows
+    newest first. Dropping the oldest rows never invalidates newer
+    versions, which lets compact() trim by age and by count per entry.
+    """
+    
+    FIELDS = ("name", "username", "url", "password")  # In the bit order of the fields mask
+    MAX_VERSIONS = 20  # Old versions kept per entry by default; 0 keeps all
+    RETENTION_DAYS = 365  # Old versions are kept this long by default; 0 keeps them forever
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+    
+    def get_retention(self, user_email: str) -> Tuple[int, float]:
+        """Get how many old versions per entry a user keeps, and for how many days"""
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT max_versions, retention_days FROM history_settings WHERE user_email = ?",
+                (user_email,)
+            )
+            row = cursor.fetchone()
+        finally:
+            conn.close()
+        return (row[0], row[1]) if row else (self.MAX_VERSIONS, self.RETENTION_DAYS)
+    
+    def set_retention(self, user_email: str, max_versions: int, retention_days: float) -> bool:
+        """Change a user's retention and trim their history to it"""
+        if max_versions < 0 or retention_days < 0:
+            print("Error saving history retention: values cannot be negative")
+            return False
+        try:
+            with self.db_manager.transaction() as conn:
+                conn.cursor().execute(
+                    "INSERT OR REPLACE INTO history_settings (user_email, max_versions, retention_days) VALUES (?, ?, ?)",
+                    (user_email, max_versions, retention_days)
+                )
+                self.compact(user_email)
+            return True
+        except Exception as e:
+            print(f"Error saving history retention: {e}")
+            return False
+    
+    def get_history(self, user_email: str, entry_id: int, limit: Optional[int] = None) -> List[EntryVersion]:
+        """Get an entry's versions, newest (the current one) first, or [] if there is no such entry"""
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT name, username, url, password FROM passwords WHERE id = ? AND user_email = ? AND deleted_at IS NULL",
+                (entry_id, user_email)
+            )
+            current = cursor.fetchone()
+            if current is None:
+                return []
+            cursor.execute(
+                """SELECT revision, changed_at, fields, name, username, url, password FROM entry_history
+                   WHERE entry_id = ? ORDER BY revision DESC LIMIT ?""",
+                (entry_id, -1 if limit is None else max(limit - 1, 0))
+            )
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+        
+        decrypt = self.db_manager.decrypt
+        state = dict(zip(self.FIELDS, current))
+        versions = [EntryVersion(None, state["name"], state["username"], state["url"], state["password"], decrypt)]
+        for row in rows:
+            changed = tuple(field for bit, field in enumerate(self.FIELDS) if row['fields'] & (1 << bit))
+            for field in changed:
+                state[field] = row[field]
+            versions.append(EntryVersion(
+                row['revision'], state["name"], state["username"], state["url"], state["password"], decrypt,
+                replaced_at=row['changed_at'], changed=changed
+            ))
+        return versions
+    
+    def compact(self, user_email: str) -> int:
+        """Trim a user's history to their retention and return the number of versions removed"""
+        max_versions, retention_days = self.get_retention(user_email)
+        cutoff = time.time() - retention_days * 86400 if retention_days else 0
+        try:
+            with self.db_manager.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "DELETE FROM entry_history WHERE user_email = ? AND changed_at < ?",
+                    (user_email, cutoff)
+                )
+                removed = cursor.rowcount
+                if max_versions:
+                    cursor.execute(
+                        """DELETE FROM entry_history WHERE revision IN (
+                               SELECT revision FROM (
+                                   SELECT revision, ROW_NUMBER() OVER (
+                                       PARTITION BY entry_id ORDER BY revision DESC) AS newer
+                                   FROM entry_history WHERE user_email = ?)
+                               WHERE newer > ?)""",
+                        (user_email, max_versions)
+                    )
+                    removed += cursor.rowcount
+            return removed
+        except Exception as e:
+            print(f"Error compacting entry history: {e}")
+            return 0
@@ -0,0 +1,402 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from urllib.parse import urlparse
+from .DatabaseManager import DatabaseManager
+from .PasswordService import PasswordService
+
+
+class ImportReport:
+    """Outcome and throughput of a bulk import"""
+    
+    __slots__ = (
+        "source_format", "position_label", "rows_read", "imported", "rejects",
+        "started_at", "finished_at", "error",
+    )
+    
+    def __init__(self, position_label: str = "Line"):
+        self.source_format: Optional[str] = None
+        self.position_label = position_label  # What reject positions count, e.g. "Line" or "Item"
+        self.rows_read = 0
+        self.imported = 0
+        self.rejects: List[Tuple[int, str]] = []  # (position, reason)
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None  # Set when the import failed as a whole
+    
+    @property
+    def elapsed(self) -> float:
+        """Seconds the import took so far"""
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+    
+    @property
+    def rows_per_second(self) -> float:
+        """Rows read per second"""
+        return self.rows_read / self.elapsed if self.elapsed > 0 else 0.0
+    
+    def summary(self) -> str:
+        """Human-readable one-paragraph summary"""
+        if self.error:
+            return f"Import failed: {self.error}"
+        text = (f"Imported {self.imported} of {self.rows_read} entries"
+                f" from {self.source_format or 'file'} in {self.elapsed:.2f} s"
+                f" ({self.rows_per_second:.0f} rows/s).")
+        if self.rejects:
+            shown = "\n".join(f"{self.position_label} {position}: {reason}" for position, reason in self.rejects[:10])
+            more = f"\n...and {len(self.rejects) - 10} more" if len(self.rejects) > 10 else ""
+            text += f"\n\n{len(self.rejects)} rows skipped:\n{shown}{more}"
+        return text
+
+
+class _JsonArrayStream:
+    """Walks a JSON document incrementally and yields the elements of arrays stored under a key
+    
+    Only the structure around the arrays is tracked; each element, and each
+    value outside them, is decoded on its own from a small sliding buffer.
+    Memory therefore depends on the largest single element, not on the
+    document size.
+    """
+    
+    CHUNK_SIZE = 64 * 1024  # Characters read per refill
+    
+    def __init__(self, f: TextIO, array_key: str):
+        self._file = f
+        self._array_key = array_key
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+    
+    def _refill(self) -> bool:
+        """Read more text into the buffer, dropping what has been consumed"""
+        if self._eof:
+            return False
+        data = self._file.read(self.CHUNK_SIZE)
+        if not data:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + data
+        self._pos = 0
+        return True
+    
+    def _peek(self) -> str:
+        """Return the next non-whitespace character without consuming it, or "" at the end"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._refill():
+                return ""
+    
+    def _expect(self, char: str) -> None:
+        """Consume a structural character"""
+        if self._peek() != char:
+            raise ValueError(f"Malformed JSON: expected '{char}'")
+        self._pos += 1
+    
+    def _decode_value(self) -> Any:
+        """Decode one complete value at the current position"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number running into the end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise ValueError("Malformed JSON")
+            # Read on and decode again; at the end of the file the next attempt settles it
+            self._refill()
+    
+    def __iter__(self) -> Iterator[Any]:
+        return self._walk(None)
+    
+    def _walk(self, key: Optional[str]) -> Iterator[Any]:
+        """Walk one value, yielding elements of arrays found under the array key"""
+        char = self._peek()
+        if char == "{":
+            self._pos += 1
+            if self._peek() == "}":
+                self._pos += 1
+                return
+            while True:
+                child_key = self._decode_value()
+                if not isinstance(child_key, str):
+                    raise ValueError("Malformed JSON: object key is not a string")
+                self._expect(":")
+                yield from self._walk(child_key)
+                if self._peek() == ",":
+                    self._pos += 1
+                    continue
+                self._expect("}")
+                return
+        elif char == "[":
+            self._pos += 1
+            if self._peek() == "]":
+                self._pos += 1
+                return
+            while True:
+                if key == self._array_key and self._peek() == "{":
+                    yield self._decode_value()
+                else:
+                    yield from self._walk(None)
+                if self._peek() == ",":
+                    self._pos += 1
+                    continue
+                self._expect("]")
+                return
+        elif char == "":
+            raise ValueError("Malformed JSON: unexpected end of file")
+        else:
+            self._decode_value()  # A scalar outside the item arrays
+
+
+class ImportService:
+    """Bulk-imports entries exported by browsers and other password managers
+    
+    Rows are streamed from the file, validated with PasswordService's rules,
+    encrypted on worker threads and inserted with executemany in batches, all
+    in one transaction. Invalid rows are skipped and reported with their row
+    number instead of failing the import.
+    """
+    
+    BATCH_SIZE = 2000  # Rows encrypted and inserted together
+    
+    # Column layouts by format: the header columns that identify it and the
+    # column holding each entry field (None when the format has no such column)
+    CSV_FORMATS = {
+        "Bitwarden": ({"login_uri", "login_username", "login_password"},
+                      {"name": "name", "username": "login_username", "password": "login_password", "url": "login_uri"}),
+        "KeePassXC": ({"title", "username", "password", "url", "group"},
+                      {"name": "title", "username": "username", "password": "password", "url": "url"}),
+        "Firefox": ({"url", "username", "password", "httprealm", "formactionorigin"},
+                    {"name": None, "username": "username", "password": "password", "url": "url"}),
+        "Chrome": ({"name", "url", "username", "password"},
+                   {"name": "name", "username": "username", "password": "password", "url": "url"}),
+    }
+    
+    def __init__(self, db_manager: DatabaseManager, password_service: PasswordService):
+        self.db_manager = db_manager
+        self.password_service = password_service
+    
+    @staticmethod
+    def _name_from_url(url: str) -> str:
+        """Derive an entry name from a URL for formats that have no name column"""
+        host = urlparse(url if "//" in url else f"//{url}").hostname or url
+        return host[4:] if host.startswith("www.") else host
+    
+    # ==================== CSV ====================
+    
+    @classmethod
+    def detect_csv_format(cls, header: List[str]) -> Optional[str]:
+        """Identify an export format from its CSV header row"""
+        columns = {column.strip().lower() for column in header}
+        for format_name, (required, _) in cls.CSV_FORMATS.items():
+            if required <= columns:
+                return format_name
+        return None
+    
+    def import_csv(self, path: str) -> ImportReport:
+        """Import a Chrome, Firefox, Bitwarden or KeePassXC CSV export"""
+        report = ImportReport()
+        if not self.password_service.current_user:
+            report.error = "No user is logged in"
+            return report
+        try:
+            # utf-8-sig drops the byte order mark some exporters write
+            with open(path, "r", encoding="utf-8-sig", newline="") as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header is None:
+                    raise ValueError("The file is empty")
+                report.source_format = self.detect_csv_format(header)
+                if report.source_format is None:
+                    raise ValueError("Unrecognised CSV layout")
+                records = self._csv_records(reader, header, report.source_format, report)
+                self._import_records(records, report)
+        except Exception as e:
+            report.error = str(e)
+            report.imported = 0
+            print(f"Error importing CSV: {e}")
+        report.finished_at = time.monotonic()
+        return report
+    
+    def _csv_records(self, reader, header: List[str], source_format: str,
+                     report: ImportReport) -> Iterator[Tuple[int, Dict[str, str]]]:
+        """Map CSV rows onto entry fields, yielding (row number, fields)"""
+        positions = {column.strip().lower(): i for i, column in enumerate(header)}
+        _, mapping = self.CSV_FORMATS[source_format]
+        indices = {field: positions[column] if column else None for field, column in mapping.items()}
+        type_index = positions.get("type") if source_format == "Bitwarden" else None
+        
+        for row in reader:
+            row_number = reader.line_num
+            if not any(row):
+                continue  # Blank line
+            if type_index is not None and type_index < len(row) and row[type_index] not in ("", "login"):
+                # Bitwarden also exports notes, cards and identities
+                report.rows_read += 1
+                report.rejects.append((row_number, f"Not a login item ({row[type_index]})"))
+                continue
+            fields = {
+                field: (row[index] if index is not None and index < len(row) else "")
+                for field, index in indices.items()
+            }
+            if not fields["name"] and fields["url"]:
+                fields["name"] = self._name_from_url(fields["url"])
+            yield row_number, fields
+    
+    # ==================== JSON ====================
+    
+    def import_json(self, path: str) -> ImportReport:
+        """Import a Bitwarden JSON export or a 1Password export.data file
+        
+        The document is walked incrementally, decoding one item at a time.
+        """
+        report = ImportReport(position_label="Item")
+        if not self.password_service.current_user:
+            report.error = "No user is logged in"
+            return report
+        try:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                self._import_records(self._json_records(_JsonArrayStream(f, "items"), report), report)
+            if report.source_format is None and not report.error:
+                report.source_format = "JSON"
+        except Exception as e:
+            report.error = str(e)
+            report.imported = 0
+            print(f"Error importing JSON: {e}")
+        report.finished_at = time.monotonic()
+        return report
+    
+    def _json_records(self, items: Iterable[Any], report: ImportReport) -> Iterator[Tuple[int, Dict[str, str]]]:
+        """Map exported items onto entry fields, yielding (item number, fields)"""
+        for number, item in enumerate(items, start=1):
+            if isinstance(item, dict) and isinstance(item.get("item"), dict):
+                item = item["item"]  # Some 1Password exports wrap each item
+            if not isinstance(item, dict):
+                report.rows_read += 1
+                report.rejects.append((number, "Not an item object"))
+                continue
+            if "overview" in item or "details" in item:
+                report.source_format = "1Password"
+                fields, reason = self._map_1password_item(item)
+            else:
+                report.source_format = report.source_format or "Bitwarden"
+                fields, reason = self._map_bitwarden_item(item)
+            if fields is None:
+                report.rows_read += 1
+                report.rejects.append((number, reason))
+                continue
+            if not fields["name"] and fields["url"]:
+                fields["name"] = self._name_from_url(fields["url"])
+            yield number, fields
+    
+    @staticmethod
+    def _text(value: Any) -> str:
+        """Coerce an exported value to text"""
+        return value if isinstance(value, str) else ""
+    
+    @classmethod
+    def _map_bitwarden_item(cls, item: dict) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+        """Map a Bitwarden item; only logins (type 1) are imported"""
+        login = item.get("login")
+        if item.get("type", 1) != 1 or not isinstance(login, dict):
+            return None, "Not a login item"
+        uris = login.get("uris") or []
+        url = uris[0].get("uri") if uris and isinstance(uris[0], dict) else ""
+        return {
+            "name": cls._text(item.get("name")),
+            "username": cls._text(login.get("username")),
+            "password": cls._text(login.get("password")),
+            "url": cls._text(url),
+        }, None
+    
+    @classmethod
+    def _map_1password_item(cls, item: dict) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+        """Map a 1Password item; login fields are found by their designation"""
+        if item.get("state") == "archived":
+            return None, "Archived item"
+        overview = item.get("overview") or {}
+        details = item.get("details") or {}
+        username = ""
+        password = cls._text(details.get("password"))
+        for field in details.get("loginFields") or []:
+            if not isinstance(field, dict):
+                continue
+            if field.get("designation") == "username" and not username:
+                username = cls._text(field.get("value"))
+            elif field.get("designation") == "password" and not password:
+                password = cls._text(field.get("value"))
+        if not password:
+            return None, "Item has no password"
+        url = cls._text(overview.get("url"))
+        if not url and overview.get("urls"):
+            first = overview["urls"][0]
+            url = cls._text(first.get("url")) if isinstance(first, dict) else ""
+        return {
+            "name": cls._text(overview.get("title")),
+            "username": username,
+            "password": password,
+            "url": url,
+        }, None
+    
+    # ==================== Shared insert path ====================
+    
+    def _import_records(self, records: Iterable[Tuple[int, Dict[str, str]]], report: ImportReport) -> None:
+        """Validate, encrypt and insert records in batches inside one transaction
+        
+        Each batch is split into slices encrypted on worker threads, and the
+        next batch is already being encrypted while the previous one is
+        inserted.
+        """
+        workers = min(4, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor, self.db_manager.transaction() as conn:
+            cursor = conn.cursor()
+            pending = None
+            for batch in self._validated_batches(records, report):
+                size = -(-len(batch) // workers)
+                futures = [executor.submit(self._encrypt_rows, batch[i:i + size])
+                           for i in range(0, len(batch), size)]
+                if pending is not None:
+                    self._insert_batch(cursor, pending, report)
+                pending = futures
+            if pending is not None:
+                self._insert_batch(cursor, pending, report)
+    
+    def _validated_batches(self, records: Iterable[Tuple[int, Dict[str, str]]],
+                           report: ImportReport) -> Iterator[List[Tuple[str, str, str, str]]]:
+        """Group valid records into batches, recording invalid ones as rejects"""
+        batch = []
+        for row_number, fields in records:
+            report.rows_read += 1
+            cleaned, error = PasswordService.check_entry_fields(
+                fields.get("name", ""), fields.get("username", ""),
+                fields.get("password", ""), fields.get("url", "")
+            )
+            if error:
+                report.rejects.append((row_number, error))
+                continue
+            batch.append(cleaned)
+            if len(batch) >= self.BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def _encrypt_rows(self, rows: List[Tuple[str, str, str, str]]) -> List[Tuple[str, str, str, str, str]]:
+        """Encrypt and fingerprint the passwords of validated rows"""
+        return self.password_service.seal_rows(rows)
+    
+    def _insert_batch(self, cursor, futures, report: ImportReport) -> None:
+        """Insert one batch once all of its slices are encrypted"""
+        rows = [row for future in futures for row in future.result()]
+        self.password_service.insert_encrypted_entries(cursor, rows)
+        report.imported += len(rows)
@@ -1,7 +1,24 @@
-from typing import Optional, List, Dict
-from .DatabaseManager import DatabaseManager
+from pathlib import Path
+from typing import Callable, Iterator, Optional, List, Dict, Tuple
+from .DatabaseManager import DatabaseManager, TransactionAborted
+from .ArchiveService import ArchiveService
+from .AuditService import AuditService, AuditSummary
 from .AuthService import AuthService
+from .BackupService import BackupService, BackupProgress
+from .BreachChecker import BreachChecker
 from .PasswordService import PasswordService
+from .PasswordGenerator import GeneratorPolicy
+from . import PasswordGenerator
+from .PolicyService import PolicyService
+from .RotationService import RotationService, RotationBatch, StagedRotation
+from .UsageTracker import UsageTracker
+from .ChangeLog import ChangeLog
+from .HistoryService import HistoryService, EntryVersion
+from .ImportService import ImportService, ImportReport
+from .ChangeMonitor import ChangeMonitor
+from .OperationLog import OperationLog, Operation
+from .TrashService import TrashService, TrashedEntry
+from .VaultEntry import VaultEntry
 
 
 class PasswordVaultModel:
@@ -11,13 +28,39 @@ class PasswordVaultModel:
     - DatabaseManager: handles database connections and encryption
     - AuthService: handles user authentication
     - PasswordService: handles password entry CRUD operations
+    - UsageTracker: buffers copy counts and writes them in batches
+    - ChangeLog: answers which entries changed since a revision
+    - ChangeMonitor: detects entries changed by other instances
+    - BackupService: takes online backups of the database
+    - ArchiveService: exports and imports encrypted vault archives
+    - ImportService: bulk-imports exports from other password managers
+    - BreachChecker: checks passwords against an offline breach database
+    - AuditService: keeps per-entry health facts for vault audits
+    - PolicyService: saves password generator policies per entry or site
+    - RotationService: rotates many passwords at once with a window to undo
+    - HistoryService: keeps earlier versions of each entry
+    - OperationLog: undoes and redoes this session's vault changes
+    - TrashService: keeps deleted entries until they are restored or purged
     """
 
     def __init__(self, db_file: Optional[str] = None, master_key: str = "default_secure_key_change_in_production"):
         # Initialize core services
         self.db_manager = DatabaseManager(db_file, master_key)
         self.auth_service = AuthService(self.db_manager)
-        self.password_service = PasswordService(self.db_manager)
+        self.breach_checker = BreachChecker(Path(self.db_manager.db_file).resolve().parent / BreachChecker.FILE_NAME)
+        self.audit_service = AuditService(self.db_manager, self.breach_checker)
+        self.password_service = PasswordService(self.db_manager, self.audit_service)
+        self.usage_tracker = UsageTracker(self.db_manager)
+        self.change_log = ChangeLog(self.db_manager)
+        self.change_monitor = ChangeMonitor(self.db_manager, self.change_log)
+        self.backup_service = BackupService(self.db_manager)
+        self.archive_service = ArchiveService(self.db_manager, self.password_service)
+        self.import_service = ImportService(self.db_manager, self.password_service)
+        self.policy_service = PolicyService(self.db_manager)
+        self.rotation_service = RotationService(self.db_manager, self.password_service, self.policy_service)
+        self.history_service = HistoryService(self.db_manager)
+        self.operation_log = OperationLog(self.db_manager, self.password_service)
+        self.trash_service = TrashService(self.db_manager, self.password_service)
     
     @property
     def current_user(self) -> Optional[str]:
@@ -49,6 +92,30 @@ class PasswordVaultModel:
         """Decrypt string data"""
         return self.db_manager.decrypt(encrypted_data)
     
+    def transaction(self):
+        """Group several vault operations into a single all-or-nothing commit
+        
+        Usage:
+            with model.transaction():
+                model.add_password_entry(...)
+                model.delete_password_entry(...)
+        
+        Raising inside the block rolls back every change made in it. An add,
+        update or delete that fails inside the block raises TransactionAborted,
+        so a block either commits every change or none of them.
+        """
+        return self.db_manager.transaction()
+    
+    def _check(self, result, action: str):
+        """Return a change's result, aborting the active transaction if the change failed
+        
+        Services report failures by returning False or None, which would
+        otherwise let the rest of a transaction commit.
+        """
+        if not result and self.db_manager.in_transaction:
+            raise TransactionAborted(f"Could not {action}")
+        return result
+    
     @staticmethod
     def _hash_password(password: str) -> str:
         """Hash password using SHA-256"""
@@ -66,47 +133,396 @@ class PasswordVaultModel:
         if success:
             # Sync current user to password service
             self.password_service.current_user = self.auth_service.current_user
+            self.operation_log.clear()
+            self.change_log.compact()
+            self.rotation_service.compact()
+            self.history_service.compact(self.current_user)
+            self.trash_service.purge_expired(self.current_user)
+            self.audit_service.refresh(self.current_user)
+            self.change_monitor.start()
         return success, message
     
     def logout(self):
         """Logout current user"""
+        self.flush_usage()
+        self.change_monitor.stop()
         self.auth_service.logout()
         self.password_service.current_user = None
+        self.operation_log.clear()
     
     # ==================== Password Service Methods ====================
     
     def add_password_entry(self, name: str, username: str, password: str, url: str = "") -> bool:
         """Add a new password entry for current user"""
-        return self.password_service.add_password_entry(name, username, password, url)
+        return self.add_entry(name, username, password, url) is not None
+    
+    def add_entry(self, name: str, username: str, password: str, url: str = "") -> Optional[int]:
+        """Add a new password entry and return its id, or None on failure"""
+        with self.operation_log.record(self.current_user, f"Add '{name}'"):
+            return self._check(self.password_service.add_entry(name, username, password, url), f"add '{name}'")
     
-    def get_password_entries(self) -> List[Dict]:
+    def add_entries(self, entries: List[Dict]) -> bool:
+        """Add several password entries in a single transaction"""
+        with self.operation_log.record(self.current_user, f"Add {len(entries)} entries"):
+            return self._check(self.password_service.add_entries(entries), f"add {len(entries)} entries")
+    
+    def get_password_entries(self) -> List[VaultEntry]:
         """Get all password entries for current user"""
         return self.password_service.get_password_entries()
     
     def delete_password_entry(self, index: int) -> bool:
-        """Delete a password entry by index"""
-        return self.password_service.delete_password_entry(index)
+        """Move a password entry to the trash by index"""
+        with self.operation_log.record(self.current_user, "Delete entry", self._ids_at([index])):
+            return self._check(self.password_service.delete_password_entry(index), "delete entry")
+    
+    def delete_entry(self, entry_id: int) -> bool:
+        """Move a password entry to the trash by id"""
+        with self.operation_log.record(self.current_user, "Delete entry", [entry_id]):
+            return self._check(self.password_service.delete_entry(entry_id), "delete entry")
     
     def delete_all_entries(self) -> bool:
-        """Delete all password entries for current user"""
-        return self.password_service.delete_all_entries()
+        """Move all password entries of the current user to the trash"""
+        with self.operation_log.record(self.current_user, "Delete all entries", self.password_service.get_entry_ids()):
+            return self._check(self.password_service.delete_all_entries(), "delete all entries")
+    
+    def delete_entries(self, indices: List[int]) -> bool:
+        """Move several password entries to the trash by index in a single transaction"""
+        with self.operation_log.record(self.current_user, f"Delete {len(indices)} entries", self._ids_at(indices)):
+            return self._check(self.password_service.delete_entries(indices), f"delete {len(indices)} entries")
     
     def update_password_entry(self, index: int, name: str, username: str, password: str, url: str = "") -> bool:
         """Update a password entry by index"""
-        return self.password_service.update_password_entry(index, name, username, password, url)
+        with self.operation_log.record(self.current_user, f"Edit '{name}'", self._ids_at([index])):
+            result = self.password_service.update_password_entry(index, name, username, password, url)
+            return self._check(result, f"edit '{name}'")
+    
+    def update_entry(self, entry_id: int, name: str, username: str, password: str, url: str = "") -> bool:
+        """Update a password entry by id"""
+        with self.operation_log.record(self.current_user, f"Edit '{name}'", [entry_id]):
+            result = self.password_service.update_entry(entry_id, name, username, password, url)
+            return self._check(result, f"edit '{name}'")
+    
+    def update_entries(self, updates: List[Tuple[int, Dict]]) -> bool:
+        """Update several password entries by index in a single transaction"""
+        entry_ids = self._ids_at([index for index, _ in updates])
+        with self.operation_log.record(self.current_user, f"Edit {len(updates)} entries", entry_ids):
+            return self._check(self.password_service.update_entries(updates), f"edit {len(updates)} entries")
     
     def move_entry_up(self, index: int) -> bool:
         """Move an entry up in custom order"""
-        return self.password_service.move_entry_up(index)
+        with self.operation_log.record_move(self.current_user, "Move entry", next(iter(self._ids_at([index])), None)):
+            return self.password_service.move_entry_up(index)
     
     def move_entry_down(self, index: int) -> bool:
         """Move an entry down in custom order"""
-        return self.password_service.move_entry_down(index)
+        with self.operation_log.record_move(self.current_user, "Move entry", next(iter(self._ids_at([index])), None)):
+            return self.password_service.move_entry_down(index)
+    
+    def move_entry(self, entry_id: int, before_id: Optional[int] = None, after_id: Optional[int] = None) -> bool:
+        """Move an entry directly before or after another entry in custom order"""
+        with self.operation_log.record_move(self.current_user, "Move entry", entry_id):
+            return self.password_service.move_entry(entry_id, before_id, after_id)
+    
+    def get_neighbour_id(self, entry_id: int, previous: bool) -> Optional[int]:
+        """Get the id of the entry just before or after the given entry in custom order"""
+        return self.password_service.get_neighbour_id(entry_id, previous)
+    
+    def _ids_at(self, indices: List[int]) -> List[int]:
+        """Get the ids of the entries at indices in custom order, skipping invalid indices"""
+        entry_ids = self.password_service.get_entry_ids()
+        return [entry_ids[index] for index in dict.fromkeys(indices) if 0 <= index < len(entry_ids)]
     
     def increment_copy_count(self, index: int) -> None:
-        """Increment the copy_count for a password entry by index"""
-        self.password_service.increment_copy_count(index)
+        """Record a copy of the entry at an index in custom order"""
+        for entry_id in self._ids_at([index]):
+            self.record_copy(entry_id)
     
-    def get_sorted_entries(self, sort_type: str = "custom", search_query: str = "") -> List[Dict]:
+    def get_sorted_entries(self, sort_type: str = "custom", search_query: str = "") -> List[VaultEntry]:
         """Get password entries sorted by specified type and optionally filtered by search"""
-        return self.password_service.get_sorted_entries(sort_type, search_query)
+        return self.password_service.get_sorted_entries(
+            sort_type, search_query, self.usage_tracker.pending_usage()
+        )
+    
+    def get_top_entries(self, limit: int = 10) -> List[VaultEntry]:
+        """Get the most relevant entries by time-decayed usage (frecency)"""
+        return self.password_service.get_top_entries(limit, self.usage_tracker.pending_usage())
+    
+    def get_entry_ids(self, sort_type: str = "custom", search_query: str = "") -> List[int]:
+        """Get the ids of entries in a sort order without decrypting anything"""
+        self._flush_usage_for_sort(sort_type)
+        return self.password_service.get_entry_ids(sort_type, search_query)
+    
+    def get_entry(self, entry_id: int) -> Optional[VaultEntry]:
+        """Get a single password entry by id"""
+        return self.password_service.get_entry(entry_id)
+    
+    def get_page(self, sort_type: str = "custom", search_query: str = "",
+                 after_key: Optional[tuple] = None, limit: int = 100) -> Tuple[List[VaultEntry], Optional[tuple]]:
+        """Get one page of entries and the keyset cursor for the next page"""
+        self._flush_usage_for_sort(sort_type)
+        return self.password_service.get_page(sort_type, search_query, after_key, limit)
+    
+    def iter_entries(self, sort_type: str = "custom", search_query: str = "", page_size: int = 100) -> Iterator[VaultEntry]:
+        """Iterate over entries one page at a time with bounded memory"""
+        self._flush_usage_for_sort(sort_type)
+        return self.password_service.iter_entries(sort_type, search_query, page_size)
+    
+    def count_entries(self, search_query: str = "") -> int:
+        """Count password entries without fetching or decrypting them"""
+        return self.password_service.count_entries(search_query)
+    
+    def get_entry_position(self, entry_id: int, sort_type: str = "custom", search_query: str = "") -> Optional[int]:
+        """Get the zero-based position of an entry in a sort order"""
+        self._flush_usage_for_sort(sort_type)
+        return self.password_service.get_entry_position(entry_id, sort_type, search_query)
+    
+    def has_previous_entry(self, entry_id: int, sort_type: str = "custom", search_query: str = "") -> bool:
+        """Check whether any entry sorts before the given entry"""
+        self._flush_usage_for_sort(sort_type)
+        return self.password_service.has_previous_entry(entry_id, sort_type, search_query)
+    
+    def has_next_entry(self, entry_id: int, sort_type: str = "custom", search_query: str = "") -> bool:
+        """Check whether any entry sorts after the given entry"""
+        self._flush_usage_for_sort(sort_type)
+        return self.password_service.has_next_entry(entry_id, sort_type, search_query)
+    
+    def get_reuse_groups(self) -> List[List[int]]:
+        """Get groups of entry ids that share a password"""
+        return self.password_service.get_reuse_groups()
+    
+    def find_entries_using_password(self, password: str, exclude_id: Optional[int] = None) -> List[VaultEntry]:
+        """Get the entries that already use a password"""
+        return self.password_service.find_entries_using_password(password, exclude_id)
+    
+    def _flush_usage_for_sort(self, sort_type: str) -> None:
+        """Write buffered usage first when it affects the sort order being queried"""
+        if sort_type in ("frequently_used", "frecency"):
+            self.flush_usage()
+    
+    # ==================== Usage Tracker Methods ====================
+    
+    def record_copy(self, entry_id: int) -> None:
+        """Record that a field of an entry was copied, without touching the database"""
+        self.usage_tracker.record(entry_id)
+    
+    def flush_usage(self) -> bool:
+        """Write buffered copy counts to the database"""
+        return self.usage_tracker.flush()
+    
+    # ==================== Change Log Methods ====================
+    
+    def latest_revision(self) -> int:
+        """Get the revision of the most recent change to any entry"""
+        return self.change_log.latest_revision()
+    
+    def changes_since(self, revision: int) -> Optional[List[int]]:
+        """Get the ids of the current user's entries changed after a revision, or None if too old"""
+        if not self.current_user:
+            return []
+        return self.change_log.changes_since(self.current_user, revision)
+    
+    def compact_change_log(self, retention_days: Optional[float] = None) -> int:
+        """Trim superseded and expired change log rows"""
+        return self.change_log.compact(retention_days)
+    
+    def poll_changes(self) -> Optional[List[int]]:
+        """Get the ids of the current user's entries changed since the last poll, or None to reload"""
+        if not self.current_user:
+            return []
+        return self.change_monitor.poll(self.current_user)
+    
+    # ==================== Backup Service Methods ====================
+    
+    def backup_vault(self, compress: bool = True, verify: bool = True, force: bool = False,
+                     progress: Optional[Callable[[BackupProgress], None]] = None) -> BackupProgress:
+        """Back up the database, skipping the copy if nothing changed since the last backup"""
+        return self.backup_service.backup(compress, verify, force, progress)
+    
+    def start_backup(self, compress: bool = True, verify: bool = True, force: bool = False,
+                     progress: Optional[Callable[[BackupProgress], None]] = None,
+                     finished: Optional[Callable[[BackupProgress], None]] = None):
+        """Back up the database on a background thread"""
+        return self.backup_service.start_backup(compress, verify, force, progress, finished)
+    
+    def list_backups(self) -> List[str]:
+        """Get the paths of existing backups, newest first"""
+        return self.backup_service.list_backups()
+    
+    # ==================== Archive Service Methods ====================
+    
+    def export_vault(self, path: str, passphrase: str) -> tuple[bool, str]:
+        """Export the current user's entries to a passphrase-encrypted archive"""
+        return self.archive_service.export_vault(path, passphrase)
+    
+    def import_vault(self, path: str, passphrase: str) -> tuple[bool, str]:
+        """Import entries from a passphrase-encrypted archive, all or nothing"""
+        with self.operation_log.record(self.current_user, "Import vault"):
+            return self.archive_service.import_vault(path, passphrase)
+    
+    # ==================== Import Service Methods ====================
+    
+    def import_csv(self, path: str) -> ImportReport:
+        """Bulk-import a Chrome, Firefox, Bitwarden or KeePassXC CSV export"""
+        with self.operation_log.record(self.current_user, "Import CSV"):
+            return self.import_service.import_csv(path)
+    
+    def import_json(self, path: str) -> ImportReport:
+        """Bulk-import a Bitwarden or 1Password JSON export, streaming it item by item"""
+        with self.operation_log.record(self.current_user, "Import JSON"):
+            return self.import_service.import_json(path)
+    
+    # ==================== Breach Checker Methods ====================
+    
+    def has_breach_database(self) -> bool:
+        """Check whether an offline breach database is installed"""
+        return self.breach_checker.available
+    
+    def breach_database_path(self) -> str:
+        """Get where the offline breach database is looked for"""
+        return str(self.breach_checker.path)
+    
+    def is_password_breached(self, password: str) -> bool:
+        """Check a password against the offline breach database"""
+        return self.breach_checker.is_breached(password)
+    
+    def find_breached_entries(self) -> List[int]:
+        """Get the ids of the current user's entries whose password appears in a breach"""
+        if not self.breach_checker.available:
+            return []
+        self.refresh_audit()
+        return self.password_service.get_entry_ids("custom", "is:breached")
+    
+    # ==================== Audit Service Methods ====================
+    
+    def refresh_audit(self) -> int:
+        """Re-audit entries scored before the strength scoring or breach database changed"""
+        if not self.current_user:
+            return 0
+        return self.audit_service.refresh(self.current_user)
+    
+    def audit_summary(self) -> AuditSummary:
+        """Count the current user's weak, reused, old and breached entries"""
+        if not self.current_user:
+            return AuditSummary()
+        return self.audit_service.summary(self.current_user)
+    
+    # ==================== Policy Service Methods ====================
+    
+    def get_generator_policy(self, entry_id: Optional[int] = None, url: str = "") -> GeneratorPolicy:
+        """Get the generator policy for an entry or site, or the default policy"""
+        if not self.current_user:
+            return GeneratorPolicy()
+        return self.policy_service.get_policy(self.current_user, entry_id, url)
+    
+    def save_generator_policy(self, policy: GeneratorPolicy, entry_id: Optional[int] = None, url: str = "") -> bool:
+        """Save a generator policy for an entry, or for a URL's site when no entry is given"""
+        if not self.current_user:
+            return False
+        return self.policy_service.save_policy(self.current_user, policy, entry_id, url)
+    
+    def delete_generator_policy(self, entry_id: Optional[int] = None, url: str = "") -> bool:
+        """Forget the generator policy saved for an entry, or for a URL's site"""
+        if not self.current_user:
+            return False
+        return self.policy_service.delete_policy(self.current_user, entry_id, url)
+    
+    def generate_password(self, entry_id: Optional[int] = None, url: str = "") -> str:
+        """Generate a password with the policy saved for an entry or site"""
+        return PasswordGenerator.generate(self.get_generator_policy(entry_id, url))
+    
+    # ==================== Rotation Service Methods ====================
+    
+    def stage_rotation(self, search_query: str) -> List[StagedRotation]:
+        """Pick the entries matching a search and generate new passwords for them without saving"""
+        if not self.current_user:
+            return []
+        return self.rotation_service.stage(self.current_user, search_query)
+    
+    def commit_rotation(self, staged: List[StagedRotation]) -> Optional[RotationBatch]:
+        """Save staged passwords in one transaction and return the batch to undo it with"""
+        if not self.current_user:
+            return None
+        with self.operation_log.record(self.current_user, "Rotate passwords", [item.entry_id for item in staged]):
+            return self.rotation_service.commit(self.current_user, staged)
+    
+    def last_rotation(self) -> Optional[RotationBatch]:
+        """Get the most recent rotation that can still be undone"""
+        if not self.current_user:
+            return None
+        return self.rotation_service.last_batch(self.current_user)
+    
+    def undo_rotation(self, batch_id: int) -> tuple[bool, str]:
+        """Put back the passwords replaced by a rotation inside its undo window"""
+        if not self.current_user:
+            return False, "No user is logged in"
+        entry_ids = self.rotation_service.batch_entry_ids(batch_id)
+        with self.operation_log.record(self.current_user, "Undo password rotation", entry_ids):
+            return self.rotation_service.undo(self.current_user, batch_id)
+    
+    # ==================== History Service Methods ====================
+    
+    def get_entry_history(self, entry_id: int, limit: Optional[int] = None) -> List[EntryVersion]:
+        """Get an entry's versions, the current one first"""
+        if not self.current_user:
+            return []
+        return self.history_service.get_history(self.current_user, entry_id, limit)
+    
+    def get_history_retention(self) -> Tuple[int, float]:
+        """Get how many old versions per entry are kept, and for how many days (0 for no limit)"""
+        if not self.current_user:
+            return HistoryService.MAX_VERSIONS, HistoryService.RETENTION_DAYS
+        return self.history_service.get_retention(self.current_user)
+    
+    def set_history_retention(self, max_versions: int, retention_days: float) -> bool:
+        """Change how much entry history is kept and trim it to match"""
+        if not self.current_user:
+            return False
+        return self.history_service.set_retention(self.current_user, max_versions, retention_days)
+    
+    # ==================== Trash Service Methods ====================
+    
+    def get_trash(self) -> List[TrashedEntry]:
+        """Get the entries in the trash, most recently deleted first"""
+        if not self.current_user:
+            return []
+        return self.trash_service.get_trash(self.current_user)
+    
+    def restore_entries(self, entry_ids: List[int]) -> int:
+        """Put entries back from the trash and return how many were restored"""
+        if not self.current_user:
+            return 0
+        with self.operation_log.record(self.current_user, f"Restore {len(entry_ids)} entries", entry_ids):
+            return self.trash_service.restore(self.current_user, entry_ids)
+    
+    def start_purge(self, entry_ids: Optional[List[int]] = None, secure: bool = False,
+                    finished: Optional[Callable[[int], None]] = None):
+        """Remove entries from the trash for good on a background thread, or the whole trash if none are given"""
+        if not self.current_user:
+            return None
+        return self.trash_service.start_purge(self.current_user, entry_ids, secure=secure, finished=finished)
+    
+    # ==================== Operation Log Methods ====================
+    
+    def undo_label(self) -> Optional[str]:
+        """Get what undo() would revert, or None if there is nothing to undo"""
+        return self.operation_log.undo_label
+    
+    def redo_label(self) -> Optional[str]:
+        """Get what redo() would apply again, or None if there is nothing to redo"""
+        return self.operation_log.redo_label
+    
+    def can_undo(self, entry_count: int) -> bool:
+        """Whether a change to this many entries will be recorded for undo"""
+        return entry_count <= self.operation_log.MAX_ROWS
+    
+    def undo(self) -> Optional[Operation]:
+        """Revert the latest change made in this session and return it"""
+        if not self.current_user:
+            return None
+        return self.operation_log.undo(self.current_user)
+    
+    def redo(self) -> Optional[Operation]:
+        """Apply the latest undone change again and return it"""
+        if not self.current_user:
+            return None
+        return self.operation_log.redo(self.current_user)
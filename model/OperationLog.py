@@ -0,0 +1,302 @@
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+from .DatabaseManager import DatabaseManager
+from .PasswordService import PasswordService
+
+
+class RowChange:
+    """An entry's stored row before and after an operation; None where the entry did not exist"""
+    
+    __slots__ = ("entry_id", "before", "after")
+    
+    def __init__(self, entry_id: int, before: Optional[dict], after: Optional[dict]):
+        self.entry_id = entry_id
+        self.before = before
+        self.after = after
+
+
+class MoveChange:
+    """An entry's neighbours in custom order before and after a move, as (previous id, next id)"""
+    
+    __slots__ = ("entry_id", "before", "after")
+    
+    def __init__(self, entry_id: int, before: Tuple[Optional[int], Optional[int]],
+                 after: Tuple[Optional[int], Optional[int]]):
+        self.entry_id = entry_id
+        self.before = before
+        self.after = after
+
+
+class Operation:
+    """One undoable user action and the changes it made"""
+    
+    __slots__ = ("label", "changes")
+    
+    def __init__(self, label: str, changes: list):
+        self.label = label
+        self.changes = changes
+    
+    @property
+    def entry_ids(self) -> List[int]:
+        """Get the ids of the entries the operation changed"""
+        return [change.entry_id for change in self.changes]
+
+
+class OperationLog:
+    """Undo and redo stacks of the vault changes made in this session
+    
+    An operation keeps the stored rows it changed as they were before and
+    after, encrypted as in the database, so undoing or redoing it touches
+    only those rows and never snapshots the table. Updates write back just
+    the columns the operation changed; moves are replayed against the
+    entry's old neighbours, so renumbered order keys do not matter. Rows
+    changed again by someone else since are left alone.
+    
+    The stacks live in memory for the logged-in session and are bounded by
+    both the number of operations and the number of rows they hold. An
+    operation too large to hold on its own cannot be undone, and clears the
+    stacks since the operations before it may no longer apply.
+    """
+    
+    MAX_OPERATIONS = 100
+    MAX_ROWS = 10000  # Row changes held across both stacks; the oldest operations are dropped first
+    
+    # Columns compared to tell whether an entry changed since an operation
+    CONTENT_COLUMNS = ("name", "username", "url", "password_fingerprint", "deleted_at")
+    # Columns left out of row images, since triggers maintain them
+    MANAGED_COLUMNS = ("revision",)
+    
+    def __init__(self, db_manager: DatabaseManager, password_service: PasswordService):
+        self.db_manager = db_manager
+        self.password_service = password_service
+        self._undo: deque = deque()
+        self._redo: deque = deque()
+    
+    def clear(self) -> None:
+        """Forget every operation, e.g. when the user logs out"""
+        self._undo.clear()
+        self._redo.clear()
+    
+    @property
+    def undo_label(self) -> Optional[str]:
+        """Get the label of the operation undo() would revert"""
+        return self._undo[-1].label if self._undo else None
+    
+    @property
+    def redo_label(self) -> Optional[str]:
+        """Get the label of the operation redo() would apply again"""
+        return self._redo[-1].label if self._redo else None
+    
+    def _push(self, operation: Operation) -> None:
+        """Add a new operation, dropping the redo stack and the oldest operations over the bounds"""
+        self._redo.clear()
+        self._undo.append(operation)
+        rows = sum(len(op.changes) for op in self._undo)
+        while len(self._undo) > 1 and (len(self._undo) > self.MAX_OPERATIONS or rows > self.MAX_ROWS):
+            rows -= len(self._undo.popleft().changes)
+    
+    def _defer_push(self, operation: Operation) -> None:
+        """Add an operation once the enclosing transaction commits, dropping it if it rolls back"""
+        self.db_manager.after_commit(lambda: self._push(operation))
+    
+    def _read_rows(self, cursor, user_email: str, entry_ids: Iterable[int]) -> Dict[int, dict]:
+        """Get the stored rows of entries by id"""
+        entry_ids = list(entry_ids)
+        rows = {}
+        for start in range(0, len(entry_ids), 500):
+            chunk = entry_ids[start:start + 500]
+            cursor.execute(
+                f"SELECT * FROM passwords WHERE user_email = ? AND id IN ({', '.join('?' * len(chunk))})",
+                (user_email, *chunk)
+            )
+            for row in cursor.fetchall():
+                image = dict(row)
+                for column in self.MANAGED_COLUMNS:
+                    image.pop(column, None)
+                rows[image["id"]] = image
+        return rows
+    
+    @staticmethod
+    def _latest_revision(cursor) -> int:
+        """Get the revision of the latest change log row"""
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'entry_changes'")
+        result = cursor.fetchone()
+        return result[0] if result else 0
+    
+    @contextmanager
+    def record(self, user_email: Optional[str], label: str, entry_ids: Iterable[int] = ()):
+        """Record the changes made inside the block as one operation
+        
+        entry_ids are the existing entries the block may update or delete;
+        entries it adds are found through the change log. Nothing is
+        recorded if the block changes nothing or raises, or if an enclosing
+        transaction rolls back.
+        """
+        entry_ids = list(entry_ids)
+        if not user_email:
+            yield
+            return
+        if len(entry_ids) > self.MAX_ROWS:
+            yield
+            self.db_manager.after_commit(self.clear)
+            return
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        try:
+            before = self._read_rows(cursor, user_email, entry_ids)
+            revision = self._latest_revision(cursor)
+        finally:
+            conn.close()
+        
+        yield
+        
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT DISTINCT entry_id FROM entry_changes WHERE revision > ? AND op = 'insert' AND user_email = ?",
+                (revision, user_email)
+            )
+            added = [row[0] for row in cursor.fetchall() if row[0] not in before]
+            if len(before) + len(added) > self.MAX_ROWS:
+                self.db_manager.after_commit(self.clear)
+                return
+            after = self._read_rows(cursor, user_email, [*before, *added])
+        finally:
+            conn.close()
+        changes = [RowChange(entry_id, before.get(entry_id), after.get(entry_id))
+                   for entry_id in [*before, *added] if before.get(entry_id) != after.get(entry_id)]
+        if changes:
+            self._defer_push(Operation(label, changes))
+    
+    def _neighbours(self, cursor, user_email: str, entry_id: int) -> Tuple[Optional[int], Optional[int]]:
+        """Get the ids of the entries just before and after an entry in custom order"""
+        neighbours = []
+        for op, direction in (("<", "DESC"), (">", "ASC")):
+            cursor.execute(
+                f"""SELECT p.id FROM passwords p, passwords t
+                    WHERE t.id = ? AND p.user_email = ? AND p.deleted_at IS NULL
+                    AND (p.custom_order, p.id) {op} (t.custom_order, t.id)
+                    ORDER BY p.custom_order {direction}, p.id {direction} LIMIT 1""",
+                (entry_id, user_email)
+            )
+            row = cursor.fetchone()
+            neighbours.append(row[0] if row else None)
+        return neighbours[0], neighbours[1]
+    
+    @contextmanager
+    def record_move(self, user_email: Optional[str], label: str, entry_id: Optional[int]):
+        """Record the move of one entry made inside the block as one operation"""
+        if not user_email or entry_id is None:
+            yield
+            return
+        conn = self.db_manager.get_connection()
+        try:
+            before = self._neighbours(conn.cursor(), user_email, entry_id)
+        finally:
+            conn.close()
+        
+        yield
+        
+        conn = self.db_manager.get_connection()
+        try:
+            after = self._neighbours(conn.cursor(), user_email, entry_id)
+        finally:
+            conn.close()
+        if after != before:
+            self._defer_push(Operation(label, [MoveChange(entry_id, before, after)]))
+    
+    def undo(self, user_email: str) -> Optional[Operation]:
+        """Revert the latest operation and return it, or None if there is nothing to undo"""
+        return self._replay(user_email, self._undo, self._redo, forward=False)
+    
+    def redo(self, user_email: str) -> Optional[Operation]:
+        """Apply the latest undone operation again and return it, or None if there is nothing to redo"""
+        return self._replay(user_email, self._redo, self._undo, forward=True)
+    
+    def _replay(self, user_email: str, source: deque, target: deque, forward: bool) -> Optional[Operation]:
+        """Move an operation between the stacks, writing its rows in one transaction
+        
+        An operation none of whose entries can be written any more, e.g.
+        because they were purged from the trash, is dropped instead.
+        """
+        if not source:
+            return None
+        operation = source[-1]
+        try:
+            with self.db_manager.transaction() as conn:
+                cursor = conn.cursor()
+                rows = [change for change in operation.changes if isinstance(change, RowChange)]
+                applied = self._write_rows(cursor, user_email, rows, forward)
+                for change in operation.changes:
+                    if isinstance(change, MoveChange):
+                        applied += self._move_next_to(cursor, user_email, change.entry_id,
+                                                      change.after if forward else change.before)
+        except Exception as e:
+            print(f"Error {'redoing' if forward else 'undoing'} {operation.label}: {e}")
+            return None
+        if not applied:
+            source.pop()
+            print(f"Cannot {'redo' if forward else 'undo'} {operation.label}: "
+                  f"its entries were changed again or deleted for good")
+            return None
+        target.append(source.pop())
+        return operation
+    
+    def _write_rows(self, cursor, user_email: str, changes: List[RowChange], forward: bool) -> int:
+        """Set each entry's row to its image on one side of the operation and return how many were written"""
+        current = self._read_rows(cursor, user_email, [change.entry_id for change in changes])
+        deletes, inserts, updates = [], [], []
+        for change in changes:
+            expected, wanted = (change.before, change.after) if forward else (change.after, change.before)
+            row = current.get(change.entry_id)
+            if not self._matches(row, expected):
+                continue  # Changed again since; keep the newer state
+            if wanted is None:
+                deletes.append((change.entry_id, user_email))
+            elif row is None:
+                inserts.append(wanted)
+            else:
+                # Only the columns this operation changed, so later usage and order changes survive
+                columns = [column for column in wanted if column != "id" and wanted[column] != expected[column]]
+                updates.append((columns, [wanted[column] for column in columns] + [change.entry_id, user_email]))
+        
+        cursor.executemany("DELETE FROM passwords WHERE id = ? AND user_email = ?", deletes)
+        for image in inserts:
+            columns = list(image)
+            cursor.execute(
+                f"INSERT INTO passwords ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [image[column] for column in columns]
+            )
+        for columns, params in updates:
+            cursor.execute(
+                f"UPDATE passwords SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ? AND user_email = ?",
+                params
+            )
+        # Entries coming back keep their old order key, which a newer entry may have taken
+        self.password_service.free_order_keys(cursor, [image["id"] for image in inserts] + [
+            params[-2] for columns, params in updates if "deleted_at" in columns or "custom_order" in columns
+        ])
+        return len(deletes) + len(inserts) + len(updates)
+    
+    @classmethod
+    def _matches(cls, row: Optional[dict], image: Optional[dict]) -> bool:
+        """Whether an entry's stored row still has the content of an image"""
+        if row is None or image is None:
+            return row is None and image is None
+        return all(row.get(column) == image.get(column) for column in cls.CONTENT_COLUMNS)
+    
+    def _move_next_to(self, cursor, user_email: str, entry_id: int,
+                      neighbours: Tuple[Optional[int], Optional[int]]) -> bool:
+        """Move an entry back between neighbours, or next to whichever of them is still in the vault"""
+        previous_id, next_id = neighbours
+        rows = self._read_rows(cursor, user_email, [i for i in (entry_id, previous_id, next_id) if i is not None])
+        existing = {i for i, row in rows.items() if row["deleted_at"] is None}
+        if entry_id not in existing:
+            return False
+        if previous_id in existing:
+            return self.password_service.move_entry(entry_id, after_id=previous_id)
+        if next_id in existing:
+            return self.password_service.move_entry(entry_id, before_id=next_id)
+        return False
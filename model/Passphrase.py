@@ -0,0 +1,174 @@
+"""Diceware-style passphrases drawn from a bundled wordlist
+
+The wordlist is a binary file of fixed-width, NUL-padded records, so word
+i sits at a known offset and is read straight out of an mmap of the file.
+Picking a word costs one slice regardless of list size, and the list is
+never loaded into Python strings. Word indices come from the CSPRNG
+engine in PasswordGenerator.
+
+The bundled list is the EFF large wordlist (7776 words, 12.9 bits each).
+Build a file from any list (one word per line; a leading dice-roll column
+is ignored) with:
+
+    python -m model.Passphrase <wordlist.txt> <output file>
+"""
+import math
+import mmap
+import struct
+import sys
+from pathlib import Path
+from typing import BinaryIO, Iterable, List, Optional, Union
+from . import PasswordGenerator
+
+WORDLIST_FILE = Path(__file__).resolve().parent / "data" / "eff_large_wordlist.bin"
+
+MIN_WORDS = 3
+MAX_WORDS = 20
+
+_MAGIC = b"PVWORDS1"
+_HEADER = struct.Struct(">8sBI")  # magic, record width, word count
+
+
+class WordlistError(Exception):
+    """Raised when a wordlist file is missing or not in the expected format"""
+
+
+class Wordlist:
+    """Read-only, memory-mapped list of fixed-width words"""
+    
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file: Optional[BinaryIO] = None
+        self._map: Optional[mmap.mmap] = None
+        self._width = 0
+        self._count = 0
+    
+    def _open(self) -> None:
+        """Map the file on first use"""
+        if self._map is not None:
+            return
+        try:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, width, count = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC or not width:
+                raise WordlistError(f"{self.path} is not a wordlist file")
+            if len(self._map) != _HEADER.size + width * count:
+                raise WordlistError(f"Wordlist file {self.path} is truncated")
+        except (OSError, ValueError, struct.error) as e:
+            self.close()
+            raise WordlistError(f"Cannot open wordlist {self.path}: {e}") from e
+        except WordlistError:
+            self.close()
+            raise
+        self._width = width
+        self._count = count
+    
+    def close(self) -> None:
+        """Unmap the file"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    @property
+    def available(self) -> bool:
+        """Whether the wordlist file can be read"""
+        try:
+            self._open()
+            return True
+        except WordlistError as e:
+            print(f"Error opening wordlist: {e}")
+            return False
+    
+    def __len__(self) -> int:
+        self._open()
+        return self._count
+    
+    def __getitem__(self, index: int) -> str:
+        self._open()
+        if not 0 <= index < self._count:
+            raise IndexError("Word index out of range")
+        start = _HEADER.size + index * self._width
+        return self._map[start:start + self._width].rstrip(b"\0").decode("utf-8")
+
+
+def build_wordlist(words: Iterable[str], path: Union[str, Path]) -> int:
+    """Write a wordlist file of unique words and return how many it holds"""
+    encoded = [word.encode("utf-8") for word in dict.fromkeys(w for w in words if w)]
+    if not encoded:
+        raise ValueError("Wordlist is empty")
+    width = max(len(word) for word in encoded)
+    if width > 255:
+        raise ValueError("Words must be at most 255 bytes long")
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, width, len(encoded)))
+        f.write(b"".join(word.ljust(width, b"\0") for word in encoded))
+    return len(encoded)
+
+
+_wordlist = Wordlist(WORDLIST_FILE)
+
+
+def available() -> bool:
+    """Whether the bundled wordlist is installed"""
+    return _wordlist.available
+
+
+class PassphrasePolicy:
+    """Word count and formatting of generated passphrases"""
+    
+    __slots__ = ("words", "separator", "capitalize", "digit")
+    
+    def __init__(self, words: int = 6, separator: str = "-", capitalize: bool = False, digit: bool = False):
+        self.words = words
+        self.separator = separator
+        self.capitalize = capitalize  # Capitalise the first letter of every word
+        self.digit = digit  # Append a random digit to one random word
+
+
+def entropy_bits(policy: PassphrasePolicy, wordlist: Optional[Wordlist] = None) -> float:
+    """Get the entropy of a generated passphrase, in bits"""
+    bits = policy.words * math.log2(len(_wordlist if wordlist is None else wordlist))
+    if policy.digit:
+        bits += math.log2(10 * policy.words)
+    return bits
+
+
+def generate_many(count: int, policy: Optional[PassphrasePolicy] = None,
+                  wordlist: Optional[Wordlist] = None) -> List[str]:
+    """Generate count independent passphrases"""
+    policy = policy or PassphrasePolicy()
+    wordlist = _wordlist if wordlist is None else wordlist
+    per_phrase = policy.words
+    indices = PasswordGenerator.random_below(len(wordlist), count * per_phrase)
+    if policy.digit:
+        digit_words = PasswordGenerator.random_below(per_phrase, count)
+        digits = PasswordGenerator.random_below(10, count)
+    
+    phrases = []
+    for n in range(count):
+        words = [wordlist[i] for i in indices[n * per_phrase:(n + 1) * per_phrase]]
+        if policy.capitalize:
+            words = [word[:1].upper() + word[1:] for word in words]
+        if policy.digit:
+            words[digit_words[n]] += str(digits[n])
+        phrases.append(policy.separator.join(words))
+    return phrases
+
+
+def generate(policy: Optional[PassphrasePolicy] = None) -> str:
+    """Generate one passphrase"""
+    return generate_many(1, policy)[0]
+
+
+if __name__ == "__main__":
+    # python -m model.Passphrase eff_large_wordlist.txt model/data/eff_large_wordlist.bin
+    if len(sys.argv) != 3:
+        print("Usage: python -m model.Passphrase <wordlist.txt> <output file>")
+        sys.exit(2)
+    with open(sys.argv[1], encoding="utf-8") as source:
+        total = build_wordlist((line.split()[-1] for line in source if line.strip()), sys.argv[2])
+    print(f"Wrote {total} words to {sys.argv[2]}")
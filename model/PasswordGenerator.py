@@ -0,0 +1,558 @@
+"""Random password generation from the operating system's CSPRNG
+
+A GeneratorPolicy describes the passwords wanted: a length or a
+template, the character classes with per-class minimum and maximum
+counts, and optional bans on ambiguous characters and on the same
+character twice in a row.
+
+Passwords are built to satisfy the policy instead of being generated and
+retried. A dynamic program counts exactly how many passwords N the policy
+allows, so log2(N) is the policy's exact entropy, and a password is the
+unranking of one uniform random integer below N, which makes every allowed
+password exactly equally likely. Without the repeat ban the count runs over
+how many characters each class contributes (_CountSolver); with it, over
+positions (_SequenceSolver). The random integers come from one bulk
+os.urandom buffer by rejection.
+
+Policies that need at most one character of each class skip unranking
+while that is cheaper: candidates drawn from the whole alphabet, one
+bytes.translate pass per buffer, are kept if they contain every required
+class, which leaves each allowed password equally likely as well.
+
+Templates spell a password out position by position: ?u, ?l, ?d and ?s
+stand for one character of that class, ?a for one of any enabled class
+and ?? for a question mark; anything else is copied as is. Literal
+characters also break runs for the repeat ban.
+
+Benchmark throughput and check uniformity with:
+
+    python -m model.PasswordGenerator [count]
+"""
+import math
+import os
+import string
+import sys
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+UPPERCASE = string.ascii_uppercase
+LOWERCASE = string.ascii_lowercase
+DIGITS = string.digits
+SYMBOLS = "!@#$%^&*"
+AMBIGUOUS = "Il1|O0o"  # Characters easily mistaken for one another
+
+CLASS_NAMES = ("uppercase", "lowercase", "digits", "symbols")
+_TEMPLATE_CLASSES = {"u": 0, "l": 1, "d": 2, "s": 3}
+
+MIN_LENGTH = 4
+MAX_LENGTH = 64
+MAX_TEMPLATE_LENGTH = 128
+_MAX_BATCH_BYTES = 1 << 20  # Random bytes requested at a time
+_MIN_COVERAGE = 0.125  # Share of random candidates that must qualify for rejection sampling to pay
+
+
+class PolicyError(ValueError):
+    """Raised when a generator policy is malformed or no password can satisfy it"""
+
+
+class GeneratorPolicy:
+    """Constraints on generated passwords"""
+    
+    __slots__ = ("length", "uppercase", "lowercase", "digits", "symbols", "symbol_chars",
+                 "minimums", "maximums", "exclude_ambiguous", "no_repeats", "template")
+    
+    def __init__(self, length: int = 12, uppercase: bool = True, lowercase: bool = True,
+                 digits: bool = True, symbols: bool = True, symbol_chars: str = SYMBOLS,
+                 minimums: Optional[Dict[str, int]] = None, maximums: Optional[Dict[str, int]] = None,
+                 exclude_ambiguous: bool = False, no_repeats: bool = False, template: str = ""):
+        self.length = length
+        self.uppercase = uppercase
+        self.lowercase = lowercase
+        self.digits = digits
+        self.symbols = symbols
+        self.symbol_chars = symbol_chars
+        self.minimums = dict(minimums or {})  # By class name; enabled classes need one unless templated
+        self.maximums = dict(maximums or {})  # By class name; unlimited when missing
+        self.exclude_ambiguous = exclude_ambiguous
+        self.no_repeats = no_repeats  # No character directly followed by itself
+        self.template = template
+    
+    def to_dict(self) -> dict:
+        """Get the policy as JSON-friendly values"""
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "GeneratorPolicy":
+        """Rebuild a policy from to_dict() values, ignoring unknown keys"""
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+    
+    def enabled(self) -> List[bool]:
+        """Get whether each class is selected; with nothing selected, all are"""
+        flags = [self.uppercase, self.lowercase, self.digits, self.symbols]
+        return flags if any(flags) else [True] * len(flags)
+    
+    def class_chars(self) -> List[str]:
+        """Get the characters of each class in CLASS_NAMES order
+        
+        Ambiguous characters are dropped if excluded, and characters repeated
+        across classes are kept in the first one only.
+        """
+        seen = set()
+        classes = []
+        for chars in (UPPERCASE, LOWERCASE, DIGITS, self.symbol_chars):
+            unique = "".join(
+                c for c in dict.fromkeys(chars)
+                if c not in seen and not (self.exclude_ambiguous and c in AMBIGUOUS)
+            )
+            seen.update(unique)
+            classes.append(unique)
+        return classes
+    
+    def bounds(self) -> List[Tuple[int, Optional[int]]]:
+        """Get the (minimum, maximum) count of each class in CLASS_NAMES order"""
+        bounds = []
+        for name, enabled, chars in zip(CLASS_NAMES, self.enabled(), self.class_chars()):
+            default = 1 if enabled and chars and not self.template else 0
+            bounds.append((self.minimums.get(name, default), self.maximums.get(name)))
+        return bounds
+    
+    def effective_length(self) -> int:
+        """Get the generated length, long enough for every class minimum"""
+        if self.template:
+            return len(self.slots())
+        return max(self.length, sum(minimum for minimum, _ in self.bounds()))
+    
+    def slots(self) -> List[Union[str, Tuple[int, ...]]]:
+        """Get each position's literal character or tuple of allowed class indices"""
+        classes = self.class_chars()
+        enabled = tuple(i for i, flag in enumerate(self.enabled()) if flag and classes[i])
+        if not self.template:
+            return [enabled] * max(self.length, sum(minimum for minimum, _ in self.bounds()))
+        
+        slots = []
+        position = 0
+        while position < len(self.template):
+            c = self.template[position]
+            if c != "?":
+                slots.append(c)
+                position += 1
+                continue
+            token = self.template[position + 1:position + 2]
+            if token == "?":
+                slots.append("?")
+            elif token == "a":
+                slots.append(enabled)
+            elif token in _TEMPLATE_CLASSES:
+                slots.append((_TEMPLATE_CLASSES[token],))
+            else:
+                raise PolicyError(f"Unknown template placeholder '?{token}'")
+            position += 2
+        if len(slots) > MAX_TEMPLATE_LENGTH:
+            raise PolicyError(f"Templates are limited to {MAX_TEMPLATE_LENGTH} characters")
+        return slots
+    
+    def key(self) -> tuple:
+        """Get a hashable summary of everything that affects generation"""
+        return (tuple(self.class_chars()), tuple(self.bounds()), self.no_repeats, tuple(self.slots()))
+
+
+# ==================== Solving ====================
+
+def _unrank_combination(rank: int, n: int, k: int) -> List[int]:
+    """Get the k-subset of range(n) numbered rank in lexicographic order"""
+    picked = []
+    start = 0
+    for remaining in range(k, 0, -1):
+        index = start
+        while True:
+            # Subsets whose next pick is index
+            count = math.comb(n - index - 1, remaining - 1)
+            if rank < count:
+                break
+            rank -= count
+            index += 1
+        picked.append(index)
+        start = index + 1
+    return picked
+
+
+class _CountSolver:
+    """Counts and unranks a policy's passwords through per-class character counts
+    
+    Positions that accept any enabled class are interchangeable, so only
+    how many of them each class takes matters. With n such positions left
+    and classes i.. still to place, ways[i][n] = sum over a of
+    C(n, a) * size_i^a * ways[i + 1][n - a] (the exponential generating
+    function product of the classes, with a kept within the class bounds).
+    Building this takes O(classes * length^2) steps for any bounds.
+    Positions a template fixes to one class contribute a constant factor.
+    """
+    
+    def __init__(self, classes: Sequence[str], bounds: Sequence[Tuple[int, Optional[int]]],
+                 slots: Sequence[Union[str, Tuple[int, ...]]]):
+        self.classes = classes
+        self.slots = slots
+        self.free = [position for position, slot in enumerate(slots) if not isinstance(slot, str) and len(slot) > 1]
+        self.fixed = [(position, slot[0]) for position, slot in enumerate(slots)
+                      if not isinstance(slot, str) and len(slot) == 1]
+        self.free_classes = next((slot for slot in slots if not isinstance(slot, str) and len(slot) > 1), ())
+        self.fixed_total = math.prod(len(classes[j]) for _, j in self.fixed)
+        fixed_counts = Counter(j for _, j in self.fixed)
+        
+        # Range of free positions each class may take, given what fixed positions already hold
+        free_count = len(self.free)
+        self.ranges = []
+        feasible = True
+        for j, (minimum, maximum) in enumerate(bounds):
+            low = max(minimum - fixed_counts[j], 0)
+            high = free_count if maximum is None else min(maximum - fixed_counts[j], free_count)
+            if j not in self.free_classes:
+                low, high = (0, 0) if low == 0 and high >= 0 else (1, 0)
+            feasible = feasible and low <= high
+            self.ranges.append((low, high))
+        
+        self.ways = [[0] * (free_count + 1) for _ in range(len(self.free_classes) + 1)]
+        self.ways[-1][0] = 1
+        for i in range(len(self.free_classes) - 1, -1, -1):
+            size = len(classes[self.free_classes[i]])
+            low, high = self.ranges[self.free_classes[i]]
+            for n in range(free_count + 1):
+                self.ways[i][n] = sum(
+                    math.comb(n, a) * size ** a * self.ways[i + 1][n - a]
+                    for a in range(low, min(high, n) + 1)
+                )
+        free_total = self.ways[0][free_count] if self.free_classes else int(free_count == 0)
+        self.total = free_total * self.fixed_total if feasible else 0
+    
+    def unrank(self, rank: int) -> str:
+        """Get the password numbered rank (0 <= rank < total)"""
+        chars = [slot if isinstance(slot, str) else "" for slot in self.slots]
+        rank, fixed_rank = divmod(rank, self.fixed_total)
+        for position, j in self.fixed:
+            fixed_rank, index = divmod(fixed_rank, len(self.classes[j]))
+            chars[position] = self.classes[j][index]
+        
+        free = self.free
+        for i, j in enumerate(self.free_classes):
+            n = len(free)
+            size = len(self.classes[j])
+            low, high = self.ranges[j]
+            for a in range(low, min(high, n) + 1):
+                per_subset = size ** a * self.ways[i + 1][n - a]
+                block = math.comb(n, a) * per_subset
+                if rank < block:
+                    break
+                rank -= block
+            subset_rank, rank = divmod(rank, per_subset)
+            char_rank, rank = divmod(rank, self.ways[i + 1][n - a])
+            picked = _unrank_combination(subset_rank, n, a)
+            for index in picked:
+                char_rank, char_index = divmod(char_rank, size)
+                chars[free[index]] = self.classes[j][char_index]
+            picked = set(picked)
+            free = [position for index, position in enumerate(free) if index not in picked]
+        return "".join(chars)
+
+
+class _SequenceSolver:
+    """Counts and unranks a policy's passwords position by position, for the repeat ban
+    
+    Banning a character right after itself ties each position to the one
+    before, so positions are no longer interchangeable. Instead, for every
+    position and state (characters of each class so far, capped once the
+    exact count stops mattering, and the class just placed) it counts the
+    valid completions. The states multiply with every bounded class, so
+    policies needing more than MAX_STATES are refused.
+    """
+    
+    MAX_STATES = 100000
+    
+    def __init__(self, classes: Sequence[str], bounds: Sequence[Tuple[int, Optional[int]]],
+                 slots: Sequence[Union[str, Tuple[int, ...]]]):
+        self.classes = classes
+        self.minimums = [minimum for minimum, _ in bounds]
+        self.maximums = [maximum for _, maximum in bounds]
+        # Counts past the minimum only matter when there is a maximum
+        self.caps = [minimum if maximum is None else maximum for minimum, maximum in bounds]
+        self.slots = slots
+        self._totals = {}
+        self._options = {}  # (position, state) -> [(block, choice, multiplicity, completions, next state)]
+        self.total = self._count(0, (0,) * len(classes), -1)
+    
+    def _count(self, position: int, counts: tuple, last: int) -> int:
+        """Count the valid completions from a position and state"""
+        key = (position, counts, last)
+        total = self._totals.get(key)
+        if total is not None:
+            return total
+        if len(self._totals) >= self.MAX_STATES:
+            raise PolicyError("Too many class limits to combine with banning repeats; loosen some limits")
+        if position == len(self.slots):
+            total = int(all(count >= minimum for count, minimum in zip(counts, self.minimums)))
+            self._totals[key] = total
+            return total
+        
+        options = []
+        slot = self.slots[position]
+        if isinstance(slot, str):
+            completions = self._count(position + 1, counts, -1)
+            if completions:
+                options.append((completions, slot, 1, completions, (counts, -1)))
+        else:
+            for j in slot:
+                maximum = self.maximums[j]
+                if maximum is not None and counts[j] >= maximum:
+                    continue
+                # A class cannot reuse the character just placed
+                multiplicity = len(self.classes[j]) - (j == last)
+                if multiplicity <= 0:
+                    continue
+                next_counts = counts[:j] + (min(counts[j] + 1, self.caps[j]),) + counts[j + 1:]
+                completions = self._count(position + 1, next_counts, j)
+                if completions:
+                    options.append((multiplicity * completions, j, multiplicity, completions, (next_counts, j)))
+        self._options[key] = options
+        total = sum(option[0] for option in options)
+        self._totals[key] = total
+        return total
+    
+    def unrank(self, rank: int) -> str:
+        """Get the password numbered rank (0 <= rank < total)"""
+        counts, last = (0,) * len(self.classes), -1
+        previous = -1  # Index of the previous character within its class
+        chars = []
+        for position in range(len(self.slots)):
+            for block, choice, multiplicity, completions, state in self._options[(position, counts, last)]:
+                if rank < block:
+                    break
+                rank -= block
+            if isinstance(choice, str):
+                chars.append(choice)
+                previous = -1
+            else:
+                index, rank = divmod(rank, completions)
+                if choice == last and index >= previous:
+                    index += 1  # Skip over the character just placed
+                chars.append(self.classes[choice][index])
+                previous = index
+            counts, last = state
+        return "".join(chars)
+
+
+@lru_cache(maxsize=16)
+def _solver_for(key: tuple):
+    """Build (once per distinct policy) the solver for a policy key"""
+    classes, bounds, no_repeats, slots = key
+    for minimum, maximum in bounds:
+        if minimum < 0 or (maximum is not None and maximum < minimum):
+            raise PolicyError("Class maximums must be at least their minimums")
+    # A maximum the password is too short to reach is no limit, and tracking it would only add states
+    bounds = [(minimum, None if maximum is not None and maximum >= len(slots) else maximum)
+              for minimum, maximum in bounds]
+    if no_repeats:
+        return _SequenceSolver(classes, bounds, slots)
+    return _CountSolver(classes, bounds, slots)
+
+
+def _solver(policy: GeneratorPolicy):
+    return _solver_for(policy.key())
+
+
+def count_passwords(policy: GeneratorPolicy) -> int:
+    """Count the distinct passwords a policy allows"""
+    return _solver(policy).total
+
+
+def entropy_bits(policy: GeneratorPolicy) -> float:
+    """Get the exact entropy of a generated password, in bits"""
+    total = count_passwords(policy)
+    if not total:
+        raise PolicyError("No password satisfies this policy")
+    return math.log2(total)
+
+
+# ==================== Generation ====================
+
+def random_below(bound: int, count: int) -> List[int]:
+    """Get count uniformly random integers in [0, bound), by rejection over bulk random words
+    
+    Bounds past 2**32 are drawn as whole bytes masked to the bound's bit
+    length, so at least half of the draws are kept.
+    """
+    if bound <= 0:
+        raise ValueError("Bound must be positive")
+    if bound > 1 << 32:
+        bits = (bound - 1).bit_length()
+        width, mask = (bits + 7) // 8, (1 << bits) - 1
+        values = []
+        while len(values) < count:
+            wanted = min(int((count - len(values)) * (mask + 1) / bound * 1.05) + 4, _MAX_BATCH_BYTES // width)
+            buffer = os.urandom(wanted * width)
+            values.extend(
+                value for value in (int.from_bytes(buffer[start:start + width], "little") & mask
+                                    for start in range(0, len(buffer), width))
+                if value < bound
+            )
+        del values[count:]
+        return values
+    code, width = ("B", 1) if bound <= 1 << 8 else ("H", 2) if bound <= 1 << 16 else ("I", 4)
+    span = 1 << (8 * width)
+    limit = span - span % bound
+    values = []
+    while len(values) < count:
+        wanted = min(int((count - len(values)) * span / limit * 1.05) + 4, _MAX_BATCH_BYTES // width)
+        words = memoryview(os.urandom(wanted * width)).cast(code)
+        values.extend(word % bound for word in words if word < limit)
+    del values[count:]
+    return values
+
+
+@lru_cache(maxsize=32)
+def _sampler(alphabet: str) -> Tuple[bytes, bytes, Optional[dict]]:
+    """Get the translate table, rejected bytes and optional index decoding for an alphabet
+    
+    Accepted bytes map straight to their character when the alphabet fits
+    in Latin-1, and otherwise to an index decoded by a second translate.
+    """
+    size = len(alphabet)
+    if not 0 < size <= 256:
+        raise ValueError("Alphabet must have between 1 and 256 characters")
+    limit = 256 - 256 % size
+    direct = all(ord(c) < 256 for c in alphabet)
+    table = bytes(
+        (ord(alphabet[b % size]) if direct else b % size) if b < limit else 0
+        for b in range(256)
+    )
+    decoding = None if direct else {i: c for i, c in enumerate(alphabet)}
+    return table, bytes(range(limit, 256)), decoding
+
+
+def random_chars(alphabet: str, count: int) -> str:
+    """Get at least count uniformly random characters of an alphabet, often a few more"""
+    table, rejected, decoding = _sampler(alphabet)
+    accept_rate = (256 - len(rejected)) / 256
+    chunks = []
+    total = 0
+    while total < count:
+        wanted = min(int((count - total) / accept_rate * 1.05) + 16, _MAX_BATCH_BYTES)
+        chunk = os.urandom(wanted).translate(table, rejected).decode("latin-1")
+        if decoding is not None:
+            chunk = chunk.translate(decoding)
+        chunks.append(chunk)
+        total += len(chunk)
+    return "".join(chunks)
+
+
+def _plain_classes(policy: GeneratorPolicy) -> Optional[Tuple[str, List[frozenset]]]:
+    """Get the alphabet and required classes of a policy that rejection sampling can serve
+    
+    That is a policy without a template or the repeat ban whose classes
+    each need at most one character and have no maximum the length can
+    reach: its passwords are exactly the strings over the alphabet that
+    contain a character of every required class. Returns None otherwise.
+    """
+    if policy.template or policy.no_repeats:
+        return None
+    length = policy.effective_length()
+    alphabet = []
+    required = []
+    for chars, enabled, (minimum, maximum) in zip(policy.class_chars(), policy.enabled(), policy.bounds()):
+        if not (enabled and chars):
+            continue
+        if minimum > 1 or (maximum is not None and maximum < length):
+            return None
+        alphabet.append(chars)
+        if minimum:
+            required.append(frozenset(chars))
+    # A single class is covered by every candidate
+    return "".join(alphabet), required if len(alphabet) > 1 else []
+
+
+def generate_many(count: int, policy: Optional[GeneratorPolicy] = None) -> List[str]:
+    """Generate count independent passwords, each uniform over those the policy allows
+    
+    Policies with no more than one required character per class draw
+    candidates from a bulk os.urandom buffer and keep those covering every
+    required class, which is far faster than unranking while most
+    candidates qualify. Other policies unrank bulk-drawn random integers
+    below the solver's count.
+    """
+    policy = policy or GeneratorPolicy()
+    solver = _solver(policy)
+    if not solver.total:
+        raise PolicyError("No password satisfies this policy")
+    
+    plain = _plain_classes(policy)
+    length = policy.effective_length()
+    coverage = solver.total / len(plain[0]) ** length if plain else 0
+    if coverage < _MIN_COVERAGE:
+        return [solver.unrank(rank) for rank in random_below(solver.total, count)]
+    
+    alphabet, required = plain
+    passwords = []
+    while len(passwords) < count:
+        needed = count - len(passwords)
+        candidates = min(int(needed / coverage * 1.05) + 1, max(_MAX_BATCH_BYTES // length, 1))
+        chars = random_chars(alphabet, candidates * length)
+        for start in range(0, len(chars) - length + 1, length):
+            candidate = chars[start:start + length]
+            if all(not chars_set.isdisjoint(candidate) for chars_set in required):
+                passwords.append(candidate)
+                if len(passwords) == count:
+                    break
+    return passwords
+
+
+def generate(policy: Optional[GeneratorPolicy] = None) -> str:
+    """Generate one password"""
+    return generate_many(1, policy)[0]
+
+
+# ==================== Benchmark ====================
+
+def _uniformity(passwords: Sequence[str], policy: GeneratorPolicy) -> Tuple[float, int, float]:
+    """Chi-square test that characters of each class are equally frequent
+    
+    Characters of one class are interchangeable under every constraint, so
+    their expected frequencies are equal. Returns the statistic, its
+    degrees of freedom and the Wilson-Hilferty z-score; |z| above about 3
+    means the output is not uniform.
+    """
+    counts = Counter("".join(passwords))
+    statistic = 0.0
+    dof = 0
+    for chars in policy.class_chars():
+        drawn = sum(counts[c] for c in chars)
+        if len(chars) < 2 or not drawn:
+            continue
+        expected = drawn / len(chars)
+        statistic += sum((counts[c] - expected) ** 2 / expected for c in chars)
+        dof += len(chars) - 1
+    z = ((statistic / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / math.sqrt(2 / (9 * dof))
+    return statistic, dof, z
+
+
+if __name__ == "__main__":
+    # python -m model.PasswordGenerator 200000
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    policies = {
+        "default, length 12": GeneratorPolicy(12),
+        "default, length 32": GeneratorPolicy(32),
+        "default, length 4": GeneratorPolicy(4),
+        "2-4 digits, 2+ symbols, no ambiguous, no repeats, 16": GeneratorPolicy(
+            16, minimums={"digits": 2, "symbols": 2}, maximums={"digits": 4},
+            exclude_ambiguous=True, no_repeats=True),
+        "template ?u?l?l?l-?d?d?d?d-?s?a?a": GeneratorPolicy(template="?u?l?l?l-?d?d?d?d-?s?a?a"),
+    }
+    for label, policy in policies.items():
+        start = time.perf_counter()
+        _solver(policy)
+        solved = time.perf_counter() - start
+        start = time.perf_counter()
+        passwords = generate_many(samples, policy)
+        elapsed = time.perf_counter() - start
+        statistic, dof, z = _uniformity(passwords, policy)
+        print(f"{label}: {samples / elapsed:,.0f} passwords/s, solved in {solved * 1000:.1f} ms, "
+              f"{entropy_bits(policy):.1f} bits, chi-square {statistic:.1f} on {dof} dof (z = {z:+.2f})")
@@ -1,12 +1,38 @@
-from typing import List, Dict, Optional
+import re
+import time
+from typing import Iterator, List, Dict, Optional, Tuple
+from . import Sites
+from .AuditService import AuditService
 from .DatabaseManager import DatabaseManager
+from .Frecency import log_add_exp
+from .VaultEntry import VaultEntry
 
 
 class PasswordService:
     """Handles password entry CRUD operations"""
     
-    def __init__(self, db_manager: DatabaseManager):
+    # Spacing between consecutive custom_order keys. Leaving gaps lets an
+    # entry be moved anywhere by rewriting only its own key; the keys are
+    # renumbered only once a gap has been split down to nothing.
+    ORDER_GAP = 1024
+    
+    # Sort orders as (column, direction, collation); ties are broken by id
+    # in the same direction
+    SORT_KEYS = {
+        "custom": ("custom_order", "ASC", ""),
+        "alphabetical_asc": ("name", "ASC", " COLLATE NOCASE"),
+        "alphabetical_desc": ("name", "DESC", " COLLATE NOCASE"),
+        "frequently_used": ("copy_count", "DESC", ""),
+        "frecency": ("frecency", "DESC", ""),
+    }
+    NULLABLE_SORT_COLUMNS = ("frecency",)
+    
+    # "site:example.com" in a search matches entries whose URL is on that site or a subdomain (see Sites)
+    _SITE_PATTERN = re.compile(r"(?:^|\s)site:(\S+)(?=\s|$)", re.IGNORECASE)
+    
+    def __init__(self, db_manager: DatabaseManager, audit_service: Optional[AuditService] = None):
         self.db_manager = db_manager
+        self.audit_service = audit_service  # Scores entries as they are written
         self._current_user: Optional[str] = None
     
     @property
@@ -19,21 +45,19 @@ class PasswordService:
         """Set current user"""
         self._current_user = email
     
-    def add_password_entry(self, name: str, username: str, password: str, url: str = "") -> bool:
-        """Add a new password entry for current user"""
-        if not self.current_user:
-            return False
+    @staticmethod
+    def check_entry_fields(name: str, username: str, password: str, url: str = "") -> Tuple[Optional[Tuple[str, str, str, str]], Optional[str]]:
+        """Validate and trim entry fields without printing
         
+        Returns (cleaned fields, None) if they are valid, or (None, reason) if not.
+        """
         # Input validation
         if not name or not name.strip():
-            print("Error: Entry name cannot be empty")
-            return False
+            return None, "Entry name cannot be empty"
         if not username or not username.strip():
-            print("Error: Username cannot be empty")
-            return False
+            return None, "Username cannot be empty"
         if not password:
-            print("Error: Password cannot be empty")
-            return False
+            return None, "Password cannot be empty"
         
         # Trim whitespace
         name = name.strip()
@@ -42,17 +66,45 @@ class PasswordService:
         
         # Length validation (reasonable limits)
         if len(name) > 64:
-            print("Error: Entry name too long (max 64 characters)")
-            return False
+            return None, "Entry name too long (max 64 characters)"
         if len(username) > 64:
-            print("Error: Username too long (max 64 characters)")
-            return False
+            return None, "Username too long (max 64 characters)"
         if len(url) > 2048:  # URLs can be longer
-            print("Error: URL too long (max 2048 characters)")
-            return False
+            return None, "URL too long (max 2048 characters)"
         if len(password) > 64:
-            print("Error: Password too long (max 64 characters)")
-            return False
+            return None, "Password too long (max 64 characters)"
+        
+        return (name, username, password, url), None
+    
+    @classmethod
+    def _validate_entry(cls, name: str, username: str, password: str, url: str = "") -> Optional[Tuple[str, str, str, str]]:
+        """Validate and trim entry fields, returning None if they are invalid"""
+        cleaned, error = cls.check_entry_fields(name, username, password, url)
+        if error:
+            print(f"Error: {error}")
+        return cleaned
+    
+    def _get_entry_ids(self, cursor) -> List[int]:
+        """Get the ids of the current user's entries in custom order"""
+        cursor.execute(
+            "SELECT id FROM passwords WHERE user_email = ? AND deleted_at IS NULL ORDER BY custom_order",
+            (self.current_user,)
+        )
+        return [row['id'] for row in cursor.fetchall()]
+    
+    def add_password_entry(self, name: str, username: str, password: str, url: str = "") -> bool:
+        """Add a new password entry for current user"""
+        return self.add_entry(name, username, password, url) is not None
+    
+    def add_entry(self, name: str, username: str, password: str, url: str = "") -> Optional[int]:
+        """Add a new password entry for current user and return its id, or None on failure"""
+        if not self.current_user:
+            return None
+        
+        cleaned = self._validate_entry(name, username, password, url)
+        if cleaned is None:
+            return None
+        name, username, password, url = cleaned
         
         conn = self.db_manager.get_connection()
         cursor = conn.cursor()
@@ -60,8 +112,8 @@ class PasswordService:
         try:
             # Get the next order value
             cursor.execute(
-                "SELECT COALESCE(MAX(custom_order), -1) + 1 FROM passwords WHERE user_email = ?",
-                (self.current_user,)
+                "SELECT COALESCE(MAX(custom_order), ?) + ? FROM passwords WHERE user_email = ? AND deleted_at IS NULL",
+                (-self.ORDER_GAP, self.ORDER_GAP, self.current_user)
             )
             next_order = cursor.fetchone()[0]
             
@@ -70,19 +122,136 @@ class PasswordService:
             
             # Insert new password entry
             cursor.execute(
-                """INSERT INTO passwords (user_email, name, username, password, url, custom_order)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (self.current_user, name, username, encrypted_password, url, next_order)
+                """INSERT INTO passwords (user_email, name, username, password, password_fingerprint, url, custom_order,
+                                          strength, breached, audit_stamp, password_changed_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (self.current_user, name, username, encrypted_password,
+                 self.db_manager.fingerprint(password), url, next_order, *self._assess(password), time.time())
             )
+            entry_id = cursor.lastrowid
             conn.commit()
             conn.close()
-            return True
+            return entry_id
         except Exception as e:
             conn.close()
             print(f"Error adding password entry: {e}")
+            return None
+    
+    def add_entries(self, entries: List[Dict]) -> bool:
+        """Add several password entries in a single transaction
+        
+        Each entry is a dict with 'name', 'username', 'password' and an
+        optional 'url'. Nothing is written if any entry is invalid.
+        """
+        if not self.current_user:
             return False
+        
+        rows = []
+        for entry in entries:
+            cleaned = self._validate_entry(
+                entry.get('name', ''), entry.get('username', ''),
+                entry.get('password', ''), entry.get('url', '')
+            )
+            if cleaned is None:
+                return False
+            rows.append(cleaned)
+        if not rows:
+            return True
+        
+        try:
+            with self.db_manager.transaction() as conn:
+                self.insert_encrypted_entries(conn.cursor(), self.seal_rows(rows))
+            return True
+        except Exception as e:
+            print(f"Error adding password entries: {e}")
+            return False
+    
+    def _assess(self, password: str) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+        """Get the audit facts (strength, breached, stamp) to store with a password"""
+        if self.audit_service is None:
+            return None, None, None
+        return self.audit_service.assess(password)
+    
+    # Audit columns set by an update; the change time only moves if the password did
+    _AUDIT_ASSIGNMENTS = """strength = ?, breached = ?, audit_stamp = ?,
+                       password_changed_at = CASE WHEN password_fingerprint IS ?
+                           THEN COALESCE(password_changed_at, ?) ELSE ? END"""
+    
+    def _audit_params(self, password: str, fingerprint: str) -> tuple:
+        """Get the parameters for _AUDIT_ASSIGNMENTS"""
+        now = time.time()
+        return (*self._assess(password), fingerprint, now, now)
+    
+    def seal_rows(self, rows: List[Tuple[str, str, str, str]]) -> List[tuple]:
+        """Turn validated (name, username, password, url) rows into rows for insert_encrypted_entries"""
+        encrypt = self.db_manager.encrypt
+        fingerprint = self.db_manager.fingerprint
+        return [(name, username, encrypt(password), fingerprint(password), url, *self._assess(password))
+                for name, username, password, url in rows]
+    
+    def insert_encrypted_entries(self, cursor, rows: List[tuple]) -> None:
+        """Append rows made by seal_rows with one executemany
+        
+        The caller owns the transaction, so bulk importers can insert many
+        batches before committing.
+        """
+        cursor.execute(
+            "SELECT COALESCE(MAX(custom_order), ?) + ? FROM passwords WHERE user_email = ? AND deleted_at IS NULL",
+            (-self.ORDER_GAP, self.ORDER_GAP, self.current_user)
+        )
+        next_order = cursor.fetchone()[0]
+        
+        now = time.time()
+        cursor.executemany(
+            """INSERT INTO passwords (user_email, name, username, password, password_fingerprint, url, custom_order,
+                                      strength, breached, audit_stamp, password_changed_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [
+                (self.current_user, name, username, encrypted_password, fingerprint, url,
+                 next_order + i * self.ORDER_GAP, *facts, now)
+                for i, (name, username, encrypted_password, fingerprint, url, *facts) in enumerate(rows)
+            ]
+        )
+    
+    def free_order_keys(self, cursor, entry_ids: List[int]) -> int:
+        """Move entries whose order key another entry in the vault also has to the end, returning how many moved
+        
+        Entries back from the trash keep their old key, which an entry added
+        meanwhile may have taken; equal keys would make moves and swaps no-ops.
+        The caller owns the transaction.
+        """
+        cursor.executemany(
+            """UPDATE passwords SET custom_order = ? + (
+                   SELECT MAX(custom_order) FROM passwords p
+                   WHERE p.user_email = passwords.user_email AND p.deleted_at IS NULL)
+               WHERE id = ? AND deleted_at IS NULL AND EXISTS (
+                   SELECT 1 FROM passwords other
+                   WHERE other.user_email = passwords.user_email AND other.deleted_at IS NULL
+                   AND other.custom_order = passwords.custom_order AND other.id != passwords.id)""",
+            [(self.ORDER_GAP, entry_id) for entry_id in entry_ids]
+        )
+        return cursor.rowcount
     
-    def get_password_entries(self) -> List[Dict]:
+    def replace_passwords(self, cursor, passwords: List[Tuple[int, str]]) -> int:
+        """Set new passwords on entries by id with one executemany and return how many changed
+        
+        The caller owns the transaction, so the change can be committed
+        together with other bookkeeping.
+        """
+        fingerprint = self.db_manager.fingerprint
+        cursor.executemany(
+            f"""UPDATE passwords
+               SET password = ?, password_fingerprint = ?, {self._AUDIT_ASSIGNMENTS}
+               WHERE id = ? AND user_email = ? AND deleted_at IS NULL""",
+            [
+                (self.db_manager.encrypt(password), fingerprint(password),
+                 *self._audit_params(password, fingerprint(password)), entry_id, self.current_user)
+                for entry_id, password in passwords
+            ]
+        )
+        return cursor.rowcount
+    
+    def get_password_entries(self) -> List[VaultEntry]:
         """Get all password entries for current user"""
         if not self.current_user:
             return []
@@ -91,33 +260,24 @@ class PasswordService:
         cursor = conn.cursor()
         
         cursor.execute(
-            """SELECT name, username, password, url, custom_order, copy_count 
-               FROM passwords WHERE user_email = ? ORDER BY custom_order""",
+            """SELECT id, name, username, password, url, custom_order, copy_count, last_used_at, frecency 
+               FROM passwords WHERE user_email = ? AND deleted_at IS NULL ORDER BY custom_order""",
             (self.current_user,)
         )
         
-        entries = []
-        for row in cursor.fetchall():
-            # Decrypt password before returning
-            try:
-                decrypted_password = self.db_manager.decrypt(row['password'])
-            except:
-                decrypted_password = ""  # Handle decryption errors gracefully
-            
-            entries.append({
-                'name': row['name'],
-                'username': row['username'],
-                'password': decrypted_password,
-                'url': row['url'],
-                'custom_order': row['custom_order'],
-                'copy_count': row['copy_count']
-            })
-        
+        entries = [self._row_to_entry(row) for row in cursor.fetchall()]
         conn.close()
         return entries
     
     def delete_password_entry(self, index: int) -> bool:
-        """Delete a password entry by index"""
+        """Move a password entry to the trash by index"""
+        entry_id = self._get_entry_id_at(index)
+        if entry_id is None:
+            return False
+        return self.delete_entry(entry_id)
+    
+    def delete_entry(self, entry_id: int) -> bool:
+        """Move a password entry to the trash by id"""
         if not self.current_user:
             return False
         
@@ -125,32 +285,37 @@ class PasswordService:
         cursor = conn.cursor()
         
         try:
-            # Get all entries to find the one at the given index
             cursor.execute(
-                """SELECT id FROM passwords WHERE user_email = ? 
-                   ORDER BY custom_order LIMIT 1 OFFSET ?""",
-                (self.current_user, index)
+                "UPDATE passwords SET deleted_at = ? WHERE id = ? AND user_email = ? AND deleted_at IS NULL",
+                (time.time(), entry_id, self.current_user)
             )
-            result = cursor.fetchone()
-            
-            if not result:
-                conn.close()
-                return False
-            
-            entry_id = result['id']
-            
-            # Delete the entry
-            cursor.execute("DELETE FROM passwords WHERE id = ?", (entry_id,))
+            deleted = cursor.rowcount > 0
             conn.commit()
             conn.close()
-            return True
+            return deleted
         except Exception as e:
             conn.close()
             print(f"Error deleting password entry: {e}")
             return False
     
+    def _get_entry_id_at(self, index: int) -> Optional[int]:
+        """Get the id of the entry at an index in custom order"""
+        if not self.current_user or index < 0:
+            return None
+        
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT id FROM passwords WHERE user_email = ? AND deleted_at IS NULL
+               ORDER BY custom_order LIMIT 1 OFFSET ?""",
+            (self.current_user, index)
+        )
+        result = cursor.fetchone()
+        conn.close()
+        return result['id'] if result else None
+    
     def delete_all_entries(self) -> bool:
-        """Delete all password entries for current user"""
+        """Move all password entries of the current user to the trash"""
         if not self.current_user:
             return False
         
@@ -158,7 +323,10 @@ class PasswordService:
         cursor = conn.cursor()
         
         try:
-            cursor.execute("DELETE FROM passwords WHERE user_email = ?", (self.current_user,))
+            cursor.execute(
+                "UPDATE passwords SET deleted_at = ? WHERE user_email = ? AND deleted_at IS NULL",
+                (time.time(), self.current_user)
+            )
             conn.commit()
             conn.close()
             return True
@@ -167,218 +335,609 @@ class PasswordService:
             print(f"Error deleting all entries: {e}")
             return False
     
-    def update_password_entry(self, index: int, name: str, username: str, password: str, url: str = "") -> bool:
-        """Update a password entry by index"""
+    def delete_entries(self, indices: List[int]) -> bool:
+        """Move several password entries to the trash by index in a single transaction"""
         if not self.current_user:
             return False
         
-        # Input validation
-        if not name or not name.strip():
-            print("Error: Entry name cannot be empty")
+        try:
+            with self.db_manager.transaction() as conn:
+                cursor = conn.cursor()
+                entry_ids = self._get_entry_ids(cursor)
+                if any(index < 0 or index >= len(entry_ids) for index in indices):
+                    raise IndexError("Entry index out of range")
+                
+                now = time.time()
+                cursor.executemany(
+                    "UPDATE passwords SET deleted_at = ? WHERE id = ?",
+                    [(now, entry_ids[index]) for index in set(indices)]
+                )
+            return True
+        except Exception as e:
+            print(f"Error deleting password entries: {e}")
             return False
-        if not username or not username.strip():
-            print("Error: Username cannot be empty")
+    
+    def update_password_entry(self, index: int, name: str, username: str, password: str, url: str = "") -> bool:
+        """Update a password entry by index"""
+        entry_id = self._get_entry_id_at(index)
+        if entry_id is None:
             return False
-        if not password:
-            print("Error: Password cannot be empty")
+        return self.update_entry(entry_id, name, username, password, url)
+    
+    def update_entry(self, entry_id: int, name: str, username: str, password: str, url: str = "") -> bool:
+        """Update a password entry by id"""
+        if not self.current_user:
             return False
         
-        # Trim whitespace
-        name = name.strip()
-        username = username.strip()
-        url = url.strip() if url else ""
-        
-        # Length validation (reasonable limits)
-        if len(name) > 64:
-            print("Error: Entry name too long (max 64 characters)")
-            return False
-        if len(username) > 64:
-            print("Error: Username too long (max 64 characters)")
-            return False
-        if len(url) > 2048:  # URLs can be longer
-            print("Error: URL too long (max 2048 characters)")
-            return False
-        if len(password) > 64:
-            print("Error: Password too long (max 64 characters)")
+        cleaned = self._validate_entry(name, username, password, url)
+        if cleaned is None:
             return False
+        name, username, password, url = cleaned
         
         conn = self.db_manager.get_connection()
         cursor = conn.cursor()
         
         try:
-            # Get the entry id at the given index
-            cursor.execute(
-                """SELECT id FROM passwords WHERE user_email = ? 
-                   ORDER BY custom_order LIMIT 1 OFFSET ?""",
-                (self.current_user, index)
-            )
-            result = cursor.fetchone()
-            
-            if not result:
-                conn.close()
-                return False
-            
-            entry_id = result['id']
-            
             # Encrypt the password before storing
             encrypted_password = self.db_manager.encrypt(password)
             
             # Update the entry
+            fingerprint = self.db_manager.fingerprint(password)
             cursor.execute(
-                """UPDATE passwords 
-                   SET name = ?, username = ?, password = ?, url = ?
-                   WHERE id = ?""",
-                (name, username, encrypted_password, url, entry_id)
+                f"""UPDATE passwords 
+                   SET name = ?, username = ?, password = ?, password_fingerprint = ?, url = ?,
+                       {self._AUDIT_ASSIGNMENTS}
+                   WHERE id = ? AND user_email = ? AND deleted_at IS NULL""",
+                (name, username, encrypted_password, fingerprint, url,
+                 *self._audit_params(password, fingerprint), entry_id, self.current_user)
             )
+            updated = cursor.rowcount > 0
             conn.commit()
             conn.close()
-            return True
+            return updated
         except Exception as e:
             conn.close()
             print(f"Error updating password entry: {e}")
             return False
     
-    def move_entry_up(self, index: int) -> bool:
-        """Move an entry up in custom order"""
-        if not self.current_user or index <= 0:
-            return False
+    def update_entries(self, updates: List[Tuple[int, Dict]]) -> bool:
+        """Update several password entries in a single transaction
         
-        conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
+        Each update is an (index, entry) pair where entry holds the new
+        'name', 'username', 'password' and optional 'url'. Nothing is
+        written if any index or entry is invalid.
+        """
+        if not self.current_user:
+            return False
         
-        try:
-            # Get the two entries to swap
-            cursor.execute(
-                """SELECT id, custom_order FROM passwords WHERE user_email = ? 
-                   ORDER BY custom_order LIMIT 2 OFFSET ?""",
-                (self.current_user, index - 1)
+        rows = []
+        for index, entry in updates:
+            cleaned = self._validate_entry(
+                entry.get('name', ''), entry.get('username', ''),
+                entry.get('password', ''), entry.get('url', '')
             )
-            results = cursor.fetchall()
-            
-            if len(results) < 2:
-                conn.close()
+            if cleaned is None:
                 return False
-            
-            id1, order1 = results[0]['id'], results[0]['custom_order']
-            id2, order2 = results[1]['id'], results[1]['custom_order']
-            
-            # Swap custom_order values
-            cursor.execute("UPDATE passwords SET custom_order = ? WHERE id = ?", (order2, id1))
-            cursor.execute("UPDATE passwords SET custom_order = ? WHERE id = ?", (order1, id2))
-            
-            conn.commit()
-            conn.close()
+            rows.append((index, cleaned))
+        
+        try:
+            with self.db_manager.transaction() as conn:
+                cursor = conn.cursor()
+                entry_ids = self._get_entry_ids(cursor)
+                if any(index < 0 or index >= len(entry_ids) for index, _ in rows):
+                    raise IndexError("Entry index out of range")
+                
+                fingerprint = self.db_manager.fingerprint
+                cursor.executemany(
+                    f"""UPDATE passwords 
+                       SET name = ?, username = ?, password = ?, password_fingerprint = ?, url = ?,
+                           {self._AUDIT_ASSIGNMENTS}
+                       WHERE id = ?""",
+                    [
+                        (name, username, self.db_manager.encrypt(password), fingerprint(password), url,
+                         *self._audit_params(password, fingerprint(password)), entry_ids[index])
+                        for index, (name, username, password, url) in rows
+                    ]
+                )
             return True
         except Exception as e:
-            conn.close()
-            print(f"Error moving entry up: {e}")
+            print(f"Error updating password entries: {e}")
             return False
     
+    def move_entry_up(self, index: int) -> bool:
+        """Move the entry at an index in custom order before the one above it"""
+        entry_id = self._get_entry_id_at(index)
+        previous_id = self.get_neighbour_id(entry_id, previous=True) if entry_id is not None else None
+        return previous_id is not None and self.move_entry(entry_id, before_id=previous_id)
+    
     def move_entry_down(self, index: int) -> bool:
-        """Move an entry down in custom order"""
+        """Move the entry at an index in custom order after the one below it"""
+        entry_id = self._get_entry_id_at(index)
+        next_id = self.get_neighbour_id(entry_id, previous=False) if entry_id is not None else None
+        return next_id is not None and self.move_entry(entry_id, after_id=next_id)
+    
+    def get_neighbour_id(self, entry_id: int, previous: bool) -> Optional[int]:
+        """Get the id of the entry just before or after the given entry in custom order
+        
+        A keyset query on (custom_order, id), so it reads one row of the
+        order index instead of counting the entries ahead.
+        """
         if not self.current_user:
-            return False
+            return None
         
+        precedes = self._precedes("custom", "p", "t") if previous else self._precedes("custom", "t", "p")
+        direction = "DESC" if previous else "ASC"
         conn = self.db_manager.get_connection()
         cursor = conn.cursor()
+        cursor.execute(
+            f"""SELECT p.id FROM passwords t JOIN passwords p
+                ON p.user_email = t.user_email AND p.deleted_at IS NULL AND {precedes}
+                WHERE t.id = ? AND t.user_email = ? AND t.deleted_at IS NULL
+                ORDER BY p.custom_order {direction}, p.id {direction} LIMIT 1""",
+            (entry_id, self.current_user)
+        )
+        result = cursor.fetchone()
+        conn.close()
+        return result['id'] if result else None
+    
+    def move_entry(self, entry_id: int, before_id: Optional[int] = None, after_id: Optional[int] = None) -> bool:
+        """Move an entry directly before or after another entry in custom order
+        
+        Exactly one of before_id and after_id must be given. The move rewrites
+        only the moved entry's order key unless the gap between its new
+        neighbours is exhausted, in which case all keys are renumbered once.
+        """
+        if not self.current_user or (before_id is None) == (after_id is None):
+            return False
+        if entry_id in (before_id, after_id):
+            return True
         
         try:
-            # Get the two entries to swap
-            cursor.execute(
-                """SELECT id, custom_order FROM passwords WHERE user_email = ? 
-                   ORDER BY custom_order LIMIT 2 OFFSET ?""",
-                (self.current_user, index)
-            )
-            results = cursor.fetchall()
-            
-            if len(results) < 2:
-                conn.close()
-                return False
-            
-            id1, order1 = results[0]['id'], results[0]['custom_order']
-            id2, order2 = results[1]['id'], results[1]['custom_order']
-            
-            # Swap custom_order values
-            cursor.execute("UPDATE passwords SET custom_order = ? WHERE id = ?", (order2, id1))
-            cursor.execute("UPDATE passwords SET custom_order = ? WHERE id = ?", (order1, id2))
-            
-            conn.commit()
-            conn.close()
+            with self.db_manager.transaction() as conn:
+                cursor = conn.cursor()
+                new_order = self._order_key_for_move(cursor, entry_id, before_id, after_id)
+                if new_order is None:
+                    self._rebalance_order(cursor)
+                    new_order = self._order_key_for_move(cursor, entry_id, before_id, after_id)
+                
+                cursor.execute(
+                    "UPDATE passwords SET custom_order = ? WHERE id = ? AND user_email = ? AND deleted_at IS NULL",
+                    (new_order, entry_id, self.current_user)
+                )
+                if cursor.rowcount == 0:
+                    raise LookupError(f"Entry {entry_id} not found")
             return True
         except Exception as e:
-            conn.close()
-            print(f"Error moving entry down: {e}")
+            print(f"Error moving entry: {e}")
             return False
     
-    def increment_copy_count(self, index: int) -> None:
-        """Increment the copy_count for a password entry by index"""
+    def _order_key_for_move(self, cursor, entry_id: int, before_id: Optional[int], after_id: Optional[int]) -> Optional[int]:
+        """Pick a free order key next to the anchor entry, or None if there is no gap"""
+        anchor_id = before_id if before_id is not None else after_id
+        cursor.execute(
+            "SELECT custom_order FROM passwords WHERE id = ? AND user_email = ? AND deleted_at IS NULL",
+            (anchor_id, self.current_user)
+        )
+        result = cursor.fetchone()
+        if not result:
+            raise LookupError(f"Entry {anchor_id} not found")
+        anchor_order = result['custom_order']
+        
+        # Another entry sharing the anchor's key makes the position ambiguous
+        cursor.execute(
+            """SELECT 1 FROM passwords WHERE user_email = ? AND deleted_at IS NULL AND custom_order = ?
+               AND id NOT IN (?, ?) LIMIT 1""",
+            (self.current_user, anchor_order, anchor_id, entry_id)
+        )
+        if cursor.fetchone():
+            return None
+        
+        if before_id is not None:
+            cursor.execute(
+                """SELECT MAX(custom_order) FROM passwords
+                   WHERE user_email = ? AND deleted_at IS NULL AND custom_order < ? AND id != ?""",
+                (self.current_user, anchor_order, entry_id)
+            )
+            neighbour_order = cursor.fetchone()[0]
+            if neighbour_order is None:
+                return anchor_order - self.ORDER_GAP
+        else:
+            cursor.execute(
+                """SELECT MIN(custom_order) FROM passwords
+                   WHERE user_email = ? AND deleted_at IS NULL AND custom_order > ? AND id != ?""",
+                (self.current_user, anchor_order, entry_id)
+            )
+            neighbour_order = cursor.fetchone()[0]
+            if neighbour_order is None:
+                return anchor_order + self.ORDER_GAP
+        
+        if abs(anchor_order - neighbour_order) < 2:
+            return None
+        return (anchor_order + neighbour_order) // 2
+    
+    def _rebalance_order(self, cursor) -> None:
+        """Renumber the current user's order keys with ORDER_GAP spacing"""
+        cursor.execute(
+            "SELECT id FROM passwords WHERE user_email = ? AND deleted_at IS NULL ORDER BY custom_order, id",
+            (self.current_user,)
+        )
+        entry_ids = [row['id'] for row in cursor.fetchall()]
+        cursor.executemany(
+            "UPDATE passwords SET custom_order = ? WHERE id = ?",
+            [(i * self.ORDER_GAP, entry_id) for i, entry_id in enumerate(entry_ids)]
+        )
+    
+    def get_sorted_entries(self, sort_type: str = "custom", search_query: str = "",
+                           pending_usage: Optional[Dict[int, tuple]] = None) -> List[VaultEntry]:
+        """Get password entries sorted by specified type and optionally filtered by search
+        
+        pending_usage holds (copy count, frecency key, last used) deltas by
+        entry id that have not been written yet; they are merged in so usage
+        ordering is already correct.
+        """
         if not self.current_user:
-            return
+            return []
         
         conn = self.db_manager.get_connection()
         cursor = conn.cursor()
+        
+        # Build query based on search, sorting in SQL
+        search_clause, search_params = self._search_clause(search_query)
         cursor.execute(
-            "SELECT id FROM passwords WHERE user_email = ? ORDER BY custom_order LIMIT 1 OFFSET ?",
-            (self.current_user, index)
+            f"""SELECT id, name, username, password, url, custom_order, copy_count, last_used_at, frecency 
+                FROM passwords WHERE user_email = ? AND deleted_at IS NULL{search_clause}
+                ORDER BY {self._order_by(sort_type)}""",
+            (self.current_user, *search_params)
         )
-        result = cursor.fetchone()
-        if result:
-            entry_id = result['id']
-            cursor.execute("UPDATE passwords SET copy_count = copy_count + 1 WHERE id = ?", (entry_id,))
-            conn.commit()
+        
+        entries = [self._row_to_entry(row) for row in cursor.fetchall()]
         conn.close()
+        
+        if pending_usage:
+            entries = self._apply_pending_usage(entries, pending_usage)
+            # Unwritten usage can change the order of the usage-based sorts
+            if sort_type == "frequently_used":
+                entries.sort(key=lambda x: (x.copy_count, x.id), reverse=True)
+            elif sort_type == "frecency":
+                entries.sort(key=lambda x: (x.frecency is not None, x.frecency or 0, x.id), reverse=True)
+        
+        return entries
     
-    def get_sorted_entries(self, sort_type: str = "custom", search_query: str = "") -> List[Dict]:
-        """Get password entries sorted by specified type and optionally filtered by search"""
+    @staticmethod
+    def _search_clause(search_query: str, alias: str = "") -> Tuple[str, tuple]:
+        """Get the SQL condition and parameters for a search filter
+        
+        Besides text, a query may hold audit filters such as "is:weak" or
+        "is:reused" (see AuditService) and site filters such as
+        "site:example.com", which all have to match.
+        """
+        if not search_query:
+            return "", ()
+        issues, search_query = AuditService.split_issue_filters(search_query)
+        sites = [site.lower() for site in PasswordService._SITE_PATTERN.findall(search_query)]
+        search_query = PasswordService._SITE_PATTERN.sub(" ", search_query).strip()
+        clause, params = "", ()
+        for issue in issues:
+            condition, condition_params = AuditService.issue_condition(issue, alias)
+            clause += f" AND {condition}"
+            params += condition_params
+        for site in sites:
+            # LIKE cheaply skips URLs without the name; on_site then compares the parsed host
+            clause += f" AND {alias}url LIKE ? AND on_site({alias}url, ?)"
+            params += (f"%{Sites.site_of(site)}%", site)
+        if search_query:
+            search_pattern = f"%{search_query}%"
+            clause += f" AND ({alias}name LIKE ? OR {alias}username LIKE ? OR {alias}url LIKE ?)"
+            params += (search_pattern, search_pattern, search_pattern)
+        return clause, params
+    
+    @classmethod
+    def _sort_key(cls, sort_type: str) -> Tuple[str, str, str]:
+        """Get the (column, direction, collation) that defines a sort order"""
+        return cls.SORT_KEYS.get(sort_type, cls.SORT_KEYS["custom"])
+    
+    @classmethod
+    def _order_by(cls, sort_type: str, alias: str = "") -> str:
+        """Get the ORDER BY expression for a sort order
+        
+        Ties are broken by id in the same direction, so every order is total
+        and matches a single forward or backward scan of its index.
+        """
+        column, direction, collation = cls._sort_key(sort_type)
+        return f"{alias}{column}{collation} {direction}, {alias}id {direction}"
+    
+    @classmethod
+    def _precedes(cls, sort_type: str, a: str, b: str) -> str:
+        """Get an SQL condition that is true when row alias a sorts before row alias b"""
+        column, direction, collation = cls._sort_key(sort_type)
+        op = "<" if direction == "ASC" else ">"
+        condition = f"({a}.{column}{collation}, {a}.id) {op} ({b}.{column}, {b}.id)"
+        if column in cls.NULLABLE_SORT_COLUMNS:
+            # NULLs sort first ascending and last descending, as in ORDER BY
+            first, last = (a, b) if direction == "ASC" else (b, a)
+            condition = (
+                f"({condition}"
+                f" OR ({first}.{column} IS NULL AND {last}.{column} IS NOT NULL)"
+                f" OR ({a}.{column} IS NULL AND {b}.{column} IS NULL AND {a}.id {op} {b}.id))"
+            )
+        return condition
+    
+    def get_entry_ids(self, sort_type: str = "custom", search_query: str = "") -> List[int]:
+        """Get the ids of entries in a sort order without fetching or decrypting them"""
         if not self.current_user:
             return []
         
+        search_clause, search_params = self._search_clause(search_query)
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""SELECT id FROM passwords WHERE user_email = ? AND deleted_at IS NULL{search_clause}
+                ORDER BY {self._order_by(sort_type)}""",
+            (self.current_user, *search_params)
+        )
+        entry_ids = [row['id'] for row in cursor.fetchall()]
+        conn.close()
+        return entry_ids
+    
+    def get_entry(self, entry_id: int) -> Optional[VaultEntry]:
+        """Get a single entry by id"""
+        if not self.current_user:
+            return None
+        
         conn = self.db_manager.get_connection()
         cursor = conn.cursor()
+        cursor.execute(
+            """SELECT id, name, username, password, url, custom_order, copy_count, last_used_at, frecency
+               FROM passwords WHERE id = ? AND user_email = ? AND deleted_at IS NULL""",
+            (entry_id, self.current_user)
+        )
+        row = cursor.fetchone()
+        conn.close()
+        return self._row_to_entry(row) if row else None
+    
+    def get_page(self, sort_type: str = "custom", search_query: str = "",
+                 after_key: Optional[tuple] = None, limit: int = 100) -> Tuple[List[VaultEntry], Optional[tuple]]:
+        """Get one page of entries in a sort order using a keyset cursor
         
-        # Build query based on search
-        if search_query:
-            search_pattern = f"%{search_query}%"
+        after_key is the key returned with the previous page (None for the
+        first page). Returns the page and the key for the next page, which is
+        None once the last page has been read. Each page is a range scan of
+        the sort's index starting at the key, however deep into the vault it is.
+        """
+        if not self.current_user or limit <= 0:
+            return [], None
+        
+        column = self._sort_key(sort_type)[0]
+        search_clause, search_params = self._search_clause(search_query)
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        
+        rows = []
+        for segment_clause, segment_params in self._keyset_segments(sort_type, after_key):
             cursor.execute(
-                """SELECT name, username, password, url, custom_order, copy_count 
-                   FROM passwords WHERE user_email = ? 
-                   AND (name LIKE ? OR username LIKE ? OR url LIKE ?)""",
-                (self.current_user, search_pattern, search_pattern, search_pattern)
+                f"""SELECT id, name, username, password, url, custom_order, copy_count, last_used_at, frecency
+                    FROM passwords WHERE user_email = ? AND deleted_at IS NULL{search_clause}{segment_clause}
+                    ORDER BY {self._order_by(sort_type)} LIMIT ?""",
+                (self.current_user, *search_params, *segment_params, limit + 1 - len(rows))
             )
-        else:
+            rows.extend(cursor.fetchall())
+            if len(rows) > limit:
+                break
+        conn.close()
+        
+        has_more = len(rows) > limit
+        entries = [self._row_to_entry(row) for row in rows[:limit]]
+        next_key = (entries[-1][column], entries[-1].id) if has_more else None
+        return entries, next_key
+    
+    @classmethod
+    def _keyset_segments(cls, sort_type: str, after_key: Optional[tuple]) -> List[Tuple[str, tuple]]:
+        """Get the conditions selecting the rows after a keyset cursor, in sort order
+        
+        Row-value comparisons let SQLite seek straight to the key in the
+        index. NULLs never satisfy them, so for nullable columns the NULL rows
+        are read as a separate segment rather than with an OR that would
+        force a scan.
+        """
+        if after_key is None:
+            return [("", ())]
+        
+        column, direction, collation = cls._sort_key(sort_type)
+        value, entry_id = after_key
+        op = ">" if direction == "ASC" else "<"
+        if column not in cls.NULLABLE_SORT_COLUMNS:
+            return [(f" AND ({column}, id) {op} (?{collation}, ?)", (value, entry_id))]
+        
+        nulls = f" AND {column} IS NULL"
+        values = f" AND {column} IS NOT NULL"
+        if value is None:
+            null_rest = (f"{nulls} AND id {op} ?", (entry_id,))
+            # NULLs sort first ascending and last descending
+            return [null_rest, (values, ())] if direction == "ASC" else [null_rest]
+        value_rest = (f" AND ({column}, id) {op} (?, ?)", (value, entry_id))
+        return [value_rest] if direction == "ASC" else [value_rest, (nulls, ())]
+    
+    def iter_entries(self, sort_type: str = "custom", search_query: str = "", page_size: int = 100) -> Iterator[VaultEntry]:
+        """Iterate over entries in a sort order, fetching and decrypting one page at a time
+        
+        Memory use is bounded by page_size regardless of vault size, and no
+        database connection is held between pages.
+        """
+        after_key = None
+        while True:
+            entries, after_key = self.get_page(sort_type, search_query, after_key, page_size)
+            yield from entries
+            if after_key is None:
+                return
+    
+    def count_entries(self, search_query: str = "") -> int:
+        """Count the current user's entries, optionally filtered by search"""
+        if not self.current_user:
+            return 0
+        
+        search_clause, search_params = self._search_clause(search_query)
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT COUNT(*) FROM passwords WHERE user_email = ? AND deleted_at IS NULL{search_clause}",
+            (self.current_user, *search_params)
+        )
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def get_entry_position(self, entry_id: int, sort_type: str = "custom", search_query: str = "") -> Optional[int]:
+        """Get the zero-based position of an entry in a sort order
+        
+        Returns None if the entry does not exist or does not match the search.
+        """
+        if not self.current_user:
+            return None
+        
+        search_clause, search_params = self._search_clause(search_query, "p.")
+        target_clause, target_params = self._search_clause(search_query, "t.")
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""SELECT (SELECT COUNT(*) FROM passwords p
+                        WHERE p.user_email = t.user_email AND p.deleted_at IS NULL{search_clause}
+                        AND {self._precedes(sort_type, "p", "t")})
+                FROM passwords t WHERE t.id = ? AND t.user_email = ? AND t.deleted_at IS NULL{target_clause}""",
+            (*search_params, entry_id, self.current_user, *target_params)
+        )
+        result = cursor.fetchone()
+        conn.close()
+        return result[0] if result else None
+    
+    def has_previous_entry(self, entry_id: int, sort_type: str = "custom", search_query: str = "") -> bool:
+        """Check whether any entry sorts before the given entry"""
+        return self._has_neighbour(entry_id, sort_type, search_query, previous=True)
+    
+    def has_next_entry(self, entry_id: int, sort_type: str = "custom", search_query: str = "") -> bool:
+        """Check whether any entry sorts after the given entry"""
+        return self._has_neighbour(entry_id, sort_type, search_query, previous=False)
+    
+    def _has_neighbour(self, entry_id: int, sort_type: str, search_query: str, previous: bool) -> bool:
+        """Check for an entry before or after the given entry with a single EXISTS query"""
+        if not self.current_user:
+            return False
+        
+        search_clause, search_params = self._search_clause(search_query, "p.")
+        precedes = self._precedes(sort_type, "p", "t") if previous else self._precedes(sort_type, "t", "p")
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""SELECT EXISTS(SELECT 1 FROM passwords p
+                              WHERE p.user_email = t.user_email AND p.deleted_at IS NULL{search_clause}
+                              AND {precedes})
+                FROM passwords t WHERE t.id = ? AND t.user_email = ? AND t.deleted_at IS NULL""",
+            (*search_params, entry_id, self.current_user)
+        )
+        result = cursor.fetchone()
+        conn.close()
+        return bool(result and result[0])
+    
+    def get_top_entries(self, limit: int = 10, pending_usage: Optional[Dict[int, tuple]] = None) -> List[VaultEntry]:
+        """Get the most relevant entries by time-decayed usage (frecency)
+        
+        Reads only the top rows of the frecency index. Pending usage can only
+        raise a score, so the true top entries are among the stored top rows
+        and the entries with pending usage.
+        """
+        if not self.current_user or limit <= 0:
+            return []
+        
+        pending_ids = list(pending_usage or {})
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT id, name, username, password, url, custom_order, copy_count, last_used_at, frecency
+               FROM passwords WHERE user_email = ? AND deleted_at IS NULL AND frecency IS NOT NULL
+               ORDER BY frecency DESC, id DESC LIMIT ?""",
+            (self.current_user, limit)
+        )
+        rows = {row['id']: row for row in cursor.fetchall()}
+        if pending_ids:
+            placeholders = ", ".join("?" * len(pending_ids))
             cursor.execute(
-                """SELECT name, username, password, url, custom_order, copy_count 
-                   FROM passwords WHERE user_email = ?""",
-                (self.current_user,)
+                f"""SELECT id, name, username, password, url, custom_order, copy_count, last_used_at, frecency
+                    FROM passwords WHERE user_email = ? AND deleted_at IS NULL AND id IN ({placeholders})""",
+                (self.current_user, *pending_ids)
             )
+            rows.update((row['id'], row) for row in cursor.fetchall())
+        conn.close()
         
-        entries = []
-        for row in cursor.fetchall():
-            # Decrypt password before returning
-            try:
-                decrypted_password = self.db_manager.decrypt(row['password'])
-            except:
-                decrypted_password = ""  # Handle decryption errors gracefully
-            
-            entries.append({
-                'name': row['name'],
-                'username': row['username'],
-                'password': decrypted_password,
-                'url': row['url'],
-                'custom_order': row['custom_order'],
-                'copy_count': row['copy_count']
-            })
+        entries = [self._row_to_entry(row) for row in rows.values()]
+        if pending_usage:
+            entries = self._apply_pending_usage(entries, pending_usage)
+        entries.sort(key=lambda x: (x.frecency, x.id), reverse=True)
+        return entries[:limit]
+    
+    def get_reuse_groups(self) -> List[List[int]]:
+        """Get groups of entry ids sharing the same password, largest group first
         
-        conn.close()
+        Grouped on the indexed fingerprint, so nothing is decrypted.
+        """
+        if not self.current_user:
+            return []
         
-        # Apply sorting in Python (could be moved to SQL for better performance)
-        if sort_type == "alphabetical_asc":
-            entries.sort(key=lambda x: x["name"].lower())
-        elif sort_type == "alphabetical_desc":
-            entries.sort(key=lambda x: x["name"].lower(), reverse=True)
-        elif sort_type == "frequently_used":
-            entries.sort(key=lambda x: x.get("copy_count", 0), reverse=True)
-        else:  # custom
-            entries.sort(key=lambda x: x.get("custom_order", 0))
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT GROUP_CONCAT(id) AS ids, COUNT(*) AS uses FROM passwords
+               WHERE user_email = ? AND deleted_at IS NULL AND password_fingerprint IS NOT NULL
+               GROUP BY password_fingerprint HAVING COUNT(*) > 1
+               ORDER BY uses DESC, MIN(id)""",
+            (self.current_user,)
+        )
+        groups = [sorted(int(entry_id) for entry_id in row['ids'].split(",")) for row in cursor.fetchall()]
+        conn.close()
+        return groups
+    
+    def find_entries_using_password(self, password: str, exclude_id: Optional[int] = None) -> List[VaultEntry]:
+        """Get the entries whose password equals the given one, with a single index lookup"""
+        if not self.current_user or not password:
+            return []
         
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT id, name, username, password, url, custom_order, copy_count, last_used_at, frecency
+               FROM passwords WHERE user_email = ? AND deleted_at IS NULL AND password_fingerprint = ? AND id IS NOT ?
+               ORDER BY id""",
+            (self.current_user, self.db_manager.fingerprint(password), exclude_id)
+        )
+        entries = [self._row_to_entry(row) for row in cursor.fetchall()]
+        conn.close()
         return entries
+    
+    def _row_to_entry(self, row) -> VaultEntry:
+        """Convert a passwords row into an entry record; the password stays encrypted until read"""
+        return VaultEntry(
+            id=row['id'],
+            name=row['name'],
+            username=row['username'],
+            url=row['url'],
+            order=row['custom_order'],
+            copy_count=row['copy_count'],
+            encrypted_password=row['password'],
+            decrypt=self.db_manager.decrypt,
+            last_used_at=row['last_used_at'],
+            frecency=row['frecency']
+        )
+    
+    @staticmethod
+    def _apply_pending_usage(entries: List[VaultEntry], pending_usage: Dict[int, tuple]) -> List[VaultEntry]:
+        """Get entries with unwritten usage deltas merged in"""
+        merged = []
+        for entry in entries:
+            usage = pending_usage.get(entry.id)
+            if usage is not None:
+                count, key, last_used = usage
+                entry = entry.replace(
+                    copy_count=entry.copy_count + count,
+                    frecency=log_add_exp(entry.frecency, key),
+                    last_used_at=max(entry.last_used_at or 0, last_used)
+                )
+            merged.append(entry)
+        return merged
@@ -0,0 +1,688 @@
+"""Password strength scores from 0 (trivially guessable) to 4 (very strong)
+
+A zxcvbn-style estimator: the password is matched against patterns an
+attacker would try first (common passwords and words, including reversed
+and l33t-speak variants, keyboard walks, repeats, sequences, years and
+dates). Each match gets a guess count, and the cheapest way to cover the
+whole password with matches and brute-forced gaps gives the estimate. The
+score is a band of that estimate on a log10 scale.
+
+The frequency dictionaries are precompiled into a compact binary file,
+loaded on first use, so scoring on every keystroke stays well under a
+millisecond. Build it from ranked word lists (one word per line, most
+common first, one file per dictionary) with:
+
+    python -m model.PasswordStrength <directory of .txt lists> <output file>
+"""
+import math
+import re
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+VERSION = 2  # Bump whenever scores change, so stored scores are recomputed
+
+# log10 of the guesses needed for scores 1 to 4
+SCORE_THRESHOLDS = (3, 6, 8, 10)
+
+DICTIONARY_FILE = Path(__file__).resolve().parent / "data" / "strength_dictionaries.bin"
+MAX_LENGTH = 100  # Only this many leading characters are analysed
+
+_MAGIC = b"PVDICT01"
+_HEADER = struct.Struct(">8sII")  # magic, word count, compressed size
+
+_BRUTEFORCE_CARDINALITY = 10
+_MIN_GUESSES_BEFORE_GROWING_SEQUENCE = 10000
+_MIN_SUBMATCH_GUESSES_SINGLE_CHAR = 10
+_MIN_SUBMATCH_GUESSES_MULTI_CHAR = 50
+_MIN_YEAR_SPACE = 20
+_REFERENCE_YEAR = 2026
+_MAX_L33T_SUBS = 16  # Readings of l33t symbols tried per password
+
+_L33T_TABLE = {
+    "a": "4@", "b": "8", "c": "({[<", "e": "3", "g": "69", "i": "1!|",
+    "l": "1|7", "o": "0", "s": "$5", "t": "+7", "x": "%", "z": "2",
+}
+_L33T_SUBSTITUTES = {}
+for _letter, _symbols in _L33T_TABLE.items():
+    for _symbol in _symbols:
+        _L33T_SUBSTITUTES.setdefault(_symbol, []).append(_letter)
+
+_KEYBOARD_LAYOUTS = {
+    "qwerty": (True, """
+`~ 1! 2@ 3# 4$ 5% 6^ 7& 8* 9( 0) -_ =+
+    qQ wW eE rR tT yY uU iI oO pP [{ ]} \\|
+     aA sS dD fF gG hH jJ kK lL ;: '"
+      zZ xX cC vV bB nN mM ,< .> /?
+"""),
+    "dvorak": (True, """
+`~ 1! 2@ 3# 4$ 5% 6^ 7& 8* 9( 0) [{ ]}
+    '" ,< .> pP yY fF gG cC rR lL /? =+ \\|
+     aA oO eE uU iI dD hH tT nN sS -_
+      ;: qQ jJ kK xX bB mM wW vV zZ
+"""),
+    "keypad": (False, """
+  / * -
+7 8 9 +
+4 5 6
+1 2 3
+  0 .
+"""),
+}
+
+_WARNINGS = {
+    "top10": "This is a top-10 common password",
+    "top100": "This is a top-100 common password",
+    "common": "This is a very common password",
+    "similar": "This is similar to a commonly used password",
+    "word": "A word by itself is easy to guess",
+    "name": "Names and surnames by themselves are easy to guess",
+    "user_input": "Avoid using your name, login or the site's name",
+    "spatial": "Keyboard patterns like qwerty are easy to guess",
+    "repeat": 'Repeats like "aaa" or "abcabc" are easy to guess',
+    "sequence": "Sequences like abc or 6543 are easy to guess",
+    "year": "Recent years are easy to guess",
+    "date": "Dates are often easy to guess",
+}
+
+
+class StrengthEstimate:
+    """Result of estimating how hard a password is to guess"""
+    
+    __slots__ = ("guesses_log10", "score", "warning", "patterns")
+    
+    def __init__(self, guesses_log10: float, score: int, warning: str, patterns: List[str]):
+        self.guesses_log10 = guesses_log10
+        self.score = score
+        self.warning = warning  # Why the password is weak, or "" when nothing stands out
+        self.patterns = patterns  # Pattern of each part of the password, in order
+
+
+# ==================== Dictionaries ====================
+
+class _Dictionaries:
+    """Ranked word lists, merged into one index keeping each word's best rank"""
+    
+    def __init__(self, names: List[str], index: Dict[str, int], ranks: array, sources: bytes):
+        self.names = names
+        self.index = index
+        self.ranks = ranks
+        self.sources = sources
+        self.max_length = max(map(len, index), default=0)
+    
+    def lookup(self, word: str):
+        """Get (rank, dictionary name) for a word, or None"""
+        position = self.index.get(word)
+        if position is None:
+            return None
+        return self.ranks[position], self.names[self.sources[position]]
+
+
+_dictionaries: Optional[_Dictionaries] = None
+
+
+def build_dictionaries(lists: Dict[str, Sequence[str]], path) -> int:
+    """Compile ranked word lists into a dictionary file and return the number of words
+    
+    A word listed in several dictionaries keeps only its best rank.
+    """
+    names = sorted(lists)
+    best = {}
+    for source, name in enumerate(names):
+        for rank, word in enumerate(lists[name], 1):
+            word = word.strip().lower()
+            if word and "\n" not in word and (word not in best or rank < best[word][0]):
+                best[word] = (rank, source)
+    
+    words = list(best)
+    ranks = array("I", (best[word][0] for word in words))
+    if sys.byteorder != "big":
+        ranks.byteswap()
+    payload = b"\0".join([
+        "\n".join(names).encode(),
+        "\n".join(words).encode(),
+    ])
+    body = zlib.compress(struct.pack(">I", len(payload)) + payload + ranks.tobytes()
+                         + bytes(best[word][1] for word in words), 9)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(words), len(body)))
+        f.write(body)
+    return len(words)
+
+
+def _load_dictionaries() -> _Dictionaries:
+    """Load the compiled dictionaries once; an empty set if the file is missing or damaged"""
+    global _dictionaries
+    if _dictionaries is not None:
+        return _dictionaries
+    try:
+        with open(DICTIONARY_FILE, "rb") as f:
+            magic, count, size = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError("not a dictionary file")
+            body = zlib.decompress(f.read(size))
+        (payload_size,) = struct.unpack_from(">I", body)
+        names_blob, words_blob = body[4:4 + payload_size].split(b"\0")
+        ranks = array("I")
+        ranks.frombytes(body[4 + payload_size:4 + payload_size + count * 4])
+        if sys.byteorder != "big":
+            ranks.byteswap()
+        sources = body[4 + payload_size + count * 4:]
+        words = words_blob.decode().split("\n")
+        if len(words) != count or len(ranks) != count or len(sources) != count:
+            raise ValueError("dictionary file is truncated")
+        _dictionaries = _Dictionaries(names_blob.decode().split("\n"), dict(zip(words, range(count))),
+                                      ranks, sources)
+    except (OSError, ValueError, struct.error, zlib.error) as e:
+        print(f"Error loading password dictionaries: {e}")
+        _dictionaries = _Dictionaries([], {}, array("I"), b"")
+    return _dictionaries
+
+
+# ==================== Keyboard graphs ====================
+
+_graphs: Optional[Dict[str, Dict[str, List[Optional[str]]]]] = None
+_graph_sizes: Dict[str, tuple] = {}  # Graph name -> (starting keys, average neighbours)
+
+
+def _build_graph(layout: str, slanted: bool) -> Dict[str, List[Optional[str]]]:
+    """Map every key character to its neighbouring keys, clockwise from the left
+    
+    Rows of a slanted keyboard are each offset by a third of a key, so a key
+    has six neighbours; keypads are aligned and have eight.
+    """
+    positions = {}
+    lines = layout.split("\n")
+    x_unit = len(layout.split()[0]) + 1
+    for y, line in enumerate(lines):
+        slant = y - 1 if slanted else 0
+        for token in line.split():
+            x = (line.index(token) - slant) // x_unit
+            positions[(x, y)] = token
+    
+    if slanted:
+        offsets = ((-1, 0), (0, -1), (1, -1), (1, 0), (0, 1), (-1, 1))
+    else:
+        offsets = ((-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1))
+    graph = {}
+    for (x, y), token in positions.items():
+        neighbours = [positions.get((x + dx, y + dy)) for dx, dy in offsets]
+        for char in token:
+            graph[char] = neighbours
+    return graph
+
+
+def _keyboard_graphs() -> Dict[str, Dict[str, List[Optional[str]]]]:
+    """Build the keyboard adjacency graphs once"""
+    global _graphs
+    if _graphs is None:
+        _graphs = {name: _build_graph(layout, slanted) for name, (slanted, layout) in _KEYBOARD_LAYOUTS.items()}
+        for name, graph in _graphs.items():
+            degree = sum(sum(1 for key in neighbours if key) for neighbours in graph.values()) / len(graph)
+            _graph_sizes[name] = (len(graph), degree)
+    return _graphs
+
+
+# ==================== Matching ====================
+
+def _dictionary_matches(password: str, user_inputs: Dict[str, int]) -> List[dict]:
+    """Find dictionary words, forwards, reversed and in l33t-speak"""
+    matches = []
+    lower = password.lower()
+    n = len(password)
+    dictionaries = _load_dictionaries()
+    max_length = max(dictionaries.max_length, max(map(len, user_inputs), default=0))
+    
+    index_get = dictionaries.index.get
+    
+    def scan(text: str, reversed_: bool, sub: Optional[Dict[str, str]]):
+        # A l33t reading only matters for words covering a substituted symbol
+        next_symbol = list(range(n))
+        if sub is not None:
+            following = n
+            for k in range(n - 1, -1, -1):
+                if lower[k] in sub:
+                    following = k
+                next_symbol[k] = max(following, k + 1)
+        for i in range(n):
+            for j in range(next_symbol[i], min(n, i + max_length)):
+                word = text[i:j + 1]
+                position = index_get(word)
+                if position is None and word not in user_inputs:
+                    continue
+                found = dictionaries.lookup(word) if position is not None else None
+                user_rank = user_inputs.get(word)
+                if user_rank is not None and (found is None or user_rank <= found[0]):
+                    found = (user_rank, "user_inputs")
+                start, end = (n - 1 - j, n - 1 - i) if reversed_ else (i, j)
+                token = password[start:end + 1]
+                if sub is not None:
+                    used = {symbol: letter for symbol, letter in sub.items() if symbol in token}
+                    if not used:
+                        continue
+                else:
+                    used = None
+                matches.append({
+                    "pattern": "dictionary", "i": start, "j": end, "token": token,
+                    "matched_word": word, "rank": found[0], "dictionary_name": found[1],
+                    "reversed": reversed_, "l33t": used is not None, "sub": used,
+                })
+    
+    scan(lower, False, None)
+    scan(lower[::-1], True, None)
+    for sub in _l33t_subs(lower):
+        scan(lower.translate(str.maketrans(sub)), False, sub)
+    return matches
+
+
+def _l33t_subs(lower: str) -> List[Dict[str, str]]:
+    """Enumerate the ways of reading the password's l33t symbols as letters"""
+    symbols = [symbol for symbol in dict.fromkeys(lower) if symbol in _L33T_SUBSTITUTES]
+    subs = [{}]
+    for symbol in symbols:
+        subs = [dict(sub, **{symbol: letter}) for sub in subs for letter in _L33T_SUBSTITUTES[symbol]]
+        if len(subs) > _MAX_L33T_SUBS:
+            break
+    return [sub for sub in subs[:_MAX_L33T_SUBS] if sub]
+
+
+def _spatial_matches(password: str) -> List[dict]:
+    """Find walks of three or more adjacent keys, e.g. qwerty or 7410"""
+    matches = []
+    for graph_name, graph in _keyboard_graphs().items():
+        i = 0
+        n = len(password)
+        while i < n - 1:
+            j = i + 1
+            last_direction = None
+            turns = 0
+            shifted = 1 if graph_name != "keypad" and password[i] in '~!@#$%^&*()_+QWERTYUIOP{}|ASDFGHJKL:"ZXCVBNM<>?' else 0
+            while True:
+                found = False
+                if j < n:
+                    neighbours = graph.get(password[j - 1]) or []
+                    for direction, neighbour in enumerate(neighbours):
+                        if neighbour and password[j] in neighbour:
+                            found = True
+                            if neighbour.index(password[j]) == 1:
+                                shifted += 1
+                            if last_direction != direction:
+                                turns += 1
+                                last_direction = direction
+                            break
+                if found:
+                    j += 1
+                    continue
+                if j - i > 2:
+                    matches.append({
+                        "pattern": "spatial", "i": i, "j": j - 1, "token": password[i:j],
+                        "graph": graph_name, "turns": turns, "shifted_count": shifted,
+                    })
+                i = j
+                break
+    return matches
+
+
+_GREEDY_REPEAT = re.compile(r"(.+)\1+")
+_LAZY_REPEAT = re.compile(r"(.+?)\1+")
+_LAZY_ANCHORED_REPEAT = re.compile(r"^(.+?)\1+$")
+
+
+def _repeat_matches(password: str) -> List[dict]:
+    """Find repeated characters or blocks, e.g. aaa or abcabc"""
+    matches = []
+    last_index = 0
+    while last_index < len(password):
+        greedy = _GREEDY_REPEAT.search(password, last_index)
+        if not greedy:
+            break
+        lazy = _LAZY_REPEAT.search(password, last_index)
+        if len(greedy.group(0)) > len(lazy.group(0)):
+            match = greedy
+            base_token = _LAZY_ANCHORED_REPEAT.match(match.group(0)).group(1)
+        else:
+            match = lazy
+            base_token = match.group(1)
+        i, j = match.span()[0], match.span()[1] - 1
+        base_guesses = _most_guessable(base_token, _omnimatch(base_token, {}))[0]
+        matches.append({
+            "pattern": "repeat", "i": i, "j": j, "token": match.group(0),
+            "base_token": base_token, "base_guesses": base_guesses,
+            "repeat_count": len(match.group(0)) // len(base_token),
+        })
+        last_index = j + 1
+    return matches
+
+
+def _sequence_matches(password: str) -> List[dict]:
+    """Find runs with a constant step between characters, e.g. abc, 7531 or ZYX"""
+    matches = []
+    n = len(password)
+    if n < 2:
+        return matches
+    
+    def add(i: int, j: int, delta: int):
+        if j - i > 1 or abs(delta) == 1:
+            if 0 < abs(delta) <= 5:
+                token = password[i:j + 1]
+                matches.append({
+                    "pattern": "sequence", "i": i, "j": j, "token": token,
+                    "sequence_space": 10 if token.isdigit() else 26, "ascending": delta > 0,
+                })
+    
+    i = 0
+    last_delta = None
+    for k in range(1, n):
+        delta = ord(password[k]) - ord(password[k - 1])
+        if last_delta is None:
+            last_delta = delta
+        if delta == last_delta:
+            continue
+        add(i, k - 1, last_delta)
+        i = k - 1
+        last_delta = delta
+    add(i, n - 1, last_delta)
+    return matches
+
+
+_YEAR = re.compile(r"19\d\d|20[0-4]\d")
+
+
+def _regex_matches(password: str) -> List[dict]:
+    """Find recent years"""
+    return [
+        {"pattern": "regex", "regex_name": "recent_year", "i": m.start(), "j": m.end() - 1, "token": m.group(0)}
+        for m in _YEAR.finditer(password)
+    ]
+
+
+_DATE_WITH_SEPARATOR = re.compile(r"^(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})$")
+
+
+def _date_matches(password: str) -> List[dict]:
+    """Find dates of 4 to 8 digits, with or without separators, e.g. 13.3.1997 or 19970313"""
+    matches = []
+    n = len(password)
+    for i in range(n - 3):
+        for j in range(i + 3, min(n, i + 10)):
+            token = password[i:j + 1]
+            if token.isdigit():
+                if len(token) > 8:
+                    continue
+                year = next((year for year in map(_date_year, _digit_splits(token)) if year is not None), None)
+                if year is not None:
+                    matches.append({"pattern": "date", "i": i, "j": j, "token": token,
+                                    "year": year, "separator": ""})
+            else:
+                found = _DATE_WITH_SEPARATOR.match(token)
+                if not found:
+                    continue
+                year = _date_year((int(found.group(1)), int(found.group(3)), int(found.group(4))))
+                if year is not None:
+                    matches.append({"pattern": "date", "i": i, "j": j, "token": token,
+                                    "year": year, "separator": found.group(2)})
+    # Keep only dates not inside longer dates
+    return [m for m in matches
+            if not any(o is not m and o["i"] <= m["i"] and o["j"] >= m["j"] for o in matches)]
+
+
+def _digit_splits(token: str) -> Iterable[tuple]:
+    """Split a run of digits into three numbers in every plausible way"""
+    for first in range(1, len(token) - 1):
+        for second in range(first + 1, len(token)):
+            if second - first <= 2:
+                yield int(token[:first]), int(token[first:second]), int(token[second:])
+
+
+def _date_year(parts: tuple) -> Optional[int]:
+    """Get the year of a plausible (day, month, year) triple in any common order, or None"""
+    for year, day, month in ((parts[2], parts[0], parts[1]), (parts[2], parts[1], parts[0]),
+                             (parts[0], parts[1], parts[2]), (parts[0], parts[2], parts[1])):
+        if not (1 <= month <= 12 and 1 <= day <= 31):
+            continue
+        if 1000 <= year <= 2050:
+            return year
+        if year < 100:
+            return year + (1900 if year > 50 else 2000)
+    return None
+
+
+def _omnimatch(password: str, user_inputs: Dict[str, int]) -> List[dict]:
+    """Run every matcher"""
+    matches = _dictionary_matches(password, user_inputs)
+    matches += _spatial_matches(password)
+    matches += _repeat_matches(password)
+    matches += _sequence_matches(password)
+    matches += _regex_matches(password)
+    matches += _date_matches(password)
+    matches.sort(key=lambda m: (m["i"], m["j"]))
+    return matches
+
+
+# ==================== Scoring ====================
+
+def _n_choose_k(n: int, k: int) -> int:
+    """Binomial coefficient"""
+    return math.comb(n, k) if 0 <= k <= n else 0
+
+
+def _uppercase_variations(token: str) -> int:
+    """Count the capitalisations an attacker tries before this one"""
+    if token.islower() or not any(c.isalpha() for c in token):
+        return 1
+    if token[0].isupper() and token[1:].lower() == token[1:] or token.isupper() \
+            or token[-1].isupper() and token[:-1].lower() == token[:-1]:
+        return 2
+    upper = sum(1 for c in token if c.isupper())
+    lower = sum(1 for c in token if c.islower())
+    return sum(_n_choose_k(upper + lower, k) for k in range(1, min(upper, lower) + 1))
+
+
+def _l33t_variations(match: dict) -> int:
+    """Count the l33t substitutions an attacker tries before this one"""
+    if not match["l33t"]:
+        return 1
+    variations = 1
+    token = match["token"].lower()
+    for symbol, letter in match["sub"].items():
+        subbed = token.count(symbol)
+        unsubbed = token.count(letter)
+        if subbed == 0 or unsubbed == 0:
+            variations *= 2
+        else:
+            variations *= sum(_n_choose_k(subbed + unsubbed, k) for k in range(1, min(subbed, unsubbed) + 1))
+    return variations
+
+
+def _spatial_guesses(match: dict) -> float:
+    """Count the keyboard walks of this length and number of turns"""
+    _keyboard_graphs()
+    starts, degree = _graph_sizes[match["graph"]]
+    length = len(match["token"])
+    turns = match["turns"]
+    guesses = 0
+    for i in range(2, length + 1):
+        for j in range(1, min(turns, i - 1) + 1):
+            guesses += _n_choose_k(i - 1, j - 1) * starts * degree ** j
+    shifted = match["shifted_count"]
+    if shifted:
+        unshifted = length - shifted
+        if unshifted == 0:
+            guesses *= 2
+        else:
+            guesses *= sum(_n_choose_k(shifted + unshifted, k) for k in range(1, min(shifted, unshifted) + 1))
+    return guesses
+
+
+def _estimate_guesses(match: dict, password: str) -> float:
+    """Get (and cache on the match) the number of guesses needed for a match"""
+    if "guesses" in match:
+        return match["guesses"]
+    length = len(match["token"])
+    minimum = 1
+    if length < len(password):
+        minimum = _MIN_SUBMATCH_GUESSES_SINGLE_CHAR if length == 1 else _MIN_SUBMATCH_GUESSES_MULTI_CHAR
+    
+    pattern = match["pattern"]
+    if pattern == "bruteforce":
+        floor = _MIN_SUBMATCH_GUESSES_SINGLE_CHAR if length == 1 else _MIN_SUBMATCH_GUESSES_MULTI_CHAR
+        guesses = max(float(_BRUTEFORCE_CARDINALITY) ** length, floor + 1)
+    elif pattern == "dictionary":
+        guesses = match["rank"] * _uppercase_variations(match["token"]) * _l33t_variations(match)
+        if match["reversed"]:
+            guesses *= 2
+    elif pattern == "spatial":
+        guesses = _spatial_guesses(match)
+    elif pattern == "repeat":
+        guesses = match["base_guesses"] * match["repeat_count"]
+    elif pattern == "sequence":
+        first = match["token"][0]
+        base = 4 if first in "aAzZ019" else match["sequence_space"]
+        guesses = base * length * (1 if match["ascending"] else 2)
+    elif pattern == "regex":
+        guesses = max(abs(int(match["token"]) - _REFERENCE_YEAR), _MIN_YEAR_SPACE)
+    else:  # date
+        guesses = max(abs(match["year"] - _REFERENCE_YEAR), _MIN_YEAR_SPACE) * 365
+        if match["separator"]:
+            guesses *= 4
+    match["guesses"] = max(guesses, minimum)
+    return match["guesses"]
+
+
+def _most_guessable(password: str, matches: List[dict]):
+    """Find the sequence of matches covering the password that needs the fewest guesses
+    
+    Dynamic programming over (end position, number of matches): a sequence
+    of l matches costs l! times the product of their guesses, plus a
+    penalty that grows with l so that long chains of tiny matches lose to
+    brute force.
+    """
+    n = len(password)
+    if n == 0:
+        return 1, []
+    by_end = [[] for _ in range(n)]
+    for match in matches:
+        by_end[match["j"]].append(match)
+    
+    best_match = [{} for _ in range(n)]  # best_match[k][l]: last match of the best l-match cover of 0..k
+    best_product = [{} for _ in range(n)]
+    best_guesses = [{} for _ in range(n)]
+    # Floats keep this fast; even 100 brute-forced characters stay far below their range
+    factorials = [float(math.factorial(length)) for length in range(n + 1)]
+    penalties = [float(_MIN_GUESSES_BEFORE_GROWING_SEQUENCE) ** (length - 1) if length < 75 else math.inf
+                 for length in range(n + 1)]
+    
+    def update(match: dict, length: int):
+        k = match["j"]
+        product = float(_estimate_guesses(match, password))
+        if length > 1:
+            product *= best_product[match["i"] - 1][length - 1]
+        guesses = factorials[length] * product + penalties[length]
+        for competing_length, competing in best_guesses[k].items():
+            if competing_length <= length and competing <= guesses:
+                return
+        best_match[k][length] = match
+        best_product[k][length] = product
+        best_guesses[k][length] = guesses
+    
+    def bruteforce(i: int, j: int) -> dict:
+        return {"pattern": "bruteforce", "i": i, "j": j, "token": password[i:j + 1]}
+    
+    for k in range(n):
+        for match in by_end[k]:
+            if match["i"] > 0:
+                for length in list(best_match[match["i"] - 1]):
+                    update(match, length + 1)
+            else:
+                update(match, 1)
+        update(bruteforce(0, k), 1)
+        for i in range(1, k + 1):
+            gap = None
+            for length, last in list(best_match[i - 1].items()):
+                if last["pattern"] != "bruteforce":
+                    gap = gap or bruteforce(i, k)
+                    update(gap, length + 1)
+    
+    length, guesses = min(best_guesses[n - 1].items(), key=lambda item: item[1])
+    sequence = []
+    k = n - 1
+    while k >= 0:
+        match = best_match[k][length]
+        sequence.append(match)
+        k = match["i"] - 1
+        length -= 1
+    sequence.reverse()
+    return guesses, sequence
+
+
+def _warning(sequence: List[dict], guesses_log10: float) -> str:
+    """Explain the weakest part of a password that scores below 3"""
+    if guesses_log10 >= SCORE_THRESHOLDS[2] or not sequence:
+        return ""
+    match = max(sequence, key=lambda m: len(m["token"]))
+    pattern = match["pattern"]
+    if pattern == "dictionary":
+        if match["dictionary_name"] == "passwords":
+            if len(sequence) == 1 and not match["l33t"] and not match["reversed"]:
+                if match["rank"] <= 10:
+                    return _WARNINGS["top10"]
+                if match["rank"] <= 100:
+                    return _WARNINGS["top100"]
+                return _WARNINGS["common"]
+            return _WARNINGS["similar"]
+        if match["dictionary_name"] == "user_inputs":
+            return _WARNINGS["user_input"]
+        if match["dictionary_name"] in ("surnames", "male_names", "female_names"):
+            return _WARNINGS["name"]
+        return _WARNINGS["word"] if len(sequence) == 1 else ""
+    if pattern == "regex":
+        return _WARNINGS["year"]
+    return _WARNINGS.get(pattern, "")
+
+
+def estimate(password: str, user_inputs: Iterable[str] = ()) -> StrengthEstimate:
+    """Estimate how hard a password is to guess
+    
+    user_inputs are strings an attacker could know, such as the user's
+    name, login or the site; they count as the most common words.
+    """
+    password = password[:MAX_LENGTH]
+    inputs = {}
+    for value in user_inputs:
+        for word in re.split(r"[\W_]+", str(value).lower()):
+            if len(word) > 2:
+                inputs.setdefault(word, len(inputs) + 1)
+    guesses, sequence = _most_guessable(password, _omnimatch(password, inputs))
+    log_guesses = math.log10(guesses) if guesses > 0 else 0.0
+    return StrengthEstimate(
+        log_guesses,
+        sum(1 for threshold in SCORE_THRESHOLDS if log_guesses >= threshold),
+        _warning(sequence, log_guesses),
+        [match["pattern"] for match in sequence],
+    )
+
+
+def guesses_log10(password: str) -> float:
+    """Estimate log10 of the number of guesses needed to find a password"""
+    return estimate(password).guesses_log10 if password else 0.0
+
+
+def score(password: str) -> int:
+    """Rate a password from 0 (trivially guessable) to 4 (very strong)"""
+    return estimate(password).score if password else 0
+
+
+if __name__ == "__main__":
+    # python -m model.PasswordStrength lists/ model/data/strength_dictionaries.bin
+    if len(sys.argv) != 3:
+        print("Usage: python -m model.PasswordStrength <directory of .txt lists> <output file>")
+        sys.exit(2)
+    word_lists = {
+        source.stem: source.read_text(encoding="utf-8").split("\n")
+        for source in sorted(Path(sys.argv[1]).glob("*.txt"))
+    }
+    total = build_dictionaries(word_lists, sys.argv[2])
+    print(f"Wrote {total} words from {len(word_lists)} lists to {sys.argv[2]}")
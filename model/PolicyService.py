@@ -0,0 +1,130 @@
+import json
+from typing import Dict, Iterable, Optional
+from . import Sites
+from .DatabaseManager import DatabaseManager
+from .PasswordGenerator import GeneratorPolicy
+
+
+class PolicyService:
+    """Saves password generator policies per entry or per site for one-click rotation
+    
+    An entry's own policy wins over the policy saved for its site, which
+    wins over the default policy. A site is the URL's host name without a
+    leading "www.", so every entry for the same site shares its policy.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+    
+    @staticmethod
+    def site_of(url: str) -> str:
+        """Get the site a URL belongs to, or "" if it has none"""
+        return Sites.site_of(url)
+    
+    @classmethod
+    def _scopes(cls, entry_id: Optional[int] = None, url: str = "") -> list:
+        """Get the scopes that apply, most specific first"""
+        scopes = []
+        if entry_id is not None:
+            scopes.append(f"entry:{entry_id}")
+        site = cls.site_of(url)
+        if site:
+            scopes.append(f"site:{site}")
+        return scopes
+    
+    @staticmethod
+    def _parse(policy_json: str) -> Optional[GeneratorPolicy]:
+        """Rebuild a stored policy, or None if it is unreadable"""
+        try:
+            return GeneratorPolicy.from_dict(json.loads(policy_json))
+        except (TypeError, ValueError) as e:
+            print(f"Error reading generator policy: {e}")
+            return None
+    
+    def get_policy(self, user_email: str, entry_id: Optional[int] = None, url: str = "") -> GeneratorPolicy:
+        """Get the policy for an entry, falling back to its site's and then the default"""
+        scopes = self._scopes(entry_id, url)
+        if not scopes:
+            return GeneratorPolicy()
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"""SELECT scope, policy FROM generator_policies
+                    WHERE user_email = ? AND scope IN ({", ".join("?" * len(scopes))})""",
+                (user_email, *scopes)
+            )
+            saved = dict(cursor.fetchall())
+        except Exception as e:
+            print(f"Error loading generator policy: {e}")
+            saved = {}
+        finally:
+            conn.close()
+        for scope in scopes:
+            if scope in saved:
+                policy = self._parse(saved[scope])
+                if policy is not None:
+                    return policy
+        return GeneratorPolicy()
+    
+    def get_policies(self, user_email: str, entries: Iterable) -> Dict[int, GeneratorPolicy]:
+        """Get the policy for each of several entries, with one query"""
+        entries = list(entries)
+        policies = {}
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT scope, policy FROM generator_policies WHERE user_email = ?", (user_email,))
+            saved = dict(cursor.fetchall())
+        except Exception as e:
+            print(f"Error loading generator policies: {e}")
+            saved = {}
+        finally:
+            conn.close()
+        
+        parsed = {}
+        for entry in entries:
+            policy = None
+            for scope in self._scopes(entry.id, entry.url):
+                if scope in saved:
+                    if scope not in parsed:
+                        parsed[scope] = self._parse(saved[scope])
+                    policy = parsed[scope]
+                    if policy is not None:
+                        break
+            policies[entry.id] = policy or GeneratorPolicy()
+        return policies
+    
+    def save_policy(self, user_email: str, policy: GeneratorPolicy,
+                    entry_id: Optional[int] = None, url: str = "") -> bool:
+        """Save a policy for an entry, or for a URL's site when no entry is given"""
+        scopes = self._scopes(entry_id, "" if entry_id is not None else url)
+        if not scopes:
+            print("Error saving generator policy: no entry or site given")
+            return False
+        try:
+            with self.db_manager.transaction() as conn:
+                conn.cursor().execute(
+                    "INSERT OR REPLACE INTO generator_policies (user_email, scope, policy) VALUES (?, ?, ?)",
+                    (user_email, scopes[0], json.dumps(policy.to_dict()))
+                )
+            return True
+        except Exception as e:
+            print(f"Error saving generator policy: {e}")
+            return False
+    
+    def delete_policy(self, user_email: str, entry_id: Optional[int] = None, url: str = "") -> bool:
+        """Forget the policy saved for an entry, or for a URL's site when no entry is given"""
+        scopes = self._scopes(entry_id, "" if entry_id is not None else url)
+        if not scopes:
+            return False
+        try:
+            with self.db_manager.transaction() as conn:
+                conn.cursor().execute(
+                    "DELETE FROM generator_policies WHERE user_email = ? AND scope = ?",
+                    (user_email, scopes[0])
+                )
+            return True
+        except Exception as e:
+            print(f"Error deleting generator policy: {e}")
+            return False
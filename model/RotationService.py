@@ -0,0 +1,217 @@
+import time
+from typing import Dict, List, Optional, Tuple
+from . import PasswordGenerator
+from .DatabaseManager import DatabaseManager
+from .PasswordGenerator import PolicyError
+from .PasswordService import PasswordService
+from .PolicyService import PolicyService
+
+
+class StagedRotation:
+    """An entry picked for rotation and the new password it will get"""
+    
+    __slots__ = ("entry_id", "name", "username", "url", "password", "error")
+    
+    def __init__(self, entry_id: int, name: str, username: str, url: str,
+                 password: Optional[str] = None, error: Optional[str] = None):
+        self.entry_id = entry_id
+        self.name = name
+        self.username = username
+        self.url = url
+        self.password = password  # None when the entry's policy cannot generate one
+        self.error = error
+
+
+class RotationBatch:
+    """A committed rotation that can be undone for a while"""
+    
+    __slots__ = ("id", "created_at", "rotated", "undone_at")
+    
+    def __init__(self, batch_id: int, created_at: float, rotated: int, undone_at: Optional[float] = None):
+        self.id = batch_id
+        self.created_at = created_at
+        self.rotated = rotated
+        self.undone_at = undone_at
+    
+    @property
+    def undo_deadline(self) -> float:
+        """Time after which the batch can no longer be undone"""
+        return self.created_at + RotationService.UNDO_WINDOW
+    
+    @property
+    def can_undo(self) -> bool:
+        """Whether the batch is still inside its undo window"""
+        return self.undone_at is None and time.time() < self.undo_deadline
+
+
+class RotationService:
+    """Rotates the passwords of many entries at once, with a window to undo
+    
+    Entries are picked with a search query, so any text, "site:" or "is:"
+    filter the vault list understands selects what to rotate. New passwords
+    follow each entry's generator policy (see PolicyService). Committing a
+    rotation writes every new password in one transaction, together with a
+    batch that keeps the old encrypted passwords and audit facts; undoing
+    the batch puts them back with a single UPDATE.
+    """
+    
+    UNDO_WINDOW = 10 * 60  # Seconds a rotation can be undone for
+    RETENTION_DAYS = 30  # Old passwords of rotations are kept this long
+    
+    def __init__(self, db_manager: DatabaseManager, password_service: PasswordService, policy_service: PolicyService):
+        self.db_manager = db_manager
+        self.password_service = password_service
+        self.policy_service = policy_service
+    
+    def stage(self, user_email: str, search_query: str) -> List[StagedRotation]:
+        """Pick the entries matching a search and generate their new passwords
+        
+        Entries sharing a policy get their passwords from one batch call.
+        Nothing is written until commit().
+        """
+        entries = self.password_service.get_sorted_entries("custom", search_query)
+        policies = self.policy_service.get_policies(user_email, entries)
+        staged = [StagedRotation(entry.id, entry.name, entry.username, entry.url) for entry in entries]
+        
+        groups: Dict[tuple, List[StagedRotation]] = {}
+        for item in staged:
+            groups.setdefault(policies[item.entry_id].key(), []).append(item)
+        for items in groups.values():
+            policy = policies[items[0].entry_id]
+            try:
+                passwords = PasswordGenerator.generate_many(len(items), policy)
+            except PolicyError as e:
+                for item in items:
+                    item.error = str(e)
+                continue
+            for item, password in zip(items, passwords):
+                item.password = password
+        return staged
+    
+    def commit(self, user_email: str, staged: List[StagedRotation]) -> Optional[RotationBatch]:
+        """Write the staged passwords in one transaction and return the batch, or None on failure
+        
+        Items without a password are skipped, as are entries deleted or
+        moved to the trash since they were staged.
+        """
+        items = [item for item in staged if item.password is not None]
+        if not items:
+            return None
+        fingerprint = self.db_manager.fingerprint
+        now = time.time()
+        try:
+            with self.db_manager.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO rotation_batches (user_email, created_at) VALUES (?, ?)",
+                    (user_email, now)
+                )
+                batch_id = cursor.lastrowid
+                # Keep what each entry has now, straight from its row
+                cursor.executemany(
+                    """INSERT INTO rotation_items (batch_id, entry_id, old_password, old_fingerprint, old_strength,
+                                                   old_breached, old_audit_stamp, old_changed_at, new_fingerprint)
+                       SELECT ?, id, password, password_fingerprint, strength,
+                              breached, audit_stamp, password_changed_at, ?
+                       FROM passwords WHERE id = ? AND user_email = ? AND deleted_at IS NULL""",
+                    [(batch_id, fingerprint(item.password), item.entry_id, user_email) for item in items]
+                )
+                rotated = self.password_service.replace_passwords(
+                    cursor, [(item.entry_id, item.password) for item in items]
+                )
+            return RotationBatch(batch_id, now, rotated)
+        except Exception as e:
+            print(f"Error rotating passwords: {e}")
+            return None
+    
+    def last_batch(self, user_email: str) -> Optional[RotationBatch]:
+        """Get the user's most recent rotation that can still be undone"""
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """SELECT b.id, b.created_at, b.undone_at, COUNT(i.entry_id) AS rotated
+                   FROM rotation_batches b LEFT JOIN rotation_items i ON i.batch_id = b.id
+                   WHERE b.user_email = ? AND b.undone_at IS NULL AND b.created_at > ?
+                   GROUP BY b.id ORDER BY b.created_at DESC LIMIT 1""",
+                (user_email, time.time() - self.UNDO_WINDOW)
+            )
+            row = cursor.fetchone()
+        except Exception as e:
+            print(f"Error loading rotations: {e}")
+            row = None
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return RotationBatch(row['id'], row['created_at'], row['rotated'], row['undone_at'])
+    
+    def batch_entry_ids(self, batch_id: int) -> List[int]:
+        """Get the ids of the entries a rotation changed"""
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT entry_id FROM rotation_items WHERE batch_id = ?", (batch_id,))
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def undo(self, user_email: str, batch_id: int) -> Tuple[bool, str]:
+        """Put back the passwords a rotation replaced
+        
+        Entries changed again since the rotation keep their newer password.
+        """
+        try:
+            with self.db_manager.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT created_at, undone_at FROM rotation_batches WHERE id = ? AND user_email = ?",
+                    (batch_id, user_email)
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    return False, "Rotation not found"
+                if row['undone_at'] is not None:
+                    return False, "This rotation was already undone"
+                if time.time() >= row['created_at'] + self.UNDO_WINDOW:
+                    return False, "This rotation can no longer be undone"
+                
+                cursor.execute("SELECT COUNT(*) FROM rotation_items WHERE batch_id = ?", (batch_id,))
+                total = cursor.fetchone()[0]
+                cursor.execute(
+                    """UPDATE passwords
+                       SET (password, password_fingerprint, strength, breached, audit_stamp, password_changed_at) = (
+                           SELECT old_password, old_fingerprint, old_strength,
+                                  old_breached, old_audit_stamp, old_changed_at
+                           FROM rotation_items WHERE batch_id = ? AND entry_id = passwords.id)
+                       WHERE user_email = ? AND id IN (
+                           SELECT entry_id FROM rotation_items
+                           WHERE batch_id = ? AND new_fingerprint = passwords.password_fingerprint)""",
+                    (batch_id, user_email, batch_id)
+                )
+                restored = cursor.rowcount
+                cursor.execute("UPDATE rotation_batches SET undone_at = ? WHERE id = ?", (time.time(), batch_id))
+        except Exception as e:
+            print(f"Error undoing rotation: {e}")
+            return False, f"Could not undo the rotation: {e}"
+        
+        message = f"Restored {restored} password{'s' if restored != 1 else ''}."
+        if restored < total:
+            message += f" {total - restored} changed or deleted since the rotation were left as they are."
+        return True, message
+    
+    def compact(self, retention_days: Optional[float] = None) -> int:
+        """Forget the old passwords of rotations older than the retention period and return how many"""
+        cutoff = time.time() - (self.RETENTION_DAYS if retention_days is None else retention_days) * 86400
+        try:
+            with self.db_manager.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "DELETE FROM rotation_items WHERE batch_id IN (SELECT id FROM rotation_batches WHERE created_at < ?)",
+                    (cutoff,)
+                )
+                cursor.execute("DELETE FROM rotation_batches WHERE created_at < ?", (cutoff,))
+                return cursor.rowcount
+        except Exception as e:
+            print(f"Error compacting rotations: {e}")
+            return 0
@@ -0,0 +1,51 @@
+"""Site names of entry URLs, shared by generator policies and "site:" searches
+
+A site is the URL's host name, lower-cased and without a leading "www.".
+A URL is on a site when its site is that site or a subdomain of it, so
+"site:example.com" matches login.example.com but neither
+example.com.evil.org nor example.company.
+"""
+from urllib.parse import urlparse
+
+
+def site_of(url: str) -> str:
+    """Get the site a URL belongs to, or "" if it has none"""
+    url = (url or "").strip()
+    if not url:
+        return ""
+    try:
+        host = (urlparse(url if "//" in url else f"//{url}").hostname or "").lower()
+    except ValueError:
+        return ""  # Malformed, e.g. an unclosed IPv6 bracket
+    return host[4:] if host.startswith("www.") else host
+
+
+def on_site(url: str, site: str) -> bool:
+    """Whether a URL is on a site or one of its subdomains"""
+    host, site = site_of(url), site_of(site)
+    return bool(site) and (host == site or host.endswith("." + site))
+
+
+if __name__ == "__main__":
+    # python -m model.Sites
+    cases = [
+        ("https://example.com/login", "example.com", True),
+        ("example.com", "example.com", True),
+        ("https://www.example.com", "example.com", True),
+        ("https://login.example.com:8443/a", "example.com", True),
+        ("https://EXAMPLE.com", "Example.COM", True),
+        ("https://example.com", "https://www.example.com/", True),
+        ("https://example.com.evil.org", "example.com", False),
+        ("https://example.company", "example.com", False),
+        ("https://notexample.com", "example.com", False),
+        ("https://evil.org/?next=https://example.com", "example.com", False),
+        ("https://evil.org/example.com", "example.com", False),
+        ("https://example.com@evil.org", "example.com", False),
+        ("http://[::1", "example.com", False),
+        ("", "example.com", False),
+    ]
+    failures = [(url, site, expected) for url, site, expected in cases if on_site(url, site) != expected]
+    for url, site, expected in failures:
+        print(f"on_site({url!r}, {site!r}) should be {expected}")
+    print(f"{len(cases) - len(failures)} of {len(cases)} cases pass")
+    raise SystemExit(1 if failures else 0)
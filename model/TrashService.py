@@ -0,0 +1,171 @@
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+from .DatabaseManager import DatabaseManager
+from .PasswordService import PasswordService
+
+
+class TrashedEntry:
+    """An entry in the trash, without its password"""
+    
+    __slots__ = ("id", "name", "username", "url", "deleted_at")
+    
+    def __init__(self, entry_id: int, name: str, username: str, url: str, deleted_at: float):
+        self.id = entry_id
+        self.name = name
+        self.username = username
+        self.url = url or ""
+        self.deleted_at = deleted_at
+    
+    @property
+    def expires_at(self) -> float:
+        """Time after which the entry is purged for good"""
+        return self.deleted_at + TrashService.TRASH_DAYS * 86400
+
+
+class TrashService:
+    """Keeps deleted entries in a trash until they are restored or purged
+    
+    Deleting an entry only stamps its deleted_at, which takes it out of
+    every vault query; the indexes those queries use are partial and skip
+    trashed rows. Purging removes rows from the trash for good in small
+    batches, each its own short transaction with a pause between, so a
+    large purge never holds the write lock long enough to stall the UI.
+    Entry history and rotation snapshots go with the entry. A secure purge
+    also has SQLite overwrite the freed pages and checkpoints the WAL, so
+    no copy of the removed passwords is left in the database files.
+    """
+    
+    TRASH_DAYS = 30  # Entries stay in the trash this long before they are purged
+    BATCH_SIZE = 200  # Rows removed per purge transaction
+    BATCH_PAUSE = 0.01  # Seconds to yield to other connections between batches
+    
+    def __init__(self, db_manager: DatabaseManager, password_service: PasswordService):
+        self.db_manager = db_manager
+        self.password_service = password_service
+        self._lock = threading.Lock()  # One purge at a time
+    
+    def get_trash(self, user_email: str) -> List[TrashedEntry]:
+        """Get a user's trashed entries, most recently deleted first"""
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """SELECT id, name, username, url, deleted_at FROM passwords
+                   WHERE user_email = ? AND deleted_at IS NOT NULL
+                   ORDER BY deleted_at DESC""",
+                (user_email,)
+            )
+            return [TrashedEntry(row['id'], row['name'], row['username'], row['url'], row['deleted_at'])
+                    for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error loading trash: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    def restore(self, user_email: str, entry_ids: Iterable[int]) -> int:
+        """Put trashed entries back in the vault and return how many were restored
+        
+        An entry goes back to its old place in custom order, or to the end if
+        an entry added since has taken its order key.
+        """
+        entry_ids = list(entry_ids)
+        try:
+            with self.db_manager.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "UPDATE passwords SET deleted_at = NULL WHERE id = ? AND user_email = ? AND deleted_at IS NOT NULL",
+                    [(entry_id, user_email) for entry_id in entry_ids]
+                )
+                restored = cursor.rowcount
+                self.password_service.free_order_keys(cursor, entry_ids)
+                return restored
+        except Exception as e:
+            print(f"Error restoring entries: {e}")
+            return 0
+    
+    def purge(self, user_email: str, entry_ids: Optional[Iterable[int]] = None,
+              older_than: Optional[float] = None, secure: bool = False) -> int:
+        """Remove entries from the trash for good and return how many were removed
+        
+        Purges the given trashed entries, or every trashed entry deleted
+        before older_than (a timestamp), or the whole trash if neither is
+        given. Batches committed before a failure stay purged.
+        """
+        condition, params = "user_email = ? AND deleted_at IS NOT NULL", [user_email]
+        if older_than is not None:
+            condition += " AND deleted_at < ?"
+            params.append(older_than)
+        if entry_ids is not None:
+            entry_ids = list(entry_ids)
+            if not entry_ids:
+                return 0
+        
+        removed = 0
+        with self._lock:
+            conn = self.db_manager.connect(isolation_level=None)
+            try:
+                if secure:
+                    conn.execute("PRAGMA secure_delete = ON")
+                cursor = conn.cursor()
+                while True:
+                    if entry_ids is None:
+                        cursor.execute(
+                            f"SELECT id FROM passwords WHERE {condition} LIMIT ?",
+                            (*params, self.BATCH_SIZE)
+                        )
+                        batch = [row[0] for row in cursor.fetchall()]
+                    else:
+                        batch, entry_ids = entry_ids[:self.BATCH_SIZE], entry_ids[self.BATCH_SIZE:]
+                    if not batch:
+                        break
+                    removed += self._purge_batch(cursor, condition, params, batch)
+                    time.sleep(self.BATCH_PAUSE)
+                if secure and removed:
+                    # Freed pages are zeroed, but the WAL still holds copies until a checkpoint
+                    cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except Exception as e:
+                print(f"Error purging trash: {e}")
+            finally:
+                conn.close()
+        return removed
+    
+    @staticmethod
+    def _purge_batch(cursor, condition: str, params: list, entry_ids: List[int]) -> int:
+        """Delete one batch of trashed entries and their rotation snapshots in one transaction"""
+        placeholders = ", ".join("?" * len(entry_ids))
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check the condition, as an entry may have been restored since it was picked
+            cursor.execute(f"DELETE FROM passwords WHERE {condition} AND id IN ({placeholders})", (*params, *entry_ids))
+            removed = cursor.rowcount
+            cursor.execute(
+                f"""DELETE FROM rotation_items WHERE entry_id IN ({placeholders})
+                    AND entry_id NOT IN (SELECT id FROM passwords WHERE id IN ({placeholders}))""",
+                (*entry_ids, *entry_ids)
+            )
+            cursor.execute("COMMIT")
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+        return removed
+    
+    def start_purge(self, user_email: str, entry_ids: Optional[Iterable[int]] = None,
+                    older_than: Optional[float] = None, secure: bool = False,
+                    finished: Optional[Callable[[int], None]] = None) -> threading.Thread:
+        """Run purge() on a background thread and call finished with the number removed"""
+        entry_ids = None if entry_ids is None else list(entry_ids)
+        
+        def run():
+            removed = self.purge(user_email, entry_ids, older_than, secure)
+            if finished is not None:
+                finished(removed)
+        
+        thread = threading.Thread(target=run, name="vault-purge", daemon=True)
+        thread.start()
+        return thread
+    
+    def purge_expired(self, user_email: str, secure: bool = False) -> threading.Thread:
+        """Purge, in the background, entries that have been in the trash longer than TRASH_DAYS"""
+        return self.start_purge(user_email, older_than=time.time() - self.TRASH_DAYS * 86400, secure=secure)
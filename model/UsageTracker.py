@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Dict, List, Optional
+from .DatabaseManager import DatabaseManager
+from .Frecency import log_add_exp, use_key
+
+
+class UsageTracker:
+    """Buffers usage events in memory and writes them in batches
+    
+    Recording a use only touches an in-memory counter, so the GUI thread never
+    waits on the database. Pending uses are coalesced per entry into a copy
+    count delta, a frecency key delta and the latest use time, and written in
+    one transaction when flush() is called.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        # entry id -> [copy count delta, frecency key delta, last used time]
+        self._pending: Dict[int, List] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, entry_id: int, timestamp: Optional[float] = None) -> None:
+        """Record one use of an entry"""
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            pending = self._pending.setdefault(entry_id, [0, None, timestamp])
+            self._merge(pending, [1, use_key(timestamp), timestamp])
+    
+    @staticmethod
+    def _merge(pending: List, usage: List) -> None:
+        """Fold one set of usage deltas into another"""
+        pending[0] += usage[0]
+        pending[1] = log_add_exp(pending[1], usage[1])
+        pending[2] = max(pending[2], usage[2])
+    
+    def pending_usage(self) -> Dict[int, tuple]:
+        """Get unwritten (copy count delta, frecency key delta, last used) by entry id"""
+        with self._lock:
+            return {entry_id: tuple(usage) for entry_id, usage in self._pending.items()}
+    
+    def flush(self) -> bool:
+        """Write all pending usage in a single transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return True
+        
+        try:
+            with self.db_manager.transaction() as conn:
+                conn.executemany(
+                    """UPDATE passwords
+                       SET copy_count = copy_count + ?,
+                           frecency = log_add_exp(frecency, ?),
+                           last_used_at = MAX(COALESCE(last_used_at, 0), ?)
+                       WHERE id = ?""",
+                    [(count, key, last_used, entry_id)
+                     for entry_id, (count, key, last_used) in pending.items()]
+                )
+            return True
+        except Exception as e:
+            # Keep the usage so the next flush can retry it
+            with self._lock:
+                for entry_id, usage in pending.items():
+                    if entry_id in self._pending:
+                        self._merge(self._pending[entry_id], usage)
+                    else:
+                        self._pending[entry_id] = usage
+            print(f"Error flushing usage counts: {e}")
+            return False
@@ -0,0 +1,144 @@
+from typing import Callable, Iterator, Optional, Tuple
+
+
+class VaultEntry:
+    """Immutable record for a single password entry
+    
+    Uses __slots__ instead of a per-instance dict, and keeps the password
+    encrypted until it is read through the password property, so a listing
+    never holds plaintext secrets it does not display.
+    
+    Existing callers that treat entries as dicts keep working: entry['name'],
+    entry.get('url', '') and 'custom_order' (an alias of order) are supported.
+    """
+    
+    __slots__ = (
+        "id", "name", "username", "url", "order", "copy_count",
+        "last_used_at", "frecency", "_encrypted_password", "_decrypt",
+    )
+    
+    # Keys available through the dict-style interface
+    KEYS = (
+        "id", "name", "username", "password", "url", "custom_order",
+        "copy_count", "last_used_at", "frecency",
+    )
+    _KEY_ALIASES = {"custom_order": "order"}
+    
+    def __init__(self, id: int, name: str, username: str, url: str, order: int, copy_count: int,
+                 encrypted_password: str, decrypt: Callable[[str], str],
+                 last_used_at: Optional[float] = None, frecency: Optional[float] = None):
+        set_field = object.__setattr__
+        set_field(self, "id", id)
+        set_field(self, "name", name)
+        set_field(self, "username", username)
+        set_field(self, "url", url or "")
+        set_field(self, "order", order)
+        set_field(self, "copy_count", copy_count)
+        set_field(self, "last_used_at", last_used_at)
+        set_field(self, "frecency", frecency)
+        set_field(self, "_encrypted_password", encrypted_password)
+        set_field(self, "_decrypt", decrypt)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("VaultEntry is immutable; use replace() to derive a changed copy")
+    
+    def __delattr__(self, name):
+        raise AttributeError("VaultEntry is immutable")
+    
+    @property
+    def password(self) -> str:
+        """Decrypt and return the password"""
+        try:
+            return self._decrypt(self._encrypted_password)
+        except:
+            return ""  # Handle decryption errors gracefully
+    
+    def replace(self, **changes) -> "VaultEntry":
+        """Return a copy of this entry with some fields changed"""
+        fields = {
+            "id": self.id, "name": self.name, "username": self.username, "url": self.url,
+            "order": self.order, "copy_count": self.copy_count,
+            "encrypted_password": self._encrypted_password, "decrypt": self._decrypt,
+            "last_used_at": self.last_used_at, "frecency": self.frecency,
+        }
+        fields.update(changes)
+        return VaultEntry(**fields)
+    
+    def _fields(self) -> Tuple:
+        """Get the public field values, used for equality"""
+        return (self.id, self.name, self.username, self.url, self.order,
+                self.copy_count, self.last_used_at, self.frecency)
+    
+    def __eq__(self, other):
+        if not isinstance(other, VaultEntry):
+            return NotImplemented
+        return self._fields() == other._fields()
+    
+    def __hash__(self):
+        return hash(self.id)
+    
+    def __repr__(self):
+        return f"VaultEntry(id={self.id!r}, name={self.name!r}, username={self.username!r}, url={self.url!r})"
+    
+    # ==================== Dict Compatibility ====================
+    
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, self._KEY_ALIASES.get(key, key))
+    
+    def __contains__(self, key) -> bool:
+        return key in self.KEYS
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+    
+    def get(self, key: str, default=None):
+        """Get a field by dict key, or default if there is no such key"""
+        return self[key] if key in self.KEYS else default
+    
+    def keys(self) -> Tuple[str, ...]:
+        """Get the dict keys of the entry"""
+        return self.KEYS
+    
+    def to_dict(self) -> dict:
+        """Get the entry as a plain dict, with the password decrypted"""
+        return {key: self[key] for key in self.KEYS}
+
+
+if __name__ == "__main__":
+    # python -m model.VaultEntry 20000
+    import sys
+    import tracemalloc
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    # Stand-ins for fetched rows; their values exist before either representation is built
+    rows = [
+        {"id": i, "name": f"Site {i}", "username": f"user{i}@example.com", "url": f"https://site{i}.example.com",
+         "custom_order": i * 1024, "copy_count": i % 7, "password": f"gAAAAAB{i:0>113}"}
+        for i in range(count)
+    ]
+    
+    def decrypt(token: str) -> str:
+        return token[-16:]  # A new plaintext string of a typical password length
+    
+    def measure(build) -> float:
+        """Get the bytes allocated per entry by building the entries"""
+        tracemalloc.start()
+        entries = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del entries
+        return size / count
+    
+    dict_size = measure(lambda: [
+        {"id": row["id"], "name": row["name"], "username": row["username"], "password": decrypt(row["password"]),
+         "url": row["url"], "custom_order": row["custom_order"]}
+        for row in rows
+    ])
+    entry_size = measure(lambda: [
+        VaultEntry(row["id"], row["name"], row["username"], row["url"], row["custom_order"], row["copy_count"],
+                   row["password"], decrypt)
+        for row in rows
+    ])
+    print(f"{count} entries: dict with decrypted password {dict_size:.0f} bytes/entry, "
+          f"VaultEntry {entry_size:.0f} bytes/entry")
@@ -0,0 +1,297 @@
+from typing import Callable, List, Optional
+
+
+class VaultChange:
+    """A single change to the ordered list of entries a VaultStore exposes
+    
+    position is where the entry was before the change for removals and moves,
+    and where it is after the change for insertions and updates. new_position
+    is only set for moves. Resets carry no entry or position.
+    """
+    
+    RESET = "reset"
+    INSERTED = "inserted"
+    REMOVED = "removed"
+    UPDATED = "updated"
+    MOVED = "moved"
+    
+    __slots__ = ("kind", "entry_id", "position", "new_position")
+    
+    def __init__(self, kind: str, entry_id: Optional[int] = None,
+                 position: Optional[int] = None, new_position: Optional[int] = None):
+        self.kind = kind
+        self.entry_id = entry_id
+        self.position = position
+        self.new_position = new_position
+    
+    def __repr__(self) -> str:
+        return (f"VaultChange({self.kind!r}, entry_id={self.entry_id}, "
+                f"position={self.position}, new_position={self.new_position})")
+
+
+class VaultStore:
+    """Ordered view of the current user's entries that reports fine-grained changes
+    
+    The store keeps only the entry ids for the current sort and search, so it
+    stays cheap for large vaults. Mutations go through the store, which
+    reconciles the affected entry against the database and notifies listeners
+    with VaultChange events instead of asking them to rebuild everything.
+    """
+    
+    RESET_THRESHOLD = 200  # More changed entries than this are applied as one reset
+    
+    def __init__(self, model, sort_type: str = "custom", search_query: str = ""):
+        self.model = model
+        self.sort_type = sort_type
+        self.search_query = search_query
+        self._ids: List[int] = []
+        self._listeners: List[Callable[[VaultChange], None]] = []
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def entry_ids(self) -> List[int]:
+        """Get a copy of the entry ids in display order"""
+        return list(self._ids)
+    
+    def position_of(self, entry_id: int) -> Optional[int]:
+        """Get the position of an entry in the store, or None if it is not shown"""
+        try:
+            return self._ids.index(entry_id)
+        except ValueError:
+            return None
+    
+    def subscribe(self, listener: Callable[[VaultChange], None]) -> None:
+        """Register a callable that receives every VaultChange"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+    
+    def unsubscribe(self, listener: Callable[[VaultChange], None]) -> None:
+        """Stop sending changes to a listener"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _emit(self, change: VaultChange) -> None:
+        """Send a change to all listeners"""
+        for listener in list(self._listeners):
+            try:
+                listener(change)
+            except Exception as e:
+                print(f"Error notifying vault store listener: {e}")
+    
+    def load(self, sort_type: Optional[str] = None, search_query: Optional[str] = None) -> None:
+        """Reload the ids for a sort and search and announce a reset"""
+        if sort_type is not None:
+            self.sort_type = sort_type
+        if search_query is not None:
+            self.search_query = search_query
+        self._ids = self.model.get_entry_ids(self.sort_type, self.search_query)
+        self._emit(VaultChange(VaultChange.RESET))
+    
+    def refresh_entry(self, entry_id: int, updated: bool = False) -> Optional[VaultChange]:
+        """Reconcile one entry with the database and emit what changed for it
+        
+        Only the given entry may have changed since the last event, so its new
+        position is also its position in the updated id list. Returns the
+        structural change that was emitted, if any.
+        """
+        old_position = self.position_of(entry_id)
+        new_position = self.model.get_entry_position(entry_id, self.sort_type, self.search_query)
+        
+        change = None
+        if old_position is None and new_position is not None:
+            self._ids.insert(new_position, entry_id)
+            change = VaultChange(VaultChange.INSERTED, entry_id, new_position)
+        elif old_position is not None and new_position is None:
+            del self._ids[old_position]
+            change = VaultChange(VaultChange.REMOVED, entry_id, old_position)
+        elif old_position is not None and old_position != new_position:
+            del self._ids[old_position]
+            self._ids.insert(new_position, entry_id)
+            change = VaultChange(VaultChange.MOVED, entry_id, old_position, new_position)
+        
+        if change is not None:
+            self._emit(change)
+        if updated and old_position is not None and new_position is not None:
+            self._emit(VaultChange(VaultChange.UPDATED, entry_id, new_position))
+        return change
+    
+    def apply_changes(self, entry_ids: List[int]) -> None:
+        """Reconcile entries changed elsewhere, reloading instead when there are many
+        
+        The database positions of several changed entries are only valid
+        together, so for a batch the new id order is read once and the store
+        is walked to it: removals first, then insertions and moves in display
+        order. A changed entry that moved later is parked at the end and
+        pulled into place when the walk reaches it, so entries that did not
+        change are never reported as moved.
+        """
+        if len(entry_ids) > self.RESET_THRESHOLD:
+            self.load()
+            return
+        if len(entry_ids) == 1:
+            self.refresh_entry(entry_ids[0], updated=True)
+            return
+        
+        new_ids = self.model.get_entry_ids(self.sort_type, self.search_query)
+        changed = set(entry_ids)
+        wanted = set(new_ids)
+        for position in range(len(self._ids) - 1, -1, -1):
+            if self._ids[position] not in wanted:
+                entry_id = self._ids.pop(position)
+                self._emit(VaultChange(VaultChange.REMOVED, entry_id, position))
+        
+        present = set(self._ids)
+        inserted = set()
+        position = 0
+        while position < len(new_ids):
+            entry_id = new_ids[position]
+            current_id = self._ids[position] if position < len(self._ids) else None
+            if current_id == entry_id:
+                position += 1
+            elif entry_id not in present:
+                self._ids.insert(position, entry_id)
+                present.add(entry_id)
+                inserted.add(entry_id)
+                self._emit(VaultChange(VaultChange.INSERTED, entry_id, position))
+                position += 1
+            elif entry_id in changed or current_id not in changed:
+                self._move(self._ids.index(entry_id, position), position)
+                position += 1
+            else:
+                self._move(position, len(self._ids) - 1)
+        
+        for entry_id in dict.fromkeys(entry_ids):
+            position = self.position_of(entry_id)
+            if position is not None and entry_id not in inserted:
+                self._emit(VaultChange(VaultChange.UPDATED, entry_id, position))
+    
+    def _move(self, old_position: int, new_position: int) -> None:
+        """Move an id within the store and announce it"""
+        entry_id = self._ids.pop(old_position)
+        self._ids.insert(new_position, entry_id)
+        self._emit(VaultChange(VaultChange.MOVED, entry_id, old_position, new_position))
+    
+    def add_entry(self, name: str, username: str, password: str, url: str = "") -> Optional[int]:
+        """Add an entry and announce where it appears"""
+        entry_id = self.model.add_entry(name, username, password, url)
+        if entry_id is not None:
+            self.refresh_entry(entry_id)
+        return entry_id
+    
+    def update_entry(self, entry_id: int, name: str, username: str, password: str, url: str = "") -> bool:
+        """Update an entry and announce the update and any move it causes"""
+        if not self.model.update_entry(entry_id, name, username, password, url):
+            return False
+        self.refresh_entry(entry_id, updated=True)
+        return True
+    
+    def delete_entry(self, entry_id: int) -> bool:
+        """Delete an entry and announce its removal"""
+        if not self.model.delete_entry(entry_id):
+            return False
+        self.refresh_entry(entry_id)
+        return True
+    
+    def delete_all_entries(self) -> bool:
+        """Delete every entry and announce a reset"""
+        if not self.model.delete_all_entries():
+            return False
+        self.load()
+        return True
+    
+    def move_entry(self, entry_id: int, before_id: Optional[int] = None, after_id: Optional[int] = None) -> bool:
+        """Move an entry in custom order and announce the move"""
+        if not self.model.move_entry(entry_id, before_id=before_id, after_id=after_id):
+            return False
+        self.refresh_entry(entry_id)
+        return True
+    
+    def move_entry_up(self, entry_id: int) -> bool:
+        """Move an entry before the one above it in custom order"""
+        previous_id = self.model.get_neighbour_id(entry_id, previous=True)
+        return previous_id is not None and self.move_entry(entry_id, before_id=previous_id)
+    
+    def move_entry_down(self, entry_id: int) -> bool:
+        """Move an entry after the one below it in custom order"""
+        next_id = self.model.get_neighbour_id(entry_id, previous=False)
+        return next_id is not None and self.move_entry(entry_id, after_id=next_id)
+    
+    def undo(self) -> Optional[str]:
+        """Revert the latest change, announce the entries it touched and return its label"""
+        operation = self.model.undo()
+        if operation is None:
+            return None
+        self.apply_changes(operation.entry_ids)
+        return operation.label
+    
+    def redo(self) -> Optional[str]:
+        """Apply the latest undone change again, announce the entries it touched and return its label"""
+        operation = self.model.redo()
+        if operation is None:
+            return None
+        self.apply_changes(operation.entry_ids)
+        return operation.label
+
+
+if __name__ == "__main__":
+    # python -m model.VaultStore 40
+    # Two models share a database; one changes several entries at once and the
+    # other applies the polled batch, which has to leave its store in database order.
+    import random
+    import sys
+    import tempfile
+    from pathlib import Path
+    from .Model import PasswordVaultModel
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    sort_types = ["custom", "alphabetical_asc", "alphabetical_desc", "frecency", "frequently_used"]
+    
+    def check(label: str, writes) -> bool:
+        """Apply one batch of writes from another instance and compare the store with the database"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = str(Path(directory) / "vault.db")
+            reader, writer = PasswordVaultModel(path), PasswordVaultModel(path)
+            reader.register_user("check@example.com", "Check-passw0rd")
+            for model in (reader, writer):
+                model.login_user("check@example.com", "Check-passw0rd")
+            writer.add_entries([{"name": f"entry {i}", "username": "u", "password": "p", "url": ""} for i in range(6)])
+            store = VaultStore(reader, random.choice(sort_types))
+            store.load()
+            reader.poll_changes()
+            changes = []
+            store.subscribe(changes.append)
+            writes(writer)
+            store.apply_changes(reader.poll_changes() or [])
+            expected = reader.get_entry_ids(store.sort_type, store.search_query)
+            for model in (reader, writer):
+                model.logout()
+        if store.entry_ids() != expected:
+            print(f"{label} ({store.sort_type}): store {store.entry_ids()} != database {expected}, events {changes}")
+            return False
+        return True
+    
+    def random_writes(writer) -> None:
+        """Make three random adds, deletes or renames"""
+        for _ in range(3):
+            entry_ids = writer.get_entry_ids()
+            action = random.choice(["add", "delete", "rename"]) if entry_ids else "add"
+            if action == "add":
+                writer.add_entry(f"added {random.random():.6f}", "u", "p")
+            elif action == "delete":
+                writer.delete_entry(random.choice(entry_ids))
+            else:
+                entry_id = random.choice(entry_ids)
+                writer.update_entry(entry_id, f"renamed {random.random():.6f}", "u", "p")
+    
+    def adds_and_deletes(writer) -> None:
+        """Delete the first and last entries and add two in one batch"""
+        entry_ids = writer.get_entry_ids()
+        writer.delete_entry(entry_ids[0])
+        writer.add_entry("aaa added first", "u", "p")
+        writer.delete_entry(entry_ids[-1])
+        writer.add_entry("zzz added last", "u", "p")
+    
+    failures = sum(not check("adds and deletes", adds_and_deletes) for _ in range(5))
+    failures += sum(not check(f"random run {run}", random_writes) for run in range(runs))
+    print(f"{runs + 5 - failures} of {runs + 5} batches applied in database order")
+    sys.exit(1 if failures else 0)